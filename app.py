@@ -1,49 +1,635 @@
+import hashlib
+import json
+import logging
+import math
 import os
-from flask import Flask, jsonify, send_file
-from services.api_client import LuxidAPIClient
-from services.event_processor import EventProcessor
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
 from services.csv_exporter import CSVExporter
-from config import USERNAME, PASSWORD
+from services.job_queue import FileJobStore, JobManager
+from services.event_filter import EventFilter
+from services.circuit_breaker import CircuitOpenError
+from services.pipeline import load_field_mapping, make_response_cache, make_shared_token_cache
+from services.pipeline import build_processor as pipeline_build_processor, make_client as pipeline_make_client
+from services.metrics import REGISTRY, REQUEST_DURATION, Gauge, MetricsDirectory
+from services.profiling import run_profiled
+from services.logging_setup import configure_logging
+from services.tenants import TenantBusy, TenantRegistry
+from services.participant_store import ParticipantStore
+from services.aggregator import AGGREGATE_BOOLEAN_FIELDS, aggregated_export, normalize_email, read_people_rows
+from services.exporters import EXPORT_FORMATS, ExportFormatUnavailable, derived_export, negotiate_format
+from config import (
+    USERNAME, PASSWORD, INCREMENTAL_SYNC, FETCH_FAILURE_POLICY, EXPORT_JOB_WORKERS, EXPORT_JOB_DIR, CSV_KEEP_VERSIONS, PROFILING_ENABLED,
+    METRICS_DIR,
+    LOG_LEVEL, LOG_RATE_LIMIT, LOG_RATE_BURST, FLASK_DEBUG, CSV_OUTPUT_PATH,
+    TENANTS_FILE, TENANT_OUTPUT_ROOT, TENANT_MAX_CLIENTS, PARTICIPANT_STORE_ENABLED, AGGREGATE_MAX_MEMORY_ENTRIES,
+)
+
+configure_logging(LOG_LEVEL, rate=LOG_RATE_LIMIT, burst=LOG_RATE_BURST)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-api_client = LuxidAPIClient(USERNAME, PASSWORD)
+# gunicorn.conf.py starts the writer in each worker; without it /metrics reports the answering process only
+metrics_directory = MetricsDirectory(REGISTRY, METRICS_DIR) if METRICS_DIR else None
+response_cache = make_response_cache()
+shared_tokens = make_shared_token_cache()  # None keeps tokens per process
+
+def make_client(username, password, token_cache=None):
+    """Creates an API client sharing the app's response cache (and shared token cache, when configured),
+    with its own limits from config.py."""
+    if shared_tokens is not None:
+        token_cache = shared_tokens
+    return pipeline_make_client(username, password, token_cache, response_cache)
+
+api_client = make_client(USERNAME, PASSWORD)
+REGISTRY.register(Gauge(
+    "luxid_client_stat", "LuxidAPIClient request, retry, login and connection counters.", ("stat",),
+    callback=lambda: {(name,): value for name, value in api_client.stats.items()},
+))
+REGISTRY.register(Gauge(
+    "luxid_response_cache_stat", "Response cache hits, misses, evictions and size.", ("stat",),
+    callback=lambda: {(name,): value for name, value in response_cache.snapshot().items()} if response_cache else {},
+))
+tenant_registry = None
+if TENANTS_FILE:
+    tenant_registry = TenantRegistry.from_file(
+        TENANTS_FILE,
+        TENANT_OUTPUT_ROOT,
+        lambda tenant, token_cache: make_client(tenant.username, tenant.password, token_cache),
+        max_clients=TENANT_MAX_CLIENTS,
+    )
+
+def upstream_limits():
+    """Current limiter state per client ("default" or the tenant id)."""
+    clients = [("default", api_client)] + (tenant_registry.clients() if tenant_registry else [])
+    values = {}
+    for name, client in clients:
+        if client.concurrency_limiter is not None:
+            for stat, value in client.concurrency_limiter.snapshot().items():
+                values[(name, stat)] = value
+        if client.rate_limiter is not None:
+            values[(name, "rate_limit")] = client.rate_limiter.rate
+            values[(name, "rate_wait_seconds")] = client.rate_limiter.waited
+    return values
+
+REGISTRY.register(Gauge(
+    "luxid_upstream_limiter", "Adaptive concurrency limit, in-flight requests, limit decreases and rate limiter waits.",
+    ("client", "stat"), callback=upstream_limits,
+))
+
+def circuit_states():
+    """Circuit breaker state per client ("default" or the tenant id)."""
+    clients = [("default", api_client)] + (tenant_registry.clients() if tenant_registry else [])
+    values = {}
+    for name, client in clients:
+        if client.circuit_breaker is not None:
+            snapshot = client.circuit_breaker.snapshot()
+            values[(name, "open")] = int(snapshot.pop("state") != "closed")
+            for stat, value in snapshot.items():
+                values[(name, stat)] = value
+    return values
 
-# Define the file path where CSV will be stored inside the app directory
+REGISTRY.register(Gauge(
+    "luxid_circuit_breaker", "Whether the upstream circuit is open (or half-open), consecutive failures, openings and refused calls.",
+    ("client", "stat"), callback=circuit_states,
+))
+field_mapping = load_field_mapping()
+
+# Define the file path where CSV will be stored (inside the app directory unless CSV_OUTPUT_PATH is set)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CSV_FILE_PATH = os.path.join(BASE_DIR, "participants.csv")
-print(f"  CSV file will be saved in: {CSV_FILE_PATH}", flush=True)  # Debugging
+CSV_FILE_PATH = CSV_OUTPUT_PATH or os.path.join(BASE_DIR, "participants.csv")
+logger.info("CSV file will be saved in: %s", CSV_FILE_PATH)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_duration(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            status=response.status_code,
+        )
+    return response
+
+def is_incremental():
+    """Returns whether this request asked for an incremental sync (defaults to INCREMENTAL_SYNC)."""
+    value = request.args.get("incremental")
+    if value is None:
+        return INCREMENTAL_SYNC
+    return value.lower() in ("1", "true", "yes")
+
+def request_event_filter():
+    """Returns the EventFilter described by the request's start/end/eventType/eventId parameters.
+
+    Raises ValueError for invalid values.
+    """
+    return EventFilter.from_params(request.args)
+
+def request_failure_policy():
+    """Returns the failure policy asked for with `?partial=`, or None for FETCH_FAILURE_POLICY.
+
+    A partial export skips events whose participants cannot be fetched (after the configured
+    retries, if the policy is "retry") and reports them instead of failing the whole export.
+    """
+    value = request.args.get("partial")
+    if value is None:
+        return None
+    if value.lower() in ("1", "true", "yes"):
+        return FETCH_FAILURE_POLICY if FETCH_FAILURE_POLICY != "abort" else "skip"
+    return "abort"
+
+def build_processor(incremental=False, client=None, snapshot_path=None, event_filter=None, failure_policy=None):
+    """Creates an EventProcessor configured from config.py (for a tenant's client and snapshots if given)."""
+    return pipeline_build_processor(
+        client or api_client, field_mapping,
+        incremental=incremental, snapshot_path=snapshot_path, event_filter=event_filter, failure_policy=failure_policy,
+    )
+
+def open_circuit_error(client):
+    """Returns a CircuitOpenError when `client`'s upstream circuit is open, else None."""
+    breaker = client.circuit_breaker
+    if breaker is None or not breaker.is_open():
+        return None
+    return CircuitOpenError(f"Upstream circuit {breaker.name} is open; not calling it", breaker.retry_after())
+
+def last_good_export(csv_path, error):
+    """Answers an export request while the upstream is unavailable by pointing at the previous export.
+
+    An export interrupted by the circuit breaker is abandoned before it replaces the CSV, so the
+    one on disk is the last good one.
+    """
+    headers = {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+    if not os.path.exists(csv_path):
+        return jsonify({"error": str(error)}), 503, headers
+    updated = datetime.fromtimestamp(os.path.getmtime(csv_path), timezone.utc)
+    logger.warning("Upstream unavailable, keeping the export from %s: %s", updated.isoformat(), error)
+    return jsonify({
+        "message": "Upstream unavailable; the last good export was kept.",
+        "stale": True,
+        "last_export_at": updated.isoformat(),
+        "error": str(error),
+    }), 200, headers
+
+def export_path(csv_path=None, event_filter=None):
+    """Returns the CSV an export is written to: CSV_FILE_PATH (or `csv_path`) for a full export.
+
+    A filtered export gets a file of its own under filtered/ next to it, named after the filter,
+    so the full export and the versions, participant store and people aggregate derived from it
+    keep covering every event.
+    """
+    csv_path = csv_path or CSV_FILE_PATH
+    if not event_filter:
+        return csv_path
+    digest = hashlib.sha256(json.dumps(event_filter.to_params(), sort_keys=True).encode()).hexdigest()[:16]
+    name, extension = os.path.splitext(os.path.basename(csv_path))
+    return os.path.join(os.path.dirname(csv_path), "filtered", f"{name}-{digest}{extension}")
+
+def export_url(download_path, event_filter):
+    """Returns the URL downloading the export of `event_filter` from the `download_path` endpoint."""
+    return f"{download_path}?{urlencode(event_filter.to_params())}" if event_filter else download_path
+
+def failed_export(processor, error):
+    """Answers an export that could not be written after events failed (e.g. every event did),
+    reporting those events; the previous export is kept."""
+    logger.error("Export failed after %d failed events: %s", len(processor.failed_events), error)
+    return jsonify({
+        "error": str(error),
+        "message": "No export was written; the previous export was kept.",
+        "failed_events": processor.failed_events,
+    }), 502
+
+def build_exporter(csv_path=None, event_filter=None):
+    """Creates the CSVExporter writing CSV_FILE_PATH (or `csv_path`) with the configured version retention.
+
+    With a filter it writes that filter's own export, without versions.
+    """
+    return CSVExporter(
+        file_name=export_path(csv_path, event_filter),
+        keep_versions=0 if event_filter else CSV_KEEP_VERSIONS,
+        fieldnames=field_mapping.fieldnames,
+    )
+
+_participant_stores = {}
+_participant_stores_lock = threading.Lock()
+
+def participant_store(csv_path):
+    """Returns the ParticipantStore derived from `csv_path` (kept next to it as .db)."""
+    with _participant_stores_lock:
+        store = _participant_stores.get(csv_path)
+        if store is None:
+            store = ParticipantStore(os.path.splitext(csv_path)[0] + ".db", field_mapping.boolean_fields)
+            _participant_stores[csv_path] = store
+        return store
+
+def ingest_export(csv_path, event_filter=None):
+    """Loads a fresh export into its participant store. Returns the row count, or None when
+    the store is disabled, the export is filtered or loading failed (the CSV export itself
+    still succeeded)."""
+    if not PARTICIPANT_STORE_ENABLED or event_filter:
+        return None
+    try:
+        return participant_store(csv_path).ingest_csv(csv_path)
+    except Exception as e:
+        logger.warning("Could not load %s into the participant store: %s", csv_path, e)
+        return None
 
 @app.route("/fetch-participant-info", methods=["GET"])
 def fetch_participant_info():
-    """Endpoint to generate and save CSV file."""
+    """Endpoint to generate and save CSV file.
+
+    `start`, `end` (Unix timestamp, YYYY-MM-DD or ISO 8601), `eventType` and `eventId` restrict
+    the export to matching events; the others' participants are not fetched.
+    """
+    try:
+        event_filter = request_event_filter()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    circuit_error = open_circuit_error(api_client)
+    if circuit_error is not None:
+        return last_good_export(export_path(event_filter=event_filter), circuit_error)
+    processor = None
     try:
-        print("Fetching participant info...", flush=True)
+        logger.info("Fetching participant info...")
 
-        processor = EventProcessor(api_client)
-        processor.process_events()
+        processor = build_processor(
+            incremental=is_incremental(), event_filter=event_filter, failure_policy=request_failure_policy(),
+        )
 
-        # Generate CSV file in app directory
-        exporter = CSVExporter(file_name=CSV_FILE_PATH)
-        message = exporter.save_to_csv(processor.all_participants)
+        # Rows are written to the CSV in the app directory (or the filter's own CSV) as each event is processed
+        exporter = build_exporter(event_filter=event_filter)
+        profile = None
+        if PROFILING_ENABLED and request.args.get("profile", "").lower() in ("1", "true", "yes"):
+            message, profile = run_profiled(exporter.save_to_csv, processor.iter_rows())
+        else:
+            message = exporter.save_to_csv(processor.iter_rows())
+        stored_rows = ingest_export(CSV_FILE_PATH, event_filter)
 
-        return jsonify({
+        body = {
             "message": message,
-            
-        }), 200
+            "download": export_url("/download-csv", event_filter),
+            "stored_rows": stored_rows,
+            "failed_events": processor.failed_events,
+            "partial": bool(processor.failed_events),
+            "filter": event_filter.to_dict() if event_filter else None,
+            "events_filtered": processor.events_filtered,
+            "upstream": api_client.stats,
+            "circuit": api_client.circuit_breaker.snapshot() if api_client.circuit_breaker else None,
+            "sync": processor.sync_stats,
+            "cache": response_cache.snapshot() if response_cache else None,
+        }
+        if profile is not None:
+            body["profile"] = profile
+        return jsonify(body), 200
+    except CircuitOpenError as e:
+        return last_good_export(export_path(event_filter=event_filter), e)
+    except Exception as e:
+        if processor is not None and processor.failed_events:
+            return failed_export(processor, e)
+        logger.exception("Error: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+def run_export_job(job):
+    """Runs the fetch -> process -> write pipeline for a background export job."""
+    event_filter = EventFilter.from_params(job.params)
+    processor = build_processor(
+        incremental=job.params["incremental"],
+        event_filter=event_filter,
+        failure_policy=job.params.get("failure_policy"),
+    )
+
+    def rows():
+        for batch in processor.iter_event_rows():
+            job.events_total = processor.events_total
+            job.advance(len(batch))
+            yield from batch
+
+    exporter = build_exporter(event_filter=event_filter)
+    try:
+        message = exporter.save_to_csv(rows())
+    finally:
+        job.failed_events = processor.failed_events
+    return {
+        "message": message,
+        "download": export_url("/download-csv", event_filter),
+        "stored_rows": ingest_export(CSV_FILE_PATH, event_filter),
+        "failed_events": processor.failed_events,
+        "partial": bool(processor.failed_events),
+        "events_filtered": processor.events_filtered,
+        "sync": processor.sync_stats,
+    }
+
+# A single worker by default: every job writes the same CSV_FILE_PATH. Jobs are recorded in EXPORT_JOB_DIR,
+# so a job can be polled from (and is deduplicated across) every gunicorn worker.
+job_manager = JobManager(run_export_job, workers=EXPORT_JOB_WORKERS, store=FileJobStore(EXPORT_JOB_DIR))
+
+@app.route("/export-jobs", methods=["POST"])
+def create_export_job():
+    """Starts an export job, or joins an identical one already queued or running."""
+    if not job_manager.accepting:
+        return jsonify({"error": "Server is shutting down."}), 503
+    try:
+        event_filter = request_event_filter()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Filters are part of the job parameters, so only identical exports are deduplicated
+    params = {"incremental": is_incremental(), **event_filter.to_params()}
+    failure_policy = request_failure_policy()
+    if failure_policy is not None:
+        params["failure_policy"] = failure_policy
+    job, created = job_manager.submit(params)
+    body = job.to_dict()
+    body["deduplicated"] = not created
+    return jsonify(body), 202, {"Location": f"/export-jobs/{job.id}"}
+
+@app.route("/export-jobs/<job_id>", methods=["GET"])
+def get_export_job(job_id):
+    """Returns the status and progress of an export job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found!"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route("/stream-participant-info", methods=["GET"])
+def stream_participant_info():
+    """Endpoint that streams the CSV to the client as events finish processing; accepts the same
+    filters as /fetch-participant-info."""
+    try:
+        event_filter = request_event_filter()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    circuit_error = open_circuit_error(api_client)
+    if circuit_error is not None:
+        # Serve the last good export instead of starting a stream that would fail
+        csv_path = export_path(event_filter=event_filter)
+        if not os.path.exists(csv_path):
+            return jsonify({"error": str(circuit_error)}), 503, {"Retry-After": str(max(1, math.ceil(circuit_error.retry_after)))}
+        response = send_file(csv_path, mimetype="text/csv", as_attachment=True, download_name="participants.csv")
+        response.headers["X-Export-Stale"] = "true"
+        return response
+    logger.info("Streaming participant info...")
+
+    processor = build_processor(incremental=is_incremental(), event_filter=event_filter, failure_policy=request_failure_policy())
+    chunks = CSVExporter.stream_csv(processor.iter_event_rows(), field_mapping.fieldnames)
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=participants.csv"},
+    )
+
+def send_export(csv_path):
+    """Sends `csv_path` (or a stored `?version=` of it) in the format asked for by the request.
+
+    `?aggregate=email` sends one row per person instead of one per (event, participant).
+    Filter parameters (start, end, eventType, eventId) select the export written with that filter.
+    """
+    try:
+        event_filter = request_event_filter()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        file_path = export_path(csv_path, event_filter)
+        version = request.args.get("version")
+        if version and event_filter:
+            return jsonify({"error": "Versions are only kept for the full export."}), 400
+        if version:
+            file_path = build_exporter(csv_path).version_path(version)
+            if file_path is None:
+                return jsonify({"error": "CSV version not found!"}), 404
+
+        if not os.path.exists(file_path):
+            return jsonify({"error": "CSV file not found!"}), 404
+
+        boolean_fields = field_mapping.boolean_fields
+        aggregate = request.args.get("aggregate")
+        if aggregate:
+            if aggregate != "email":
+                return jsonify({"error": f"Unknown aggregation: {aggregate}"}), 400
+            file_path = aggregated_export(file_path, boolean_fields, AGGREGATE_MAX_MEMORY_ENTRIES)
+            boolean_fields = AGGREGATE_BOOLEAN_FIELDS
+
+        export_format = request.args.get("format")
+        if export_format is None:
+            export_format = negotiate_format(request.headers.get("Accept"))
+        mimetype = "text/csv"
+        if export_format not in (None, "csv"):
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({"error": f"Unknown format: {export_format}"}), 400
+            file_path, mimetype = derived_export(file_path, export_format, boolean_fields)
+
+        response = send_file(file_path, mimetype=mimetype, as_attachment=True, conditional=True, etag=True, max_age=0)
+        response.vary.add("Accept")
+        return response
+    except ExportFormatUnavailable as e:
+        return jsonify({"error": str(e)}), 501
     except Exception as e:
-        print(f"Error: {e}", flush=True)
         return jsonify({"error": str(e)}), 500
 
 @app.route("/download-csv", methods=["GET"])
 def download_csv():
-    """Endpoint to download the generated CSV file"""
+    """Endpoint to download the generated CSV file (or a stored `?version=`).
+
+    `?format=` (csv, csv.gz, ndjson, parquet, arrow) or the Accept header selects the format.
+    Responses carry ETag/Last-Modified, answer If-None-Match/If-Modified-Since with 304
+    and honour Range requests for resumable downloads.
+    """
+    return send_export(CSV_FILE_PATH)
+
+def query_participants(csv_path):
+    """Answers a filtered, paginated participant query from the store derived from `csv_path`.
+
+    Every query parameter other than `limit` and `offset` filters on the column of that name.
+    """
+    if not PARTICIPANT_STORE_ENABLED:
+        return jsonify({"error": "Participant store is disabled."}), 404
     try:
-        if not os.path.exists(CSV_FILE_PATH):
-            return jsonify({"error": "CSV file not found!"}), 404
+        store = participant_store(csv_path)
+        store.sync_from_csv(csv_path)  # The CSV may have been written by another worker process
+        if not store.columns():
+            return jsonify({"error": "No export has been stored yet!"}), 404
+
+        params = request.args.to_dict()
+        try:
+            limit = int(params.pop("limit", 100))
+            offset = int(params.pop("offset", 0))
+            filters = store.parse_filters(params)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        return send_file(CSV_FILE_PATH, as_attachment=True)
+        rows, total = store.query(filters, limit=limit, offset=offset)
+        body = {"total": total, "offset": offset, "count": len(rows), "participants": rows}
+        if offset + len(rows) < total:
+            body["next_offset"] = offset + len(rows)
+        return jsonify(body), 200
     except Exception as e:
+        logger.exception("Participant query failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def query_people(csv_path):
+    """Answers a paginated query over the per-person aggregate of `csv_path`.
+
+    Filters: `emailAddress` (normalized) and `marketingConsent`; plus `limit` and `offset`.
+    """
+    if not os.path.exists(csv_path):
+        return jsonify({"error": "CSV file not found!"}), 404
+    try:
+        try:
+            limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+            offset = max(0, int(request.args.get("offset", 0)))
+        except ValueError:
+            return jsonify({"error": "limit and offset must be integers"}), 400
+        email = request.args.get("emailAddress")
+        consent = request.args.get("marketingConsent")
+
+        path = aggregated_export(csv_path, field_mapping.boolean_fields, AGGREGATE_MAX_MEMORY_ENTRIES)
+        people = []
+        total = 0
+        for person in read_people_rows(path):
+            if email is not None and person["emailAddress"] != normalize_email(email):
+                continue
+            if consent is not None and person["marketingConsent"] != (consent.lower() in ("1", "true", "yes")):
+                continue
+            if offset <= total < offset + limit:
+                people.append(person)
+            total += 1
+
+        body = {"total": total, "offset": offset, "count": len(people), "people": people}
+        if offset + len(people) < total:
+            body["next_offset"] = offset + len(people)
+        return jsonify(body), 200
+    except Exception as e:
+        logger.exception("People query failed: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/people", methods=["GET"])
+def list_people():
+    """Endpoint listing participants merged by email, with event counts and attendance rates"""
+    return query_people(CSV_FILE_PATH)
+
+@app.route("/participants", methods=["GET"])
+def list_participants():
+    """Endpoint querying the latest export, e.g. ?eventType=b2b&marketingConsent=true&limit=100"""
+    return query_participants(CSV_FILE_PATH)
+
+@app.route("/csv-versions", methods=["GET"])
+def list_csv_versions():
+    """Endpoint listing the stored export versions, newest first"""
+    return jsonify({"versions": build_exporter().list_versions()}), 200
+
+def lookup_tenant(tenant_id):
+    """Returns the configured tenant with this id, or None (also when multi-tenant mode is off)."""
+    if tenant_registry is None:
+        return None
+    return tenant_registry.get(tenant_id)
+
+@app.route("/tenants/<tenant_id>/fetch-participant-info", methods=["GET"])
+def fetch_tenant_participant_info(tenant_id):
+    """Endpoint to generate and save one tenant's CSV with that tenant's credentials."""
+    tenant = lookup_tenant(tenant_id)
+    if tenant is None:
+        return jsonify({"error": "Tenant not found!"}), 404
+    try:
+        event_filter = request_event_filter()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    processor = None
+    try:
+        with tenant.export_slot():
+            logger.info("Fetching participant info for tenant %s...", tenant.id)
+            client = tenant_registry.client(tenant)
+            circuit_error = open_circuit_error(client)
+            if circuit_error is not None:
+                return last_good_export(export_path(tenant.csv_path, event_filter), circuit_error)
+            processor = build_processor(
+                incremental=is_incremental(), client=client, snapshot_path=tenant.snapshot_path,
+                event_filter=event_filter, failure_policy=request_failure_policy(),
+            )
+            message = build_exporter(tenant.csv_path, event_filter).save_to_csv(processor.iter_rows())
+            stored_rows = ingest_export(tenant.csv_path, event_filter)
+        return jsonify({
+            "message": message,
+            "download": export_url(f"/tenants/{tenant.id}/download-csv", event_filter),
+            "stored_rows": stored_rows,
+            "failed_events": processor.failed_events,
+            "partial": bool(processor.failed_events),
+            "filter": event_filter.to_dict() if event_filter else None,
+            "events_filtered": processor.events_filtered,
+            "upstream": client.stats,
+            "sync": processor.sync_stats,
+        }), 200
+    except TenantBusy as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": "5"}
+    except CircuitOpenError as e:
+        return last_good_export(export_path(tenant.csv_path, event_filter), e)
+    except Exception as e:
+        if processor is not None and processor.failed_events:
+            return failed_export(processor, e)
+        logger.exception("Error for tenant %s: %s", tenant.id, e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/tenants/<tenant_id>/download-csv", methods=["GET"])
+def download_tenant_csv(tenant_id):
+    """Endpoint to download one tenant's CSV; accepts the same parameters as /download-csv."""
+    tenant = lookup_tenant(tenant_id)
+    if tenant is None:
+        return jsonify({"error": "Tenant not found!"}), 404
+    return send_export(tenant.csv_path)
+
+@app.route("/tenants/<tenant_id>/csv-versions", methods=["GET"])
+def list_tenant_csv_versions(tenant_id):
+    """Endpoint listing one tenant's stored export versions, newest first"""
+    tenant = lookup_tenant(tenant_id)
+    if tenant is None:
+        return jsonify({"error": "Tenant not found!"}), 404
+    return jsonify({"versions": build_exporter(tenant.csv_path).list_versions()}), 200
+
+@app.route("/tenants/<tenant_id>/participants", methods=["GET"])
+def list_tenant_participants(tenant_id):
+    """Endpoint querying one tenant's latest export; accepts the same parameters as /participants."""
+    tenant = lookup_tenant(tenant_id)
+    if tenant is None:
+        return jsonify({"error": "Tenant not found!"}), 404
+    return query_participants(tenant.csv_path)
+
+@app.route("/tenants/<tenant_id>/people", methods=["GET"])
+def list_tenant_people(tenant_id):
+    """Endpoint listing one tenant's participants merged by email; accepts the same parameters as /people."""
+    tenant = lookup_tenant(tenant_id)
+    if tenant is None:
+        return jsonify({"error": "Tenant not found!"}), 404
+    return query_people(tenant.csv_path)
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness probe: credentials are configured, the export directory is writable and the
+    worker is not shutting down"""
+    checks = {
+        "credentials": bool(USERNAME and PASSWORD) or bool(tenant_registry),
+        "output_writable": os.access(os.path.dirname(CSV_FILE_PATH), os.W_OK),
+        "accepting_jobs": job_manager.accepting,
+    }
+    ready = all(checks.values())
+    return jsonify({"status": "ready" if ready else "not ready", "checks": checks}), 200 if ready else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint: counters and histograms of every worker, gauges of this one"""
+    text = metrics_directory.render() if metrics_directory else REGISTRY.render()
+    return Response(text, mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0")
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    app.run(debug=FLASK_DEBUG, host="0.0.0.0")
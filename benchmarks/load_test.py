@@ -0,0 +1,156 @@
+"""Concurrent load test of the HTTP server against the local mock Luxid API.
+
+    python -m benchmarks.load_test --server gunicorn --concurrency 16 --duration 20 \\
+        --path /fetch-participant-info --path /download-csv
+
+Starts the mock upstream and the app (under gunicorn with gunicorn.conf.py, or the Flask
+development server), then drives the given paths from --concurrency client threads and prints
+throughput, latency percentiles and status codes per path as JSON.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.mock_luxid_server import MockLuxidServer
+from benchmarks.run_benchmarks import percentile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def server_command(kind, port):
+    if kind == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "wsgi:app"]
+    return [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port), "--no-reload"]
+
+def wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"Server exited with code {process.returncode}")
+        try:
+            if requests.get(base_url + "/healthz", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise Exception("Server did not become healthy in time")
+
+def drive(base_url, paths, concurrency, duration):
+    """Hits `paths` round-robin from `concurrency` threads for `duration` seconds."""
+    results = {path: {"latencies": [], "statuses": {}} for path in paths}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        session = requests.Session()
+        position = index
+        while time.monotonic() < deadline:
+            path = paths[position % len(paths)]
+            position += 1
+            started = time.perf_counter()
+            try:
+                status = session.get(base_url + path, timeout=120).status_code
+            except requests.RequestException:
+                status = "error"
+            elapsed = time.perf_counter() - started
+            with lock:
+                results[path]["latencies"].append(elapsed)
+                results[path]["statuses"][str(status)] = results[path]["statuses"].get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    report = {}
+    for path, result in results.items():
+        latencies = result["latencies"]
+        if not latencies:
+            continue
+        report[path] = {
+            "requests": len(latencies),
+            "requests_per_sec": round(len(latencies) / wall, 1),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 1),
+                "p95": round(percentile(latencies, 0.95) * 1000, 1),
+                "p99": round(percentile(latencies, 0.99) * 1000, 1),
+                "max": round(max(latencies) * 1000, 1),
+            },
+            "status_codes": result["statuses"],
+        }
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app server against a mock Luxid API.")
+    parser.add_argument("--server", default="gunicorn", choices=["gunicorn", "dev"])
+    parser.add_argument("--web-workers", type=int, help="WEB_WORKERS for gunicorn")
+    parser.add_argument("--web-threads", type=int, help="WEB_THREADS for gunicorn")
+    parser.add_argument("--path", action="append", help="path to request (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--participants", type=int, default=20, help="participants per event")
+    parser.add_argument("--latency", type=float, default=0.02, help="upstream latency per request, seconds")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="FETCH_MAX_WORKERS")
+    args = parser.parse_args(argv)
+    paths = args.path or ["/fetch-participant-info", "/download-csv"]
+
+    with MockLuxidServer(events=args.events, participants=args.participants, latency=args.latency) as upstream, \
+            tempfile.TemporaryDirectory() as tmp_dir:
+        port = free_port()
+        env = dict(
+            os.environ,
+            LUXID_API_USERNAME="bench",
+            LUXID_API_PASSWORD="bench",
+            LUXID_API_BASE_URL=upstream.base_url,
+            FETCH_MAX_WORKERS=str(args.fetch_workers),
+            SNAPSHOT_FILE_PATH=os.path.join(tmp_dir, "snapshots.json"),
+            CSV_OUTPUT_PATH=os.path.join(tmp_dir, "participants.csv"),
+            CSV_KEEP_VERSIONS="0",
+            LOG_LEVEL="WARNING",
+        )
+        if args.web_workers:
+            env["WEB_WORKERS"] = str(args.web_workers)
+        if args.web_threads:
+            env["WEB_THREADS"] = str(args.web_threads)
+
+        process = subprocess.Popen(
+            server_command(args.server, port), cwd=ROOT_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            wait_ready(base_url, process)
+            # Make sure /download-csv has something to serve from the first request on
+            requests.get(base_url + "/fetch-participant-info", timeout=120)
+            report = drive(base_url, paths, args.concurrency, args.duration)
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+
+    print(json.dumps({
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "upstream": {"events": args.events, "participants": args.participants, "latency_s": args.latency},
+        "paths": report,
+    }, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
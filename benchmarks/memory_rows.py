@@ -0,0 +1,102 @@
+"""Memory and CSV-write cost of dict rows versus compact ParticipantRow rows.
+
+    python -m benchmarks.memory_rows --events 200 --participants 500
+
+Builds the same synthetic export twice (mock API payloads, real field mapping) and reports the
+bytes allocated per row, as traced by tracemalloc, and the time to write each set as CSV.
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.mock_luxid_server import EVENT_TYPES, make_participants
+from services.csv_exporter import CSVExporter
+from services.field_mapping import FieldMapping
+from services.rows import EventInfo, ParticipantRow, RowLayout
+
+def dict_rows(field_mapping, payloads):
+    """Rows as built before ParticipantRow: one dict per participant, event fields repeated in each."""
+    index = field_mapping.event_index()
+    rows = []
+    for event_id, start_time, end_time, event_type, participants in payloads:
+        for participant_data in participants.values():
+            rows.append({
+                "eventId": event_id,
+                "eventStartTime": start_time,
+                "eventEndTime": end_time,
+                "eventType": event_type,
+                **index.extract(participant_data),
+                "willAttend": bool(participant_data.get("will_attend", False)),
+                "didAttend": bool(participant_data.get("did_attend", False)),
+            })
+    return rows
+
+def compact_rows(field_mapping, payloads):
+    index = field_mapping.event_index()
+    layout = RowLayout(field_mapping.columns + ("willAttend", "didAttend"), field_mapping.fieldnames)
+    rows = []
+    for event_id, start_time, end_time, event_type, participants in payloads:
+        event = EventInfo(event_id, start_time, end_time, event_type)
+        for participant_data in participants.values():
+            values = index.extract_values(participant_data)
+            values.append(bool(participant_data.get("will_attend", False)))
+            values.append(bool(participant_data.get("did_attend", False)))
+            rows.append(ParticipantRow(event, layout, tuple(values)))
+    return rows
+
+def measure(build, field_mapping, payloads):
+    """Returns (rows, bytes still allocated by the rows once built)."""
+    gc.collect()
+    tracemalloc.start()
+    rows = build(field_mapping, payloads)
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, allocated
+
+def write_seconds(field_mapping, rows):
+    with tempfile.TemporaryDirectory() as directory:
+        exporter = CSVExporter(os.path.join(directory, "rows.csv"), fieldnames=field_mapping.fieldnames)
+        started = time.perf_counter()
+        exporter.save_to_csv(rows)
+        return time.perf_counter() - started
+
+def run(events, participants):
+    field_mapping = FieldMapping()
+    payloads = []
+    for index in range(events):
+        start_time = 1736929800 + index * 3600
+        payloads.append((
+            f"{index:024x}",
+            time.strftime("%m-%d-%Y %H:%M:%S", time.gmtime(start_time)),
+            time.strftime("%m-%d-%Y %H:%M:%S", time.gmtime(start_time + 7200)),
+            EVENT_TYPES[index % len(EVENT_TYPES)],
+            make_participants(index, participants),
+        ))
+
+    report = {"events": events, "participants_per_event": participants}
+    for name, build in (("dict", dict_rows), ("compact", compact_rows)):
+        rows, allocated = measure(build, field_mapping, payloads)
+        report[name] = {
+            "rows": len(rows),
+            "bytes_per_row": round(allocated / max(1, len(rows)), 1),
+            "total_mb": round(allocated / 1024 / 1024, 2),
+            "csv_write_s": round(write_seconds(field_mapping, rows), 3),
+        }
+        del rows
+    report["memory_saved"] = round(1 - report["compact"]["bytes_per_row"] / report["dict"]["bytes_per_row"], 3)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory used by dict and compact export rows.")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--participants", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(run(args.events, args.participants), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Local stand-in for the Luxid API serving synthetic events and participants.
+
+Run standalone with:  python -m benchmarks.mock_luxid_server --events 200 --participants 50
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+PARTICIPANTS_PATH = re.compile(r"^/events/(\d+)/participants/?$")
+EVENT_TYPES = ["B2B", "B2C", "Conference"]
+
+def make_event(base_url, index):
+    """Builds one event entry in the shape returned by GET /events."""
+    start_time = 1736929800 + index * 3600
+    return {
+        f"{index:024x}": {
+            "start_time": start_time,
+            "end_time": start_time + 7200,
+            "custom": {
+                "3333": {
+                    "id": 3333,
+                    "title": "Event type",
+                    "value": {"22222": {"id": 22222, "value": EVENT_TYPES[index % len(EVENT_TYPES)]}},
+                }
+            },
+            "participants_url": f"{base_url}/events/{index}/participants",
+        }
+    }
+
+def make_participants(event_index, count):
+    """Builds the participants payload of one event; deterministic per event index."""
+    rng = random.Random(event_index)
+    participants = {}
+    for number in range(count):
+        participant_id = str(event_index * 1_000_000 + number)
+        person = rng.randrange(count * 4)  # people overlap across events
+        participants[participant_id] = {
+            "answers": {
+                "firstname": {"answer": f"First{person}"},
+                "lastname": {"answer": f"Last{person}"},
+                "email": {"answer": f"person{person}@example.com"},
+                "98765432": {"question": "Order newsletter", "answer": {"1": {"choice": rng.choice(["Yes.", "No."])}}},
+            },
+            "privacy_answers": [{"privacy_policy_id": rng.choice([7295, 1015]), "answer": 1}],
+            "will_attend": rng.randrange(2),
+            "did_attend": rng.randrange(2),
+        }
+    return participants
+
+def filter_events(events, query):
+    """Applies the listing filters a Luxid API could support (start_time_from/to, event_type, event_id)."""
+    def first(name):
+        return query.get(name, [None])[0]
+
+    start_from, start_to = first("start_time_from"), first("start_time_to")
+    event_types = first("event_type")
+    event_ids = first("event_id")
+    selected = []
+    for event in events:
+        (event_id, data), = event.items()
+        event_type = next(iter(data["custom"]["3333"]["value"].values()))["value"].lower()
+        if start_from is not None and data["start_time"] < int(start_from):
+            continue
+        if start_to is not None and data["start_time"] >= int(start_to):
+            continue
+        if event_types is not None and event_type not in event_types.split(","):
+            continue
+        if event_ids is not None and event_id not in event_ids.split(","):
+            continue
+        selected.append(event)
+    return selected
+
+class MockLuxidServer:
+    """Threaded HTTP server emulating /login, /events and participant URLs.
+
+    `latency` (seconds, plus up to `jitter`) is added to every response and `error_rate` is the
+    probability of answering 503 instead. With `max_concurrency`, GETs beyond that many in flight
+    are answered 429. Counters of served requests are kept in `stats`.
+    """
+
+    def __init__(self, events=10, participants=10, latency=0.0, jitter=0.0, error_rate=0.0,
+                 host="127.0.0.1", port=0, seed=0, max_concurrency=0):
+        self.events = events
+        self.participants = participants
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.rng = random.Random(seed)
+        self.tokens = set()
+        self.stats = {"login": 0, "events": 0, "participants": 0, "errors": 0, "throttled": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-luxid", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _should_fail(self):
+        with self._lock:
+            return self.rng.random() < self.error_rate
+
+    def _enter(self):
+        """Counts a GET in flight; returns False when it exceeds max_concurrency."""
+        with self._lock:
+            self.in_flight += 1
+            return not self.max_concurrency or self.in_flight <= self.max_concurrency
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self.rng.uniform(0, self.jitter)
+            time.sleep(self.latency + extra)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is measurable
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload=None):
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self):
+                header = self.headers.get("Authorization", "")
+                return header.startswith("Bearer ") and header[len("Bearer "):] in server.tokens
+
+            def do_POST(self):
+                server._delay()
+                if self.path != "/login" or not self.headers.get("Authorization", "").startswith("Basic "):
+                    return self._send(401)
+                server._count("login")
+                token = uuid.uuid4().hex
+                with server._lock:
+                    server.tokens.add(token)
+                self._send(200, {"token": token})
+
+            def do_GET(self):
+                admitted = server._enter()
+                try:
+                    server._delay()
+                    if not admitted:
+                        server._count("throttled")
+                        return self._send(429)
+                    self._get()
+                finally:
+                    server._leave()
+
+            def _get(self):
+                if not self._authorized():
+                    return self._send(401)
+                if server._should_fail():
+                    server._count("errors")
+                    return self._send(503)
+
+                path, _, query = self.path.partition("?")
+                if path.rstrip("/") == "/events":
+                    server._count("events")
+                    events = [make_event(server.base_url, index) for index in range(server.events)]
+                    return self._send(200, filter_events(events, parse_qs(query)))
+
+                match = PARTICIPANTS_PATH.match(self.path)
+                if match and int(match.group(1)) < server.events:
+                    server._count("participants")
+                    return self._send(200, make_participants(int(match.group(1)), server.participants))
+                self._send(404)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Luxid API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--participants", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503 per GET")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="answer 429 beyond this many GETs in flight")
+    args = parser.parse_args()
+
+    server = MockLuxidServer(args.events, args.participants, args.latency, args.jitter, args.error_rate,
+                             host=args.host, port=args.port, max_concurrency=args.max_concurrency)
+    print(f"Mock Luxid API listening on {server.base_url}", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""End-to-end benchmarks of /fetch-participant-info against the local mock Luxid API.
+
+    python -m benchmarks.run_benchmarks --events 500 --participants 100 --latency 0.02 --workers 1,8,32 \\
+        --output bench_results.json [--compare previous.json]
+
+Each scenario runs in a fresh spawned process so peak RSS is measured per scenario. Results are
+written as JSON; --compare reports changes against an earlier results file and exits with 1 when
+a scenario regressed by more than --max-regression.
+"""
+import argparse
+import functools
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.mock_luxid_server import MockLuxidServer
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class StageTimer:
+    """Accumulates call counts and wall time per pipeline stage across threads."""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "total_ms": 0.0})
+            stage["calls"] += 1
+            stage["total_ms"] += seconds * 1000
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - started)
+        return timed
+
+    def wrap_csv_write(self, save_to_csv):
+        """Times save_to_csv excluding the time spent producing its rows (fetching/extracting)."""
+        timer = self
+
+        @functools.wraps(save_to_csv)
+        def timed(exporter, data):
+            producing = [0.0]
+
+            def rows():
+                iterator = iter(data)
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        row = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        producing[0] += time.perf_counter() - started
+                    yield row
+
+            started = time.perf_counter()
+            try:
+                return save_to_csv(exporter, rows())
+            finally:
+                timer.add("csv_write", time.perf_counter() - started - producing[0])
+        return timed
+
+def configure_pipeline(scenario):
+    """Applies the scenario's worker count, failure policy and parsing mode to the processors the app builds.
+
+    The app builds processors through services.pipeline, which reads these settings from its own
+    module globals.
+    """
+    from services import pipeline
+
+    pipeline.FETCH_MAX_WORKERS = scenario["workers"]
+    pipeline.FETCH_FAILURE_POLICY = scenario["failure_policy"]
+    pipeline.STREAM_JSON = scenario["streaming"]
+
+def run_scenario(scenario):
+    """Runs one scenario in the current process and returns its measurements."""
+    os.environ.setdefault("LUXID_API_USERNAME", "bench")
+    os.environ.setdefault("LUXID_API_PASSWORD", "bench")
+
+    import app as app_module
+    from services.csv_exporter import CSVExporter
+    from services.event_processor import EventProcessor
+    from services.rate_limiter import AdaptiveConcurrencyLimiter
+
+    timer = StageTimer()
+    client = app_module.api_client
+    client.API_BASE_URL = scenario["base_url"]
+    if scenario.get("adaptive"):
+        client.concurrency_limiter = AdaptiveConcurrencyLimiter(max_limit=max(scenario["workers"], 1))
+    for method in ("authenticate", "fetch_events", "fetch_participants", "iter_events", "iter_participants"):
+        setattr(client, method, timer.wrap(method, getattr(client, method)))
+    EventProcessor.build_rows = timer.wrap("extract_rows", EventProcessor.build_rows)
+    CSVExporter.save_to_csv = timer.wrap_csv_write(CSVExporter.save_to_csv)
+
+    configure_pipeline(scenario)
+
+    latencies = []
+    statuses = {}
+    rows = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app_module.CSV_FILE_PATH = os.path.join(tmp_dir, "participants.csv")
+        app_module.CSV_KEEP_VERSIONS = 0
+        test_client = app_module.app.test_client()
+
+        for _ in range(scenario["repeat"]):
+            started = time.perf_counter()
+            response = test_client.get("/fetch-participant-info")
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                with open(app_module.CSV_FILE_PATH, encoding="utf-8") as csvfile:
+                    rows = sum(1 for _ in csvfile) - 1
+
+    total = sum(latencies)
+    return {
+        "name": scenario["name"],
+        "params": {key: value for key, value in scenario.items() if key not in ("name", "base_url")},
+        "rows": rows,
+        "rows_per_sec": round(rows * len(latencies) / total, 1) if total else None,
+        "latency_ms": {
+            "min": round(min(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+            "mean": round(total / len(latencies) * 1000, 2),
+        },
+        "status_codes": {str(code): count for code, count in statuses.items()},
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1),
+        "stages": {
+            name: {"calls": stage["calls"], "total_ms": round(stage["total_ms"], 2)}
+            for name, stage in sorted(timer.stages.items())
+        },
+        "upstream": client.stats,
+        "concurrency_limiter": client.concurrency_limiter.snapshot() if client.concurrency_limiter else None,
+    }
+
+def run_isolated(scenario):
+    """Runs a scenario in a fresh spawned interpreter so its peak RSS is its own."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_scenario, (scenario,))
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline, max_regression):
+    """Prints per-scenario changes against a baseline; returns the names of regressed scenarios."""
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressed = []
+    for result in current["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        p50_change = result["latency_ms"]["p50"] / before["latency_ms"]["p50"] - 1
+        rss_change = result["peak_rss_kb"] / before["peak_rss_kb"] - 1
+        print(f"{result['name']}: p50 {p50_change:+.1%}, peak RSS {rss_change:+.1%}")
+        if p50_change > max_regression or rss_change > max_regression:
+            regressed.append(result["name"])
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /fetch-participant-info against a mock Luxid API.")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--participants", type=int, default=50, help="participants per event")
+    parser.add_argument("--latency", type=float, default=0.01, help="upstream latency per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", default="1,8", help="comma-separated FETCH_MAX_WORKERS values")
+    parser.add_argument("--failure-policy", default="abort", choices=["abort", "skip", "retry"])
+    parser.add_argument("--streaming", action="store_true", help="enable STREAM_JSON parsing")
+    parser.add_argument("--upstream-max-concurrency", type=int, default=0,
+                        help="mock answers 429 beyond this many requests in flight (0 = unlimited)")
+    parser.add_argument("--adaptive", action="store_true", help="enable AIMD adaptive upstream concurrency")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    parser.add_argument("--in-process", action="store_true", help="skip per-scenario processes (shared RSS)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with MockLuxidServer(args.events, args.participants, args.latency, args.jitter, args.error_rate,
+                         max_concurrency=args.upstream_max_concurrency) as server:
+        for workers in [int(value) for value in args.workers.split(",")]:
+            scenario = {
+                "name": f"events={args.events},participants={args.participants},workers={workers}"
+                        f"{',streaming' if args.streaming else ''}{',adaptive' if args.adaptive else ''}",
+                "base_url": server.base_url,
+                "events": args.events,
+                "participants": args.participants,
+                "latency": args.latency,
+                "error_rate": args.error_rate,
+                "workers": workers,
+                "failure_policy": args.failure_policy,
+                "streaming": args.streaming,
+                "adaptive": args.adaptive,
+                "upstream_max_concurrency": args.upstream_max_concurrency,
+                "repeat": args.repeat,
+            }
+            result = run_scenario(scenario) if args.in_process else run_isolated(scenario)
+            print(f"{result['name']}: p50 {result['latency_ms']['p50']} ms, "
+                  f"{result['rows_per_sec']} rows/s, peak RSS {result['peak_rss_kb']} KiB", flush=True)
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}", flush=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            regressed = compare(report, json.load(baseline_file), args.max_regression)
+        if regressed:
+            print(f"Regressions: {', '.join(regressed)}", flush=True)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
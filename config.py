@@ -2,4 +2,100 @@ import os
 
 USERNAME = os.getenv("LUXID_API_USERNAME")
 PASSWORD = os.getenv("LUXID_API_PASSWORD")
-API_BASE_URL = "https://recruiment-api-1069519412575.europe-west3.run.app"
+API_BASE_URL = os.getenv("LUXID_API_BASE_URL", "https://recruiment-api-1069519412575.europe-west3.run.app")
+
+# Participant fetching: 1 worker keeps the serial behaviour; failure policy is one of abort, skip, retry
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "1"))
+FETCH_FAILURE_POLICY = os.getenv("FETCH_FAILURE_POLICY", "abort")
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "2"))
+
+# Upstream HTTP: pooled keep-alive session, timeouts in seconds, retries on 429/5xx with exponential backoff
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+# Seconds before token expiry at which a background refresh is started
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "60"))
+
+# Incremental sync: reuse an event's last rows when its participants answer 304 Not Modified to the stored ETag/Last-Modified
+INCREMENTAL_SYNC = os.getenv("INCREMENTAL_SYNC", "false").lower() in ("1", "true", "yes")
+SNAPSHOT_FILE_PATH = os.getenv("SNAPSHOT_FILE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots.json"))
+
+# Also send export filters (start, end, eventType, eventId) to GET /events as query parameters; events are filtered locally either way
+UPSTREAM_EVENT_FILTERS = os.getenv("UPSTREAM_EVENT_FILTERS", "false").lower() in ("1", "true", "yes")
+
+# Background export jobs (POST /export-jobs)
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "1"))
+# Job records shared by the worker processes of this host, so any of them reports a job and deduplicates it
+EXPORT_JOB_DIR = os.getenv("EXPORT_JOB_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "export_jobs"))
+
+# Counters and histograms of every worker process of this host, merged by /metrics (empty keeps them per process)
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics"))
+
+# Where the exported CSV is written (defaults to participants.csv in the app directory)
+CSV_OUTPUT_PATH = os.getenv("CSV_OUTPUT_PATH")
+
+# Number of past CSV exports kept under exports/ next to the CSV (0 disables versioning)
+CSV_KEEP_VERSIONS = int(os.getenv("CSV_KEEP_VERSIONS", "5"))
+
+# Optional JSON file adding answer/privacy column mappings on top of the built-in ones
+FIELD_MAPPING_FILE = os.getenv("FIELD_MAPPING_FILE")
+
+# Response cache for /events and participant pages (TTL 0 disables it)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "0"))
+RESPONSE_CACHE_STALE_TTL = float(os.getenv("RESPONSE_CACHE_STALE_TTL", "0"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR")  # Set to persist cached responses on disk
+
+# Bearer tokens and cached responses shared by all worker processes: a directory on this host (flock-locked files),
+# or a redis:// URL shared by every replica (needs the redis package). Unset keeps them per process.
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR")
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL")
+
+# Parse upstream bodies incrementally and hand records to the processor as they arrive
+STREAM_JSON = os.getenv("STREAM_JSON", "false").lower() in ("1", "true", "yes")
+
+# Allow /fetch-participant-info?profile=true to return a cProfile summary
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Logging: level, and per-message-template rate limit (records/second and burst) for sub-WARNING records
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_RATE_LIMIT = float(os.getenv("LOG_RATE_LIMIT", "10"))
+LOG_RATE_BURST = int(os.getenv("LOG_RATE_BURST", "20"))
+
+# Production serving (gunicorn.conf.py): worker processes, threads per worker and timeouts in seconds
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "2"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "300"))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "60"))
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "false").lower() in ("1", "true", "yes")
+
+# Multi-tenant mode: JSON file listing tenants (credentials, output dir, export limit); unset serves the single account above
+TENANTS_FILE = os.getenv("TENANTS_FILE")
+TENANT_OUTPUT_ROOT = os.getenv("TENANT_OUTPUT_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tenants"))
+TENANT_MAX_CLIENTS = int(os.getenv("TENANT_MAX_CLIENTS", "64"))  # Idle tenant clients kept open
+
+# Upstream request rate (requests/second, 0 = unlimited) and burst, and AIMD adaptive concurrency per account
+UPSTREAM_RATE_LIMIT = float(os.getenv("UPSTREAM_RATE_LIMIT", "0"))
+UPSTREAM_RATE_BURST = int(os.getenv("UPSTREAM_RATE_BURST", "10"))
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "false").lower() in ("1", "true", "yes")
+ADAPTIVE_CONCURRENCY_INITIAL = int(os.getenv("ADAPTIVE_CONCURRENCY_INITIAL", "4"))
+ADAPTIVE_CONCURRENCY_MIN = int(os.getenv("ADAPTIVE_CONCURRENCY_MIN", "1"))
+ADAPTIVE_CONCURRENCY_MAX = int(os.getenv("ADAPTIVE_CONCURRENCY_MAX", "64"))
+ADAPTIVE_LATENCY_TOLERANCE = float(os.getenv("ADAPTIVE_LATENCY_TOLERANCE", "2.0"))
+
+# Circuit breaker per account: open after this many consecutive failed upstream calls (0 disables it),
+# then let a probe through after CIRCUIT_RESET_TIMEOUT seconds
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Load every export into an indexed SQLite store next to the CSV (queried via /participants)
+PARTICIPANT_STORE_ENABLED = os.getenv("PARTICIPANT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# People kept in memory while aggregating by email before merging them into a temporary SQLite table
+AGGREGATE_MAX_MEMORY_ENTRIES = int(os.getenv("AGGREGATE_MAX_MEMORY_ENTRIES", "200000"))
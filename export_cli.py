@@ -0,0 +1,189 @@
+"""Runs one export without the web server, e.g. from cron:
+
+    python export_cli.py --workers 8 --format parquet --output /data/participants.parquet \\
+        --start 2025-01-01 --end 2025-02-01 --event-type b2b --incremental
+
+Credentials and defaults come from the same environment variables as the app (config.py).
+A JSON summary is printed to stdout; logs go to stderr.
+
+Exit codes:
+    0  export written
+    1  export failed (upstream or write error)
+    2  invalid arguments
+    3  configuration error (missing credentials, format unavailable)
+    4  export written, but some events were skipped by the failure policy
+    5  no participants matched; nothing was written
+    130 interrupted
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+from itertools import chain
+
+from services.csv_exporter import CSVExporter
+from services.event_filter import EventFilter, parse_time
+from services.event_processor import FAILURE_POLICIES
+from services.logging_setup import configure_logging
+from services.pipeline import build_processor, load_field_mapping, make_client, make_response_cache, make_shared_token_cache
+from config import (
+    USERNAME, PASSWORD, FETCH_MAX_WORKERS, FETCH_FAILURE_POLICY, INCREMENTAL_SYNC, SNAPSHOT_FILE_PATH,
+    CSV_OUTPUT_PATH, CSV_KEEP_VERSIONS, LOG_LEVEL, LOG_RATE_LIMIT, LOG_RATE_BURST,
+)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CONFIG = 3
+EXIT_PARTIAL = 4
+EXIT_NO_DATA = 5
+EXIT_INTERRUPTED = 130
+
+logger = logging.getLogger("export_cli")
+
+DEFAULT_OUTPUT = CSV_OUTPUT_PATH or os.path.join(os.path.dirname(os.path.abspath(__file__)), "participants.csv")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export Luxid participants without starting the web server.")
+    parser.add_argument("--workers", type=int, default=FETCH_MAX_WORKERS, help="events fetched concurrently")
+    parser.add_argument("--format", default="csv",
+                        help="csv (default), csv.gz, ndjson, parquet or arrow (the columnar formats need pyarrow)")
+    parser.add_argument("--output", help=f"file to write; required for formats other than csv and for filtered exports (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--incremental", action=argparse.BooleanOptionalAction, default=INCREMENTAL_SYNC,
+                        help="re-fetch only events that changed since the last run")
+    parser.add_argument("--snapshot-file", default=SNAPSHOT_FILE_PATH, help="incremental sync state")
+    parser.add_argument("--failure-policy", choices=sorted(FAILURE_POLICIES), default=FETCH_FAILURE_POLICY)
+    parser.add_argument("--start", help="only events starting at or after this time (Unix timestamp, YYYY-MM-DD or ISO 8601)")
+    parser.add_argument("--end", help="only events starting before this time")
+    parser.add_argument("--event-type", action="append", dest="event_types", metavar="TYPE",
+                        help="only events of this type (b2b, b2c, Invalid); repeatable")
+    parser.add_argument("--event-id", action="append", dest="event_ids", metavar="ID", help="only this event; repeatable")
+    parser.add_argument("--log-level", default=LOG_LEVEL)
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    try:
+        args.event_filter = EventFilter(
+            start=parse_time(args.start) if args.start else None,
+            end=parse_time(args.end) if args.end else None,
+            event_types=args.event_types,
+            event_ids=args.event_ids,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output is None:
+        # The default is the app's full CSV; other formats or a filtered export would overwrite it
+        # (or the app's cached conversions) with something else
+        if args.format != "csv":
+            parser.error(f"--output is required with --format {args.format}")
+        if args.event_filter:
+            parser.error("--output is required with --start, --end, --event-type or --event-id")
+        args.output = DEFAULT_OUTPUT
+    return args
+
+def exporter_for(export_format):
+    """Returns the Exporter class of a derived format; imported lazily to keep CSV runs fast to start."""
+    from services.exporters import EXPORT_FORMATS, ExportFormatUnavailable
+
+    exporter_cls = EXPORT_FORMATS.get(export_format)
+    if exporter_cls is None:
+        raise ValueError(f"Unknown format: {export_format}")
+    if not exporter_cls.available():
+        raise ExportFormatUnavailable(f"Export format '{export_format}' is not available (missing dependency).")
+    return exporter_cls
+
+def write_export(rows, output, exporter_cls, fieldnames):
+    """Writes `rows` to `output` with a derived-format exporter, atomically like CSVExporter."""
+    fd, tmp_name = tempfile.mkstemp(suffix=f"{exporter_cls.extension}.tmp", dir=os.path.dirname(output))
+    os.close(fd)
+    try:
+        exporter_cls().write(rows, tmp_name, fieldnames)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, output)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+def run(args):
+    """Runs the export described by `args` and returns (exit code, summary)."""
+    output = os.path.abspath(args.output)
+    if not (USERNAME and PASSWORD):
+        return EXIT_CONFIG, {"error": "LUXID_API_USERNAME and LUXID_API_PASSWORD must be set."}
+    exporter_cls = None
+    if args.format != "csv":
+        try:
+            exporter_cls = exporter_for(args.format)
+        except ValueError as e:
+            return EXIT_USAGE, {"error": str(e)}
+        except Exception as e:
+            return EXIT_CONFIG, {"error": str(e)}
+
+    field_mapping = load_field_mapping()
+    # With a shared cache configured, the token and responses of the web workers are reused
+    client = make_client(USERNAME, PASSWORD, token_cache=make_shared_token_cache(), response_cache=make_response_cache())
+    processor = build_processor(
+        client, field_mapping,
+        incremental=args.incremental,
+        snapshot_path=args.snapshot_file,
+        max_workers=args.workers,
+        failure_policy=args.failure_policy,
+        event_filter=args.event_filter,
+    )
+
+    exported = 0
+
+    def counted(rows):
+        nonlocal exported
+        for row in rows:
+            exported += 1
+            yield row
+
+    summary = {"output": output, "format": args.format}
+    try:
+        rows = processor.iter_rows()
+        first_row = next(rows, None)  # Nothing is written (or replaced) when no participant matched
+        if first_row is not None:
+            rows = counted(chain([first_row], rows))
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            if exporter_cls is None:
+                CSVExporter(output, keep_versions=CSV_KEEP_VERSIONS, fieldnames=field_mapping.fieldnames).save_to_csv(rows)
+            else:
+                write_export(rows, output, exporter_cls, field_mapping.fieldnames)
+    except Exception as e:
+        logger.error("Export failed: %s", e)
+        summary["error"] = str(e)
+        return EXIT_FAILED, summary
+    finally:
+        client.close()
+
+    summary.update(
+        rows=exported,
+        events=processor.events_total,
+        events_filtered=processor.events_filtered,
+        filter=args.event_filter.to_dict(),
+        failed_events=processor.failed_events,
+        sync=processor.sync_stats,
+        upstream=client.stats,
+    )
+    if exported == 0:
+        if processor.failed_events:
+            summary["error"] = "Every event failed."
+            return EXIT_FAILED, summary
+        return EXIT_NO_DATA, summary
+    return (EXIT_PARTIAL if processor.failed_events else EXIT_OK), summary
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging(args.log_level, rate=LOG_RATE_LIMIT, burst=LOG_RATE_BURST, stream=sys.stderr)
+    try:
+        code, summary = run(args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    print(json.dumps(summary, indent=2, default=str))
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
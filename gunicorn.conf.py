@@ -0,0 +1,41 @@
+"""Production server settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Every value comes from config.py, so the same .env drives both the app and the server.
+"""
+from config import WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, WEB_GRACEFUL_TIMEOUT
+
+bind = WEB_BIND
+workers = WEB_WORKERS
+# Threads let one worker overlap many requests that are waiting on the upstream API
+worker_class = "gthread"
+threads = WEB_THREADS
+# Import the app (field mapping, caches, API client) once in the master and fork it into workers
+preload_app = True
+timeout = WEB_TIMEOUT
+graceful_timeout = WEB_GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+
+def on_starting(server):
+    """Drops the metrics of a previous run, so counters start from zero with the server."""
+    from wsgi import metrics_directory
+
+    if metrics_directory is not None:
+        metrics_directory.clear()
+
+def post_fork(server, worker):
+    """Shares this worker's counters and histograms with the other workers."""
+    from wsgi import metrics_directory
+
+    if metrics_directory is not None:
+        metrics_directory.start()
+
+def worker_exit(server, worker):
+    """Lets export jobs running in this worker finish before it exits."""
+    from wsgi import job_manager, metrics_directory
+
+    if not job_manager.shutdown(timeout=WEB_GRACEFUL_TIMEOUT):
+        server.log.warning("Worker %s exited with export jobs still running", worker.pid)
+    if metrics_directory is not None:
+        metrics_directory.stop()
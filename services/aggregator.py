@@ -0,0 +1,203 @@
+import csv
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+
+from services.csv_exporter import CSVExporter
+from services.exporters import read_csv_rows
+from services.field_mapping import BOOLEAN_FIELDS
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_FIELDNAMES = [
+    "emailAddress", "firstName", "lastName", "events", "willAttendCount", "attendedCount",
+    "attendanceRate", "firstEventTime", "lastEventTime", "lastEventId", "marketingConsent", "orderNewsletter",
+]
+AGGREGATE_BOOLEAN_FIELDS = {"marketingConsent"}
+AGGREGATE_INT_FIELDS = {"events", "willAttendCount", "attendedCount"}
+
+# Positions in the compact per-person record
+FIRST_NAME, LAST_NAME, EVENTS, WILL_ATTEND, ATTENDED, FIRST_KEY, LAST_KEY, LAST_EVENT_ID, CONSENT, NEWSLETTER = range(10)
+
+def normalize_email(value):
+    return (value or "").strip().lower()
+
+def time_key(value):
+    """Turns an export time ("%m-%d-%Y %H:%M:%S") into a string that sorts chronologically."""
+    if len(value or "") < 10:
+        return ""
+    return f"{value[6:10]}-{value[0:2]}-{value[3:5]}{value[10:]}"
+
+def time_value(key):
+    """Inverse of time_key()."""
+    if not key:
+        return ""
+    return f"{key[5:7]}-{key[8:10]}-{key[0:4]}{key[10:]}"
+
+_UPSERT = """
+    INSERT INTO people VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(email) DO UPDATE SET
+        first_name = CASE WHEN excluded.last_key >= last_key THEN excluded.first_name ELSE first_name END,
+        last_name = CASE WHEN excluded.last_key >= last_key THEN excluded.last_name ELSE last_name END,
+        events = events + excluded.events,
+        will_attend = will_attend + excluded.will_attend,
+        attended = attended + excluded.attended,
+        first_key = MIN(first_key, excluded.first_key),
+        last_key = MAX(last_key, excluded.last_key),
+        last_event_id = CASE WHEN excluded.last_key >= last_key THEN excluded.last_event_id ELSE last_event_id END,
+        consent = CASE WHEN excluded.last_key >= last_key THEN excluded.consent ELSE consent END,
+        newsletter = CASE WHEN excluded.last_key >= last_key THEN excluded.newsletter ELSE newsletter END
+"""
+
+class ParticipantAggregator:
+    """Merges (event, participant) rows into one record per normalized email address.
+
+    Each person keeps event, will-attend and attended counts, first/last event time, and the
+    name, consent and newsletter answer from their most recent event. Records live in a dict
+    of compact lists; past `max_entries` people the dict is merged into a temporary SQLite
+    table (keyed on email) and emptied, so memory stays bounded however many rows come in.
+    """
+
+    def __init__(self, max_entries=200_000, spill_dir=None):
+        self.max_entries = max_entries
+        self.spill_dir = spill_dir
+        self.people = {}
+        self.rows = 0
+        self.skipped = 0  # Rows without an email address
+        self.spills = 0
+        self._spill_file = None
+        self._spill = None
+
+    def add(self, row):
+        email = normalize_email(row.get("emailAddress"))
+        if not email:
+            self.skipped += 1
+            return
+        self.rows += 1
+
+        key = time_key(row.get("eventStartTime"))
+        record = self.people.get(email)
+        if record is None:
+            self.people[email] = [
+                row.get("firstName", ""), row.get("lastName", ""), 1,
+                int(bool(row.get("willAttend"))), int(bool(row.get("didAttend"))),
+                key, key, row.get("eventId", ""), int(bool(row.get("marketingConsent"))), row.get("orderNewsletter", ""),
+            ]
+            if len(self.people) > self.max_entries:
+                self._flush()
+            return
+
+        record[EVENTS] += 1
+        record[WILL_ATTEND] += bool(row.get("willAttend"))
+        record[ATTENDED] += bool(row.get("didAttend"))
+        if key < record[FIRST_KEY]:
+            record[FIRST_KEY] = key
+        if key >= record[LAST_KEY]:
+            record[LAST_KEY] = key
+            record[FIRST_NAME] = row.get("firstName", "")
+            record[LAST_NAME] = row.get("lastName", "")
+            record[LAST_EVENT_ID] = row.get("eventId", "")
+            record[CONSENT] = int(bool(row.get("marketingConsent")))
+            record[NEWSLETTER] = row.get("orderNewsletter", "")
+
+    def add_all(self, rows):
+        for row in rows:
+            self.add(row)
+        return self
+
+    def _flush(self):
+        """Merges the in-memory records into the spill table and clears them."""
+        if self._spill is None:
+            fd, self._spill_file = tempfile.mkstemp(prefix=".people-", suffix=".db", dir=self.spill_dir)
+            os.close(fd)
+            self._spill = sqlite3.connect(self._spill_file)
+            self._spill.execute("PRAGMA journal_mode=OFF")
+            self._spill.execute("PRAGMA synchronous=OFF")
+            self._spill.execute(
+                "CREATE TABLE people (email TEXT PRIMARY KEY, first_name TEXT, last_name TEXT, events INTEGER,"
+                " will_attend INTEGER, attended INTEGER, first_key TEXT, last_key TEXT, last_event_id TEXT,"
+                " consent INTEGER, newsletter TEXT)"
+            )
+        with self._spill:
+            self._spill.executemany(_UPSERT, ((email, *record) for email, record in self.people.items()))
+        self.spills += 1
+        logger.debug("Spilled %d people to %s", len(self.people), self._spill_file)
+        self.people = {}
+
+    def results(self):
+        """Yields one aggregated row per person, ordered by email."""
+        if self._spill is None:
+            records = ((email, self.people[email]) for email in sorted(self.people))
+        else:
+            if self.people:
+                self._flush()
+            cursor = self._spill.execute("SELECT * FROM people ORDER BY email")
+            records = ((record[0], record[1:]) for record in cursor)
+
+        for email, record in records:
+            events = record[EVENTS]
+            yield {
+                "emailAddress": email,
+                "firstName": record[FIRST_NAME],
+                "lastName": record[LAST_NAME],
+                "events": events,
+                "willAttendCount": record[WILL_ATTEND],
+                "attendedCount": record[ATTENDED],
+                "attendanceRate": round(record[ATTENDED] / events, 4),
+                "firstEventTime": time_value(record[FIRST_KEY]),
+                "lastEventTime": time_value(record[LAST_KEY]),
+                "lastEventId": record[LAST_EVENT_ID],
+                "marketingConsent": bool(record[CONSENT]),
+                "orderNewsletter": record[NEWSLETTER],
+            }
+
+    def close(self):
+        """Drops the spill table, if one was created."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            os.remove(self._spill_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def aggregate_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".people.csv"
+
+_aggregate_lock = threading.Lock()
+
+def aggregated_export(csv_path, boolean_fields=BOOLEAN_FIELDS, max_entries=200_000):
+    """Returns the path of the per-person aggregate of `csv_path`.
+
+    Like the other derived exports it is cached next to the CSV and rebuilt only when the CSV
+    is newer.
+    """
+    target = aggregate_path(csv_path)
+    with _aggregate_lock:
+        source_mtime = os.stat(csv_path).st_mtime_ns
+        if os.path.exists(target) and os.stat(target).st_mtime_ns == source_mtime:
+            return target
+
+        with ParticipantAggregator(max_entries, spill_dir=os.path.dirname(csv_path)) as aggregator:
+            aggregator.add_all(read_csv_rows(csv_path, boolean_fields))
+            CSVExporter(target, fieldnames=AGGREGATE_FIELDNAMES).save_to_csv(aggregator.results())
+            logger.info("Aggregated %d rows by email (%d without email, %d spills)",
+                        aggregator.rows, aggregator.skipped, aggregator.spills)
+        os.utime(target, ns=(source_mtime, source_mtime))
+        return target
+
+def read_people_rows(file_name):
+    """Yields typed rows back from an aggregated export."""
+    with open(file_name, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            for name in AGGREGATE_INT_FIELDS:
+                row[name] = int(row[name])
+            row["attendanceRate"] = float(row["attendanceRate"])
+            for name in AGGREGATE_BOOLEAN_FIELDS:
+                row[name] = row[name] == "True"
+            yield row
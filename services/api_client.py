@@ -1,73 +1,385 @@
 import base64
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+
 import requests
+from requests.adapters import HTTPAdapter
 from cachetools import TTLCache
-from config import USERNAME, PASSWORD
+from services.json_stream import iter_json_items
+from services.shared_cache import SharedTokenCache
+from services.metrics import STAGE_DURATION, TOKEN_CACHE_LOOKUPS, UPSTREAM_RESPONSES
+from config import (
+    USERNAME, PASSWORD, API_BASE_URL, HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT,
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_BACKOFF_MAX, TOKEN_REFRESH_MARGIN,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL = 60 * 15
 
 # In-memory cache for storing token
-token_cache = TTLCache(maxsize=100, ttl=60 * 15)  # 15-minute expiry for debugging
+token_cache = TTLCache(maxsize=100, ttl=TOKEN_TTL)  # 15-minute expiry for debugging
+_shared_token_cache = token_cache  # LuxidAPIClient's token_cache argument shadows the name
+
+# Monotonic expiry per username and one login lock per username, so concurrent callers share a single /login
+token_expiry = {}
+_token_locks = {}
+_token_locks_guard = threading.Lock()
+
+def _token_lock(username):
+    """Returns the lock serialising logins for the given username."""
+    with _token_locks_guard:
+        return _token_locks.setdefault(username, threading.Lock())
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+OVERLOAD_STATUS_CODES = {429, 503}
+STREAM_CHUNK_SIZE = 64 * 1024
 
 class LuxidAPIClient:
-    API_BASE_URL = "https://recruiment-api-1069519412575.europe-west3.run.app"
+    API_BASE_URL = API_BASE_URL
     LOGIN_ENDPOINT = "/login"
 
-    def __init__(self, username, password):
+    def __init__(self, username, password, pool_size=HTTP_POOL_SIZE,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), max_retries=HTTP_MAX_RETRIES,
+                 backoff_factor=HTTP_BACKOFF_FACTOR, backoff_max=HTTP_BACKOFF_MAX,
+                 refresh_margin=TOKEN_REFRESH_MARGIN, response_cache=None, token_cache=None,
+                 rate_limiter=None, concurrency_limiter=None, circuit_breaker=None):
         self.username = username
         self.password = password
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.refresh_margin = refresh_margin
+        self.response_cache = response_cache  # Optional ResponseCache for events and participant pages
+        self.rate_limiter = rate_limiter  # Optional TokenBucket applied to every upstream request
+        self.concurrency_limiter = concurrency_limiter  # Optional AdaptiveConcurrencyLimiter
+        self.circuit_breaker = circuit_breaker  # Optional CircuitBreaker; raises CircuitOpenError while open
+        if token_cache is None:
+            # Clients for the same account share the module-level cache and login lock
+            self.token_cache = _shared_token_cache
+            self.token_expiry = token_expiry
+            self._login_lock = _token_lock(username)
+        elif isinstance(token_cache, SharedTokenCache):
+            # Shared with other processes: their logins are reused and the login lock spans processes
+            self.token_cache = token_cache
+            self.token_expiry = token_cache.expiry
+            self._login_lock = token_cache.lock(username)
+        else:
+            self.token_cache = token_cache
+            self.token_expiry = {}
+            self._login_lock = threading.Lock()
+        self.session = self._create_session(pool_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "logins": 0, "reauths": 0}
+
+    @staticmethod
+    def _create_session(pool_size):
+        """Creates a keep-alive session whose connection pool is shared by all calls."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        """Closes the pooled connections of this client."""
+        self.session.close()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    @property
+    def stats(self):
+        """Returns request, retry and connection reuse counters for this client."""
+        opened = 0
+        pooled_requests = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    pooled_requests += pool.num_requests
+
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["connections_opened"] = opened
+        stats["connections_reused"] = max(0, pooled_requests - opened)
+        return stats
+
+    def _retry_delay(self, attempt, response=None):
+        """Returns how long to wait before the given retry, honouring Retry-After when present."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                    return min(max(delay, 0.0), self.backoff_max)
+                except (TypeError, ValueError):
+                    pass
+
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def _endpoint_label(self, url):
+        """Maps a URL onto a low-cardinality metrics label."""
+        path = url.split("?", 1)[0].rstrip("/")
+        if path.endswith(self.LOGIN_ENDPOINT):
+            return "login"
+        if path.endswith("/events"):
+            return "events"
+        return "participants"
+
+    def _request(self, method, url, **kwargs):
+        """Sends a request (with retries) unless the circuit breaker is open, and reports its outcome to it."""
+        if self.circuit_breaker is None:
+            return self._request_with_retries(method, url, **kwargs)
+
+        self.circuit_breaker.before_call()
+        try:
+            response = self._request_with_retries(method, url, **kwargs)
+        except Exception:
+            # Any error must be reported: a half-open breaker waits for its probe's outcome
+            self.circuit_breaker.record_failure()
+            raise
+        if response.status_code in RETRY_STATUS_CODES:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        return response
+
+    def _request_with_retries(self, method, url, **kwargs):
+        """Sends a request through the pooled session, retrying on 429/5xx and connection errors."""
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+
+        while True:
+            self._count("requests")
+            try:
+                response = self._send(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                UPSTREAM_RESPONSES.inc(endpoint=self._endpoint_label(url), status="error")
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            else:
+                UPSTREAM_RESPONSES.inc(endpoint=self._endpoint_label(url), status=response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+
+            delay = self._retry_delay(attempt, response)
+            attempt += 1
+            self._count("retries")
+            logger.warning("Retrying %s %s in %.2fs (attempt %d/%d)", method, url, delay, attempt, self.max_retries)
+            time.sleep(delay)
+
+    def _send(self, method, url, **kwargs):
+        """Sends one request once the rate limit and concurrency limit allow it."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.concurrency_limiter is None:
+            return self.session.request(method, url, **kwargs)
+
+        slot = self.concurrency_limiter.acquire()
+        overloaded = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            overloaded = response.status_code in OVERLOAD_STATUS_CODES
+            return response
+        except requests.Timeout:
+            overloaded = True
+            raise
+        finally:
+            self.concurrency_limiter.release(slot, overloaded)
 
     def authenticate(self):
         """Fetches a new Bearer token and stores it in cache."""
-        print("Requesting new token...", flush=True)
+        logger.info("Requesting new token for %s...", self.username)
         auth_str = f"{self.username}:{self.password}"
         auth_bytes = base64.b64encode(auth_str.encode()).decode()
         headers = {"Authorization": f"Basic {auth_bytes}"}
 
-        response = requests.post(self.API_BASE_URL + self.LOGIN_ENDPOINT, headers=headers)
+        self._count("logins")
+        with STAGE_DURATION.time(stage="authenticate"):
+            response = self._request("POST", self.API_BASE_URL + self.LOGIN_ENDPOINT, headers=headers)
         if response.status_code == 200:
             token = response.json().get("token")
             if token:
-                token_cache[self.username] = token  # Store token in cache
-                print(f" Token Stored: {token} (Expires in 15 min)", flush=True)
+                self.token_cache[self.username] = token  # Store token in cache
+                self.token_expiry[self.username] = time.monotonic() + TOKEN_TTL
+                logger.info("Token stored for %s (expires in %d min)", self.username, TOKEN_TTL // 60)
+                return token
             else:
                 raise Exception("ERROR: Token was not stored in cache!")
         else:
             raise Exception(f"Authentication failed: {response.status_code}")
 
     def ensure_token(self):
-        """Ensures a valid token is available before making API calls."""
-        if self.username not in token_cache:
-            print("No valid token found. Authenticating...", flush=True)
-            self.authenticate()
-        else:
-            print(f" Using Token: {token_cache[self.username]} (Expires in {int(token_cache.ttl)}s)", flush=True)
+        """Ensures a valid token is available before making API calls.
+
+        Concurrent callers without a token wait on a single in-flight login. A token that is
+        about to expire keeps being served while one background thread refreshes it.
+        """
+        token = self.token_cache.get(self.username)
+        TOKEN_CACHE_LOOKUPS.inc(result="miss" if token is None else "hit")
+        if token is None:
+            logger.debug("No valid token found. Authenticating...")
+            with self._login_lock:
+                token = self.token_cache.get(self.username)  # Another caller may have logged in meanwhile
+                if token is None:
+                    token = self.authenticate()
+            return token
+
+        expires_at = self.token_expiry.get(self.username)
+        if expires_at is not None and expires_at - time.monotonic() <= self.refresh_margin:
+            self._start_background_refresh()
+        logger.debug("Using cached token for %s", self.username)
+        return token
+
+    def _start_background_refresh(self):
+        """Refreshes the token in a daemon thread unless a login is already in flight."""
+        lock = self._login_lock
+        if not lock.acquire(blocking=False):
+            return
+
+        def refresh():
+            try:
+                self.authenticate()
+            except Exception as e:
+                logger.warning("Background token refresh failed: %s", e)
+            finally:
+                lock.release()
+
+        threading.Thread(target=refresh, name=f"token-refresh-{self.username}", daemon=True).start()
+
+    def invalidate_token(self, token):
+        """Drops the cached token if it is still the one that was rejected."""
+        with self._login_lock:
+            if self.token_cache.get(self.username) == token:
+                self.token_cache.pop(self.username, None)
+                self.token_expiry.pop(self.username, None)
 
     def get_headers(self):
         """Returns headers with authentication token."""
-        print(f"Getting headers for {self.username}", flush=True)
-        self.ensure_token()
-        return {"Authorization": f"Bearer {token_cache[self.username]}"}
+        logger.debug("Getting headers for %s", self.username)
+        token = self.ensure_token()
+        return {"Authorization": f"Bearer {token}"}
 
-    def fetch_events(self):
-        """Fetches event data from the API."""
+    def _authorized_get(self, url, extra_headers=None, **kwargs):
+        """GETs a URL with the bearer token, re-authenticating and replaying once on 401."""
         headers = self.get_headers()
-        print(f"Fetching events with headers: {headers}", flush=True)
+        response = self._request("GET", url, headers={**headers, **(extra_headers or {})}, **kwargs)
 
-        response = requests.get(f"{self.API_BASE_URL}/events", headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"Failed to fetch events: {response.status_code}")
+        if response.status_code == 401:
+            logger.info("Token rejected (401). Re-authenticating...")
+            self._count("reauths")
+            response.close()
+            self.invalidate_token(headers["Authorization"][len("Bearer "):])
+            headers = self.get_headers()
+            response = self._request("GET", url, headers={**headers, **(extra_headers or {})}, **kwargs)
+        return response
+
+    def _get_json(self, url, error_message):
+        """GETs and decodes a JSON resource, going through the response cache when configured."""
+        def fetch():
+            response = self._authorized_get(url)
+            if response.status_code != 200:
+                raise Exception(f"{error_message}: {response.status_code}")
+            return self._merge_pages(response, error_message)
+
+        if self.response_cache is None:
+            return fetch()
+        # Keyed per account as well as URL, since the same URL returns each account's own data
+        return self.response_cache.get_or_fetch(f"{self.username} {url}", fetch)
+
+    def _merge_pages(self, response, error_message):
+        """Decodes a 200 response, following Link: rel="next" pages and merging them into one list or dict."""
+        result = response.json()
+        next_url = response.links.get("next", {}).get("url")
+        while next_url:
+            response = self._authorized_get(next_url)
+            if response.status_code != 200:
+                raise Exception(f"{error_message}: {response.status_code}")
+            page = response.json()
+            if isinstance(result, dict):
+                result.update(page)
+            else:
+                result.extend(page)
+            next_url = response.links.get("next", {}).get("url")
+        return result
+
+    def events_url(self, params=None):
+        """Returns the event listing URL, with optional filter query parameters."""
+        url = f"{self.API_BASE_URL}/events"
+        return f"{url}?{urlencode(params)}" if params else url
+
+    def fetch_events(self, params=None):
+        """Fetches event data from the API."""
+        logger.debug("Fetching events...")
+        return self._get_json(self.events_url(params), "Failed to fetch events")
         
     def fetch_participants(self, participants_url):
         """Fetches participants from the given event URL."""
-        headers = self.get_headers()
-        print(f"Fetching participants from: {participants_url}", flush=True)
+        logger.debug("Fetching participants from: %s", participants_url)
+        return self._get_json(participants_url, "Failed to fetch participants")
+
+    def _iter_json(self, url, error_message):
+        """Yields records of a JSON list/object resource as they arrive, page by page.
+
+        Each page body is parsed incrementally from the socket, and Link: rel="next" pages are
+        followed, so only the record being decoded is held in memory.
+        """
+        next_url = url
+        while next_url:
+            response = self._authorized_get(next_url, stream=True)
+            with response:
+                if response.status_code != 200:
+                    raise Exception(f"{error_message}: {response.status_code}")
+                yield from iter_json_items(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+                next_url = response.links.get("next", {}).get("url")
 
-        response = requests.get(participants_url, headers=headers)
-    
+    def iter_events(self, params=None):
+        """Yields events one by one, following pagination and parsing bodies incrementally."""
+        logger.debug("Streaming events...")
+        return self._iter_json(self.events_url(params), "Failed to fetch events")
+
+    def iter_participants(self, participants_url):
+        """Yields (participant_id, participant_data) pairs as they are parsed from the response."""
+        logger.debug("Streaming participants from: %s", participants_url)
+        return self._iter_json(participants_url, "Failed to fetch participants")
+
+    def fetch_participants_conditional(self, participants_url, etag=None, last_modified=None):
+        """Fetches participants only if they changed since the given validators.
+
+        Returns (participants, validators); participants is None when the API answered 304.
+        Only the first page is conditional; when it changed, the following pages are fetched too.
+        """
+        conditional_headers = {}
+        if etag:
+            conditional_headers["If-None-Match"] = etag
+        if last_modified:
+            conditional_headers["If-Modified-Since"] = last_modified
+
+        logger.debug("Fetching participants from: %s (conditional)", participants_url)
+        response = self._authorized_get(participants_url, conditional_headers)
+
+        validators = {
+            "etag": response.headers.get("ETag", etag),
+            "last_modified": response.headers.get("Last-Modified", last_modified),
+        }
+        if response.status_code == 304:
+            return None, validators
         if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"Failed to fetch participants: {response.status_code}")
+            return self._merge_pages(response, "Failed to fetch participants"), validators
+        raise Exception(f"Failed to fetch participants: {response.status_code}")
 
 def get_api_client():
     """Helper function to initialize API client"""
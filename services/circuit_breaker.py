@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, message, retry_after=0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls fail fast with
+    CircuitOpenError. After `reset_timeout` seconds it lets `half_open_max_calls` probe calls
+    through: a success closes it again, a failure re-opens it for another `reset_timeout`.
+    A failure_threshold of 0 or less disables the breaker.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, half_open_max_calls=1, name="upstream",
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.name = name
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0  # Calls refused while open
+        self.opened = 0  # Times the circuit opened
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info("Circuit %s half-open: probing upstream", self.name)
+        return self._state
+
+    def is_open(self):
+        """Returns whether calls are currently refused (without using up a half-open probe)."""
+        return self.failure_threshold > 0 and self.state == OPEN
+
+    def retry_after(self):
+        """Seconds until an open circuit lets a probe through (0 when it is not open)."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go through now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            self.rejected += 1
+            retry_after = max(0.0, self.reset_timeout - (self._clock() - self._opened_at)) if state == OPEN else 0.0
+        raise CircuitOpenError(f"Upstream circuit {self.name} is open; not calling it", retry_after)
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Circuit %s closed: upstream recovered", self.name)
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self.opened += 1
+                logger.warning("Circuit %s open after %d consecutive failures; retrying in %.0fs",
+                               self.name, self._failures, self.reset_timeout)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
@@ -1,34 +1,142 @@
 import csv
+import io
+import logging
 import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import chain
+
+from services.metrics import ROWS_EXPORTED, STAGE_DURATION
+from services.rows import ParticipantRow
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = [
+    "eventId", "eventStartTime", "eventEndTime", "eventType",
+    "firstName", "lastName", "emailAddress", "willAttend",
+    "didAttend", "marketingConsent", "orderNewsletter"
+]
+
+def write_row(writer, row):
+    """Writes a row through a csv.DictWriter, taking the positional fast path for ParticipantRow rows."""
+    if isinstance(row, ParticipantRow):
+        writer.writer.writerow(row.project(writer.fieldnames))
+    else:
+        writer.writerow(row)
 
 class CSVExporter:
-    def __init__(self, file_name="participants.csv"):
+    def __init__(self, file_name="participants.csv", keep_versions=0, fieldnames=FIELDNAMES):
         # Ensure CSV is saved in the same directory as app.py
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.file_name = os.path.join(self.base_dir, file_name)
-        print(f"  CSV will be saved at: {self.file_name}", flush=True)  # Debugging
+        self.fieldnames = fieldnames
+        self.keep_versions = keep_versions  # Number of past exports kept next to the CSV (0 disables versioning)
+        self.versions_dir = os.path.join(os.path.dirname(self.file_name), "exports")
+        logger.debug("CSV will be saved at: %s", self.file_name)
 
     def save_to_csv(self, data):
-        """Saves participant data to CSV."""
-        if not data:
-            print("No data to write to CSV.", flush=True)
-            raise Exception("No data to write.")
+        """Saves participant data to CSV.
 
-        print("  Writing CSV file...", flush=True)
+        `data` may be a list or any iterable of rows; rows are written as they are produced.
+        """
+        rows = iter(data)
+        first_row = next(rows, None)
+        if first_row is None:
+            logger.warning("No data to write to CSV.")
+            raise Exception("No data to write.")
 
-        fieldnames = [
-            "eventId", "eventStartTime", "eventEndTime", "eventType",
-            "firstName", "lastName", "emailAddress", "willAttend",
-            "didAttend", "marketingConsent", "orderNewsletter"
-        ]
+        logger.info("Writing CSV file...")
 
+        # Write to a temp file in the same directory and rename it over the target, so readers
+        # only ever see the previous complete export or the new complete one
+        os.makedirs(os.path.dirname(os.path.abspath(self.file_name)), exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=".participants-", suffix=".csv.tmp", dir=os.path.dirname(self.file_name))
         try:
-            with open(self.file_name, mode="w", newline="", encoding="utf-8") as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            with os.fdopen(fd, mode="w", newline="", encoding="utf-8") as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
                 writer.writeheader()
-                writer.writerows(data)
-            print(f" CSV file created successfully at {self.file_name}", flush=True)
+                count = 0
+                # Only time spent writing is measured; producing rows is timed by the processor
+                write_seconds = 0.0
+                for row in chain([first_row], rows):
+                    started = time.perf_counter()
+                    write_row(writer, row)
+                    write_seconds += time.perf_counter() - started
+                    count += 1
+                started = time.perf_counter()
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, self.file_name)
+            self._keep_version()
+            STAGE_DURATION.observe(write_seconds + time.perf_counter() - started, stage="csv_write")
+            ROWS_EXPORTED.inc(count, output="file")
+            logger.info("CSV file created successfully at %s (%d rows)", self.file_name, count)
             return f"CSV file has been successfully created."
-        except Exception as e:
-            print(f"Error writing CSV file: {str(e)}", flush=True)
+        except (OSError, csv.Error, ValueError) as e:
+            # Errors raised while producing rows (e.g. upstream failures) propagate unchanged
+            logger.error("Error writing CSV file: %s", e)
             raise Exception(f"Error writing CSV file: {str(e)}")
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def _keep_version(self):
+        """Links the fresh export into the versions directory and applies the retention policy."""
+        if self.keep_versions <= 0:
+            return
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        stem, ext = os.path.splitext(os.path.basename(self.file_name))
+        version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        version_path = os.path.join(self.versions_dir, f"{stem}-{version}{ext}")
+        try:
+            os.link(self.file_name, version_path)  # The next os.replace leaves this inode untouched
+        except OSError:
+            shutil.copy2(self.file_name, version_path)
+
+        for old_version in self.list_versions()[self.keep_versions:]:
+            # Also drop formats derived from that version (e.g. .ndjson, .parquet)
+            prefix = os.path.splitext(old_version)[0] + "."
+            for name in os.listdir(self.versions_dir):
+                if name.startswith(prefix):
+                    os.remove(os.path.join(self.versions_dir, name))
+
+    def list_versions(self):
+        """Returns the stored export versions, newest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        stem, ext = os.path.splitext(os.path.basename(self.file_name))
+        # Derived files (e.g. participants-<version>.people.csv) have a dot inside the version part
+        versions = [
+            name for name in os.listdir(self.versions_dir)
+            if name.startswith(f"{stem}-") and name.endswith(ext) and "." not in name[len(stem) + 1:-len(ext)]
+        ]
+        return sorted(versions, reverse=True)
+
+    def version_path(self, version):
+        """Returns the path of a stored version, or None if it does not exist."""
+        if version not in self.list_versions():
+            return None
+        return os.path.join(self.versions_dir, version)
+
+    @staticmethod
+    def stream_csv(row_batches, fieldnames=FIELDNAMES):
+        """Yields CSV text chunks: the header first, then one chunk per batch of rows."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+
+        writer.writeheader()
+        yield buffer.getvalue()
+
+        for rows in row_batches:
+            if not rows:
+                continue
+            buffer.seek(0)
+            buffer.truncate()
+            for row in rows:
+                write_row(writer, row)
+            ROWS_EXPORTED.inc(len(rows), output="stream")
+            yield buffer.getvalue()
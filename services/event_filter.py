@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+
+# Query parameters sent to GET /events when filters are pushed upstream (UPSTREAM_EVENT_FILTERS).
+# The listing is still filtered locally, so an API that ignores them just returns more events than needed.
+UPSTREAM_FILTER_PARAMS = {"start": "start_time_from", "end": "start_time_to", "event_types": "event_type", "event_ids": "event_id"}
+
+def _list_param(params, name):
+    """Returns the values of a repeatable, comma-separated parameter (a MultiDict or a plain dict)."""
+    values = params.getlist(name) if hasattr(params, "getlist") else [params.get(name) or ""]
+    return [item.strip() for value in values for item in value.split(",") if item.strip()]
+
+def _format_time(timestamp):
+    return str(int(timestamp)) if float(timestamp).is_integer() else repr(timestamp)
+
+def parse_time(value):
+    """Turns a Unix timestamp, a date (YYYY-MM-DD) or an ISO 8601 datetime into a Unix timestamp.
+
+    Dates and datetimes without a timezone are taken as UTC, like the exported event times.
+    Raises ValueError for anything else.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = value.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid time: {value!r} (expected a Unix timestamp, YYYY-MM-DD or an ISO 8601 datetime)")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class EventFilter:
+    """Selects events from the listing before their participants are fetched.
+
+    An event matches when it starts at or after `start` and before `end` (Unix timestamps, either
+    may be None), when `event_types` is given its type is one of them (case-insensitive), and
+    when `event_ids` is given its id is one of them.
+    """
+
+    def __init__(self, start=None, end=None, event_types=None, event_ids=None):
+        self.start = start
+        self.end = end
+        self.event_types = {event_type.lower() for event_type in event_types} if event_types else None
+        self.event_ids = set(event_ids) if event_ids else None
+        if start is not None and end is not None and end <= start:
+            raise ValueError("The end of the time window must be after its start")
+
+    @classmethod
+    def from_params(cls, params):
+        """Builds a filter from `start`, `end`, `eventType` and `eventId` request parameters.
+
+        `eventType` and `eventId` may be repeated or comma-separated. Other parameters are
+        ignored. Raises ValueError for invalid values.
+        """
+        start = params.get("start")
+        end = params.get("end")
+        return cls(
+            start=parse_time(start) if start else None,
+            end=parse_time(end) if end else None,
+            event_types=_list_param(params, "eventType"),
+            event_ids=_list_param(params, "eventId"),
+        )
+
+    def to_params(self):
+        """Returns the filter as flat, canonical request parameters (the inverse of from_params())."""
+        params = {}
+        if self.start is not None:
+            params["start"] = _format_time(self.start)
+        if self.end is not None:
+            params["end"] = _format_time(self.end)
+        if self.event_types is not None:
+            params["eventType"] = ",".join(sorted(self.event_types))
+        if self.event_ids is not None:
+            params["eventId"] = ",".join(sorted(self.event_ids))
+        return params
+
+    def upstream_params(self):
+        """Returns the query parameters asking the API to filter the event listing itself."""
+        params = {}
+        if self.start is not None:
+            params[UPSTREAM_FILTER_PARAMS["start"]] = int(self.start)
+        if self.end is not None:
+            params[UPSTREAM_FILTER_PARAMS["end"]] = int(self.end)
+        if self.event_types is not None:
+            params[UPSTREAM_FILTER_PARAMS["event_types"]] = ",".join(sorted(self.event_types))
+        if self.event_ids is not None:
+            params[UPSTREAM_FILTER_PARAMS["event_ids"]] = ",".join(sorted(self.event_ids))
+        return params
+
+    def matches(self, event_id, start_time, event_type):
+        """Returns whether an event with this id, start timestamp and type is selected."""
+        if self.event_ids is not None and event_id not in self.event_ids:
+            return False
+        if self.start is not None and start_time < self.start:
+            return False
+        if self.end is not None and start_time >= self.end:
+            return False
+        if self.event_types is not None and event_type.lower() not in self.event_types:
+            return False
+        return True
+
+    def __bool__(self):
+        return any(value is not None for value in (self.start, self.end, self.event_types, self.event_ids))
+
+    def to_dict(self):
+        return {
+            "start": self.start,
+            "end": self.end,
+            "event_types": sorted(self.event_types) if self.event_types is not None else None,
+            "event_ids": sorted(self.event_ids) if self.event_ids is not None else None,
+        }
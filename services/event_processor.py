@@ -1,9 +1,54 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from services.field_mapping import FieldMapping
+from services.circuit_breaker import CircuitOpenError
+from services.metrics import FAILED_EVENTS, PARTIAL_EXPORTS, STAGE_DURATION
+from services.rows import EventInfo, ParticipantRow, RowLayout
+
+logger = logging.getLogger(__name__)
+
+FAILURE_POLICIES = {"abort", "skip", "retry"}
+
 class EventProcessor:
-    def __init__(self, api_client):
+    def __init__(self, api_client, max_workers=1, failure_policy="abort", max_retries=2, retry_delay=0.5,
+                 snapshot_store=None, field_mapping=None, streaming=False, event_filter=None, push_filters=False):
+        if failure_policy not in FAILURE_POLICIES:
+            raise ValueError(f"Unknown failure policy: {failure_policy}")
+
         self.api_client = api_client
+        self.max_workers = max(1, int(max_workers))  # 1 keeps the original serial behaviour
+        self.failure_policy = failure_policy
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
         self.all_participants = []
+        self.failed_events = []  # [{"eventId": ..., "error": ...}] for events skipped by the failure policy
+        self.field_mapping = field_mapping or FieldMapping()
+        self.row_layout = RowLayout(self.field_mapping.columns + ("willAttend", "didAttend"), self.field_mapping.fieldnames)
+        self.streaming = streaming  # Consume events/participants record by record as they are parsed
+        self.snapshot_store = snapshot_store  # When set, unchanged events are served from their last snapshot
+        self.sync_stats = {"unchanged": 0, "refetched": 0}
+        self.event_filter = event_filter  # When set, only matching events have their participants fetched
+        self.push_filters = push_filters  # Also ask the API to filter the event listing
+        self.events_filtered = 0
+        self.events_total = None  # Number of events with participants, known once the listing is fetched
+        self._sync_stats_lock = threading.Lock()
+
+    @staticmethod
+    def event_hash(event_item, fieldnames=()):
+        """Returns a stable content hash of a raw event entry and the export columns.
+
+        Including the columns makes a field mapping change invalidate every snapshot, whose
+        stored rows were built with the previous columns.
+        """
+        payload = [event_item, list(fieldnames)]
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
 
     @staticmethod
     def format_datetime(timestamp):
@@ -24,69 +69,176 @@ class EventProcessor:
             if event_type.lower() in valid_event_types:
                 return event_type.lower()  # Return lowercase ('b2b' or 'b2c')
             else:
-                print(f"Unexpected event type: '{event_type}'. Defaulting to '{default_type}'.")
+                logger.warning("Unexpected event type: '%s'. Defaulting to '%s'.", event_type, default_type)
         
         return default_type  # Return default if missing or invalid
 
+    def parse_event(self, event_item):
+        """Flattens a raw event entry into (event_id, start_time, end_time, event_type, participants_url)."""
+        event_id = list(event_item.keys())[0]
+        event_data = event_item[event_id]
+
+        start_time = self.format_datetime(event_data["start_time"])
+        end_time = self.format_datetime(event_data["end_time"])
+        event_type = self.extract_event_type(event_data.get("custom", {}))
+        participants_url = event_data.get("participants_url")
+        return event_id, start_time, end_time, event_type, participants_url
+
     def process_events(self):
         """Processes events and their participants."""
-        events = self.api_client.fetch_events()
+        for rows in self.iter_event_rows():
+            self.all_participants.extend(rows)
 
-        for event_item in events:
-            event_id = list(event_item.keys())[0]
-            event_data = event_item[event_id]
+        logger.info("Participants processed: %d", len(self.all_participants))
+
+    def iter_rows(self):
+        """Yields export rows one at a time without keeping them in memory."""
+        for rows in self.iter_event_rows():
+            yield from rows
+
+    def iter_event_rows(self):
+        """Yields the list of rows for each event, in event order, as soon as it is ready."""
+        params = self.event_filter.upstream_params() if self.push_filters and self.event_filter else None
+        with STAGE_DURATION.time(stage="fetch_events"):
+            fetch = self.api_client.iter_events if self.streaming else self.api_client.fetch_events
+            events = fetch(params) if params else fetch()
+            seen_event_ids = []
+            jobs = list(self._iter_jobs(events, seen_event_ids))
+        self.events_total = len(jobs)
+
+        yield from self._run_jobs(jobs)
+        if self.failed_events:
+            PARTIAL_EXPORTS.inc()
 
-            start_time = self.format_datetime(event_data["start_time"])
-            end_time = self.format_datetime(event_data["end_time"])
-            event_type = self.extract_event_type(event_data.get("custom", {}))
-            participants_url = event_data.get("participants_url")
+        if self.snapshot_store is not None:
+            if not params:  # A listing filtered upstream does not show which events still exist
+                self.snapshot_store.retain(seen_event_ids)
+            self.snapshot_store.save()
+            logger.info("Incremental sync: %s", self.sync_stats)
 
-            print(f"Processing Event {event_id}, URL: {participants_url}", flush=True)
+    def _run_jobs(self, jobs):
+        """Collects every job's rows, serially or through the thread pool, preserving order."""
+        if self.max_workers == 1:
+            for job in jobs:
+                yield self._collect_event(*job)
+            return
 
+        # Keep a bounded window of in-flight events and yield them in submission order,
+        # so rows keep the serial ordering while memory stays proportional to the window
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for job in jobs:
+                pending.append(executor.submit(self._collect_event, *job))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _iter_jobs(self, events, seen_event_ids):
+        """Yields the fetch arguments for every event that has a participants URL."""
+        for event_item in events:
+            event_id, start_time, end_time, event_type, participants_url = self.parse_event(event_item)
+            logger.debug("Processing event %s, URL: %s", event_id, participants_url)
+            seen_event_ids.append(event_id)
+
+            # Filtered events still count as seen, so an incremental sync keeps their snapshots
+            if self.event_filter and not self.event_filter.matches(event_id, event_item[event_id]["start_time"], event_type):
+                self.events_filtered += 1
+                continue
             if participants_url:
-                self.process_participants(event_id, start_time, end_time, event_type, participants_url)
+                event_hash = (self.event_hash(event_item, self.field_mapping.fieldnames)
+                              if self.snapshot_store is not None else None)
+                yield event_id, start_time, end_time, event_type, participants_url, event_hash
             else:
-                print(f"  No participants URL for event {event_id}", flush=True)
+                logger.debug("No participants URL for event %s", event_id)
 
     def process_participants(self, event_id, start_time, end_time, event_type, participants_url):
         """Processes participants for a specific event."""
         participants = self.api_client.fetch_participants(participants_url)
+        self.all_participants.extend(self.build_rows(event_id, start_time, end_time, event_type, participants))
+        logger.info("Participants processed: %d", len(self.all_participants))
+
+    def _collect_event(self, event_id, start_time, end_time, event_type, participants_url, event_hash=None):
+        """Fetches and converts one event's participants, applying the configured failure policy.
+
+        CircuitOpenError always propagates, whatever the policy.
+        """
+        attempts = 1 + (self.max_retries if self.failure_policy == "retry" else 0)
+
+        for attempt in range(1, attempts + 1):
+            try:
+                if self.snapshot_store is not None:
+                    return self._sync_event(event_id, start_time, end_time, event_type, participants_url, event_hash)
+                if self.streaming:
+                    # Fetching and parsing interleave, so both are timed as row extraction
+                    participants = self.api_client.iter_participants(participants_url)
+                else:
+                    with STAGE_DURATION.time(stage="fetch_participants"):
+                        participants = self.api_client.fetch_participants(participants_url)
+                with STAGE_DURATION.time(stage="extract_rows"):
+                    return self.build_rows(event_id, start_time, end_time, event_type, participants)
+            except CircuitOpenError:
+                # The upstream is down, not this event: skipping every remaining event would replace
+                # the previous export with a sliver of it, so the whole export is abandoned instead
+                FAILED_EVENTS.inc(reason="circuit_open")
+                raise
+            except Exception as e:
+                if self.failure_policy == "abort":
+                    raise
+                if attempt < attempts:
+                    logger.warning("Retrying event %s (%d/%d): %s", event_id, attempt, self.max_retries, e)
+                    time.sleep(self.retry_delay * attempt)
+                    continue
+                logger.warning("Skipping event %s: %s", event_id, e)
+                self.failed_events.append({"eventId": event_id, "error": str(e)})
+                FAILED_EVENTS.inc(reason="error")
+                return []
+
+    def _count_sync(self, name):
+        with self._sync_stats_lock:
+            self.sync_stats[name] += 1
 
-        for participant_id, participant_data in participants.items():
-            first_name = participant_data["answers"].get("firstname", {}).get("answer", "")
-            last_name = participant_data["answers"].get("lastname", {}).get("answer", "")
-            email_address = participant_data["answers"].get("email", {}).get("answer", "")
+    def _sync_event(self, event_id, start_time, end_time, event_type, participants_url, event_hash):
+        """Returns an event's rows, re-fetching its participants unless the API confirms they did not change.
 
-            marketing_consent = any(
-                privacy.get("privacy_policy_id") == 7295 and privacy.get("answer") == 1
-                for privacy in participant_data.get("privacy_answers", [])
+        The snapshot is only served on a 304: without ETag/Last-Modified validators the participants
+        are fetched again, since registrations and consent changes do not alter the event entry.
+        """
+        snapshot = self.snapshot_store.get(event_id)
+        unchanged_event = snapshot is not None and snapshot["hash"] == event_hash
+
+        if unchanged_event and (snapshot["etag"] or snapshot["last_modified"]):
+            participants, validators = self.api_client.fetch_participants_conditional(
+                participants_url, snapshot["etag"], snapshot["last_modified"]
             )
-            
-            # Extract orderNewsletter from multiple conditions
-            order_newsletter = ""
-            for key, answer_data in participant_data.get("answers", {}).items():
-                if (
-                    key == "98765432"  # Matches known question ID
-                    or answer_data.get("question") == "Order newsletter"  # Matches question text
-                ):
-                    answer_choices = answer_data.get("answer", {})
-                    if isinstance(answer_choices, dict):  # Ensure it's a dict
-                        first_key = next(iter(answer_choices), None)
-                        if first_key:
-                            order_newsletter = answer_choices[first_key].get("choice", "")
-
-            self.all_participants.append({
-                "eventId": event_id,
-                "eventStartTime": start_time,
-                "eventEndTime": end_time,
-                "eventType": event_type,
-                "firstName": first_name,
-                "lastName": last_name,
-                "emailAddress": email_address,
-                "willAttend": bool(participant_data.get("will_attend", False)),
-                "didAttend": bool(participant_data.get("did_attend", False)),
-                "marketingConsent": marketing_consent,
-                "orderNewsletter": order_newsletter
-            })
-
-        print(f" Participants Processed: {len(self.all_participants)}", flush=True)
+            if participants is None:
+                self._count_sync("unchanged")
+                return snapshot["rows"]
+        else:
+            participants, validators = self.api_client.fetch_participants_conditional(participants_url)
+
+        rows = self.build_rows(event_id, start_time, end_time, event_type, participants)
+        self.snapshot_store.put(event_id, event_hash, rows, **validators)
+        self._count_sync("refetched")
+        return rows
+
+    def build_rows(self, event_id, start_time, end_time, event_type, participants):
+        """Converts a participants payload (a dict or an iterable of (id, data) pairs) into export rows.
+
+        Rows are compact ParticipantRow mappings sharing one EventInfo per event.
+        """
+        index = self.field_mapping.event_index()
+        event = EventInfo(event_id, start_time, end_time, event_type)
+        layout = self.row_layout
+        rows = []
+        if isinstance(participants, dict):
+            participants = participants.items()
+
+        for participant_id, participant_data in participants:
+            values = index.extract_values(participant_data)
+            values.append(bool(participant_data.get("will_attend", False)))
+            values.append(bool(participant_data.get("did_attend", False)))
+            rows.append(ParticipantRow(event, layout, tuple(values)))
+
+        return rows
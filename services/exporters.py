@@ -0,0 +1,175 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+
+from services.csv_exporter import FIELDNAMES
+from services.field_mapping import BOOLEAN_FIELDS
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Columnar formats are optional
+    pyarrow = None
+
+class ExportFormatUnavailable(Exception):
+    """Raised when a known export format cannot be produced in this environment."""
+
+class Exporter:
+    """Base class for export formats. Subclasses implement write(rows, file_name, fieldnames)."""
+    name = None
+    extension = None
+    mimetype = None
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def write(self, rows, file_name, fieldnames=FIELDNAMES):
+        raise NotImplementedError
+
+class GzipCSVExporter(Exporter):
+    name = "csv.gz"
+    extension = ".csv.gz"
+    mimetype = "application/gzip"
+
+    def write(self, rows, file_name, fieldnames=FIELDNAMES):
+        with gzip.open(file_name, mode="wt", newline="", encoding="utf-8") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+
+class NDJSONExporter(Exporter):
+    name = "ndjson"
+    extension = ".ndjson"
+    mimetype = "application/x-ndjson"
+
+    def write(self, rows, file_name, fieldnames=FIELDNAMES):
+        with open(file_name, mode="w", encoding="utf-8") as jsonfile:
+            for row in rows:
+                jsonfile.write(json.dumps(dict(row), ensure_ascii=False))
+                jsonfile.write("\n")
+
+class _ArrowExporter(Exporter):
+    """Shared pieces of the typed columnar formats."""
+
+    @classmethod
+    def available(cls):
+        return pyarrow is not None
+
+    @staticmethod
+    def to_table(rows, fieldnames):
+        """Builds a typed Arrow table: boolean columns stay booleans, everything else is a string."""
+        columns = {name: [] for name in fieldnames}
+        for row in rows:
+            for name in fieldnames:
+                columns[name].append(row.get(name))
+
+        def column_type(name):
+            values = columns[name]
+            if name in BOOLEAN_FIELDS or (values and all(isinstance(value, bool) for value in values)):
+                return pyarrow.bool_()
+            return pyarrow.string()
+
+        schema = pyarrow.schema([(name, column_type(name)) for name in fieldnames])
+        return pyarrow.table(columns, schema=schema)
+
+class ParquetExporter(_ArrowExporter):
+    name = "parquet"
+    extension = ".parquet"
+    mimetype = "application/vnd.apache.parquet"
+
+    def write(self, rows, file_name, fieldnames=FIELDNAMES):
+        pyarrow.parquet.write_table(self.to_table(rows, fieldnames), file_name, compression="zstd")
+
+class ArrowIPCExporter(_ArrowExporter):
+    name = "arrow"
+    extension = ".arrow"
+    mimetype = "application/vnd.apache.arrow.file"
+
+    def write(self, rows, file_name, fieldnames=FIELDNAMES):
+        table = self.to_table(rows, fieldnames)
+        with pyarrow.ipc.new_file(file_name, table.schema) as writer:
+            writer.write_table(table)
+
+# Registry of derived formats; plain CSV is the primary artifact written by CSVExporter
+EXPORT_FORMATS = {}
+
+def register_export_format(exporter_cls):
+    """Makes an Exporter subclass selectable by its name and mimetype."""
+    EXPORT_FORMATS[exporter_cls.name] = exporter_cls
+    return exporter_cls
+
+for _exporter_cls in (GzipCSVExporter, NDJSONExporter, ParquetExporter, ArrowIPCExporter):
+    register_export_format(_exporter_cls)
+
+def negotiate_format(accept_header):
+    """Picks the best registered format for an Accept header, or None for plain CSV."""
+    best_name, best_quality = None, 0.0
+    for part in (accept_header or "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.strip().lower()
+        if media_type in ("text/csv", "*/*", "text/*"):
+            candidate = None
+        else:
+            candidate = next((cls.name for cls in EXPORT_FORMATS.values() if cls.mimetype == media_type), False)
+            if candidate is False:
+                continue
+        if quality > best_quality:
+            best_name, best_quality = candidate, quality
+    return best_name
+
+def read_csv_header(file_name):
+    """Returns the column names of an exported CSV file."""
+    with open(file_name, newline="", encoding="utf-8") as csvfile:
+        return next(csv.reader(csvfile), [])
+
+def read_csv_rows(file_name, boolean_fields=BOOLEAN_FIELDS):
+    """Yields typed rows back from an exported CSV file."""
+    with open(file_name, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            for name in boolean_fields:
+                if name in row:
+                    row[name] = row[name] == "True"
+            yield row
+
+_derive_lock = threading.Lock()
+
+def derived_export(csv_path, format_name, boolean_fields=BOOLEAN_FIELDS):
+    """Returns (path, mimetype) of `csv_path` converted to `format_name`.
+
+    The converted file is cached next to the CSV and regenerated only when the CSV is newer.
+    """
+    exporter_cls = EXPORT_FORMATS.get(format_name)
+    if exporter_cls is None:
+        raise KeyError(format_name)
+    if not exporter_cls.available():
+        raise ExportFormatUnavailable(f"Export format '{format_name}' is not available (missing dependency).")
+
+    target = os.path.splitext(csv_path)[0] + exporter_cls.extension
+    with _derive_lock:
+        source_mtime = os.stat(csv_path).st_mtime_ns
+        if not os.path.exists(target) or os.stat(target).st_mtime_ns != source_mtime:
+            fd, tmp_name = tempfile.mkstemp(suffix=f"{exporter_cls.extension}.tmp", dir=os.path.dirname(csv_path))
+            os.close(fd)
+            try:
+                exporter_cls().write(read_csv_rows(csv_path, boolean_fields), tmp_name, read_csv_header(csv_path))
+                os.chmod(tmp_name, 0o644)
+                # Stamp the derived file with the CSV's mtime so staleness is an exact comparison
+                os.utime(tmp_name, ns=(source_mtime, source_mtime))
+                os.replace(tmp_name, target)
+            finally:
+                if os.path.exists(tmp_name):
+                    os.remove(tmp_name)
+    return target, exporter_cls.mimetype
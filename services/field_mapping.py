@@ -0,0 +1,127 @@
+import json
+
+from services.csv_exporter import FIELDNAMES
+
+BOOLEAN_FIELDS = {"willAttend", "didAttend", "marketingConsent"}
+
+# Declarative description of the participant columns taken from answers and privacy answers.
+# "keys" match answer ids, "questions" match the answer's question text; "kind" is "text"
+# (the answer itself) or "choice" (the first selected choice of a multiple-choice answer).
+DEFAULT_FIELD_MAPPING = {
+    "answers": {
+        "firstName": {"keys": ["firstname"], "kind": "text"},
+        "lastName": {"keys": ["lastname"], "kind": "text"},
+        "emailAddress": {"keys": ["email"], "kind": "text"},
+        "orderNewsletter": {"keys": ["98765432"], "questions": ["Order newsletter"], "kind": "choice"},
+    },
+    "privacy": {
+        "marketingConsent": {"policy_ids": [7295]},
+    },
+}
+
+ANSWER_KINDS = {"text", "choice"}
+_UNRESOLVED = object()
+
+class FieldMapping:
+    """Precompiled lookup tables turning a participant payload into mapped column values."""
+
+    def __init__(self, config=None):
+        config = config or DEFAULT_FIELD_MAPPING
+        self.key_columns = {}       # answer id -> (column, kind)
+        self.question_columns = {}  # question text -> (column, kind)
+        self.policy_columns = {}    # privacy policy id -> column
+        self.defaults = {}
+
+        for column, spec in config.get("answers", {}).items():
+            kind = spec.get("kind", "text")
+            if kind not in ANSWER_KINDS:
+                raise ValueError(f"Unknown answer kind '{kind}' for column {column}")
+            for key in spec.get("keys", []):
+                self.key_columns[str(key)] = (column, kind)
+            for question in spec.get("questions", []):
+                self.question_columns[question] = (column, kind)
+            self.defaults[column] = ""
+
+        for column, spec in config.get("privacy", {}).items():
+            for policy_id in spec.get("policy_ids", []):
+                self.policy_columns[policy_id] = column
+            self.defaults[column] = False
+
+        self.fieldnames = FIELDNAMES + [column for column in self.defaults if column not in FIELDNAMES]
+        # Positional view of the mapped columns, used to build compact rows
+        self.columns = tuple(self.defaults)
+        self.default_values = tuple(self.defaults.values())
+        self.positions = {column: position for position, column in enumerate(self.columns)}
+        self.policy_positions = {policy_id: self.positions[column] for policy_id, column in self.policy_columns.items()}
+        self.boolean_fields = BOOLEAN_FIELDS | set(config.get("privacy", {}))
+
+    @classmethod
+    def from_file(cls, file_name):
+        """Loads extra mappings from a JSON file and merges them over the defaults."""
+        with open(file_name, encoding="utf-8") as mapping_file:
+            extra = json.load(mapping_file)
+
+        config = {section: dict(columns) for section, columns in DEFAULT_FIELD_MAPPING.items()}
+        for section, columns in extra.items():
+            config.setdefault(section, {}).update(columns)
+        return cls(config)
+
+    def event_index(self):
+        """Returns an extractor bound to a fresh per-event index of resolved answer keys."""
+        return EventIndex(self)
+
+class EventIndex:
+    """Extracts mapped values for the participants of one event in a single pass.
+
+    Answer ids are resolved against the mapping once per (id, question text) pair and the
+    result is cached, so later participants of the same event cost one dict lookup per answer.
+    """
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.resolved = {}
+
+    def _resolve(self, key, question):
+        target = self.mapping.key_columns.get(key)
+        if target is None and question is not None:
+            target = self.mapping.question_columns.get(question)
+        if target is not None:
+            column, kind = target
+            target = (self.mapping.positions[column], kind)
+        self.resolved[(key, question)] = target
+        return target
+
+    def extract(self, participant_data):
+        """Returns {column: value} for every mapped column of one participant."""
+        return dict(zip(self.mapping.columns, self.extract_values(participant_data)))
+
+    def extract_values(self, participant_data):
+        """Returns the mapped values of one participant as a list ordered like `mapping.columns`."""
+        values = list(self.mapping.default_values)
+        resolved = self.resolved
+
+        for key, answer_data in participant_data.get("answers", {}).items():
+            question = answer_data.get("question")
+            target = resolved.get((key, question), _UNRESOLVED)
+            if target is _UNRESOLVED:
+                target = self._resolve(key, question)
+            if target is None:
+                continue
+
+            position, kind = target
+            if kind == "text":
+                values[position] = answer_data.get("answer", "")
+            else:
+                answer_choices = answer_data.get("answer", {})
+                if isinstance(answer_choices, dict):  # Ensure it's a dict
+                    first_key = next(iter(answer_choices), None)
+                    if first_key:
+                        values[position] = answer_choices[first_key].get("choice", "")
+
+        policy_positions = self.mapping.policy_positions
+        for privacy in participant_data.get("privacy_answers", []):
+            position = policy_positions.get(privacy.get("privacy_policy_id"))
+            if position is not None and privacy.get("answer") == 1:
+                values[position] = True
+
+        return values
@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+from services.shared_cache import FileLock
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = {JOB_QUEUED, JOB_RUNNING}
+
+# Minimum seconds between progress writes to a job store; status changes are always written
+PROGRESS_SAVE_INTERVAL = 1.0
+
+class InMemoryQueueBackend:
+    """Process-local FIFO of job ids. Other backends only need put() and get()."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, job_id):
+        self._queue.put(job_id)
+
+    def get(self, timeout=None):
+        """Returns the next job id, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+def _process_start_time(pid):
+    """Returns the start time of a process in clock ticks since boot, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as stat_file:
+            stat = stat_file.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; the fields after it start at field 3
+    return int(stat[stat.rindex(")") + 2:].split()[19])
+
+def _process_alive(pid, started=None):
+    """Returns whether process `pid` exists and, when `started` is known, is the same process.
+
+    PIDs are reused, e.g. by a restarted container, so a living PID alone does not prove the owner of
+    a job is still running.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return started is None or _process_start_time(pid) in (None, started)
+
+class FileJobStore:
+    """Job records as JSON files in a directory shared by the worker processes of one host.
+
+    Every worker can then report any job, and the flock() lock makes the duplicate check and the
+    creation of a job atomic across processes. Each record names the process running it by PID and
+    start time; active jobs of a process that no longer exists are reported as failed.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = FileLock(os.path.join(directory, ".jobs.lock"))
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, record):
+        fd, tmp_name = tempfile.mkstemp(prefix=".job-", suffix=".json.tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as job_file:
+                json.dump(record, job_file)
+            os.replace(tmp_name, self._path(record["job_id"]))
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def load(self, job_id):
+        """Returns the record of a job, or None."""
+        if not job_id.isalnum():  # Job ids are hex; anything else is not a file of ours
+            return None
+        try:
+            with open(self._path(job_id), encoding="utf-8") as job_file:
+                record = json.load(job_file)
+        except (OSError, ValueError):
+            return None
+        active = record["status"] in ACTIVE_STATUSES
+        if active and not _process_alive(record["owner"], record.get("owner_started")):
+            record.update(status=JOB_FAILED, error="The worker running this job exited before it finished.")
+        return record
+
+    def records(self):
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(".json") and not file_name.startswith("."):
+                record = self.load(file_name[:-len(".json")])
+                if record is not None:
+                    yield record
+
+    def find_active(self, key):
+        """Returns the record of a queued or running job with these parameters, or None."""
+        for record in self.records():
+            if record["status"] in ACTIVE_STATUSES and tuple(sorted(record["params"].items())) == key:
+                return record
+        return None
+
+    def prune(self, max_finished_jobs):
+        """Deletes the oldest finished jobs beyond max_finished_jobs."""
+        finished = [record for record in self.records() if record["status"] not in ACTIVE_STATUSES]
+        excess = len(finished) - max_finished_jobs
+        for record in sorted(finished, key=lambda record: record["created_at"])[:max(excess, 0)]:
+            try:
+                os.remove(self._path(record["job_id"]))
+            except FileNotFoundError:
+                pass
+
+class StoredJob:
+    """Read-only view of a job recorded by another worker process."""
+
+    def __init__(self, record):
+        self.id = record["job_id"]
+        self.status = record["status"]
+        self._record = record
+
+    def to_dict(self):
+        return {name: value for name, value in self._record.items() if name not in ("owner", "owner_started")}
+
+class ExportJob:
+    def __init__(self, key, params, store=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.params = params
+        self.status = JOB_QUEUED
+        self.events_total = None
+        self.events_done = 0
+        self.rows = 0
+        self.failed_events = []  # Events skipped by the failure policy, also reported when the job fails
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._store = store
+        self._saved_at = 0.0
+
+    def set_status(self, status, result=None, error=None):
+        with self._lock:
+            self.status = status
+            if status == JOB_RUNNING:
+                self.started_at = time.time()
+            else:
+                self.finished_at = time.time()
+                self.result = result
+                self.error = error
+        self.save()
+
+    def advance(self, rows):
+        """Records one finished event and the number of rows it produced."""
+        with self._lock:
+            self.events_done += 1
+            self.rows += rows
+        if time.monotonic() - self._saved_at >= PROGRESS_SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """Writes the job to its store, if it has one."""
+        if self._store is None:
+            return
+        self._saved_at = time.monotonic()
+        try:
+            self._store.save({**self.to_dict(), "owner": os.getpid(), "owner_started": _process_start_time(os.getpid())})
+        except OSError as e:  # The job keeps running; other workers just see stale progress
+            logger.warning("Could not record export job %s: %s", self.id, e)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "params": self.params,
+                "progress": {
+                    "events_total": self.events_total,
+                    "events_done": self.events_done,
+                    "rows": self.rows,
+                },
+                "failed_events": self.failed_events,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+class JobManager:
+    """Runs export jobs on a pool of worker threads fed by a queue backend.
+
+    Submitting parameters identical to a queued or running job joins that job instead of
+    starting a duplicate run. With a `store` (FileJobStore) jobs are recorded where the other
+    worker processes see them: any of them reports a job, and duplicates are detected across
+    processes. Each job still runs in the process that accepted it.
+    """
+
+    def __init__(self, run_job, backend=None, workers=1, max_finished_jobs=100, store=None):
+        self.run_job = run_job  # callable(job) -> result dict
+        self.backend = backend or InMemoryQueueBackend()
+        self.store = store
+        self.workers = workers
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs = {}
+        self._active_by_key = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = threading.Event()
+
+    @property
+    def accepting(self):
+        return not self._stopping.is_set()
+
+    def start(self):
+        """Starts the worker threads once; called lazily on first submit."""
+        with self._lock:
+            if self._threads or self._stopping.is_set():
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"export-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, params):
+        """Queues a job for `params`, or returns the in-flight job with the same params.
+
+        Returns (job, created).
+        """
+        key = tuple(sorted(params.items()))
+        with self._lock, (self.store.lock if self.store is not None else nullcontext()):
+            if self._stopping.is_set():
+                raise Exception("Job manager is shutting down.")
+            job_id = self._active_by_key.get(key)
+            if job_id is not None:
+                return self._jobs[job_id], False
+            if self.store is not None:
+                record = self.store.find_active(key)  # Accepted by another worker process
+                if record is not None:
+                    return StoredJob(record), False
+
+            job = ExportJob(key, params, store=self.store)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job.id
+            self._prune()
+            if self.store is not None:
+                job.save()
+                self.store.prune(self.max_finished_jobs)
+
+        self.start()
+        self.backend.put(job.id)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            record = self.store.load(job_id)
+            return StoredJob(record) if record is not None else None
+        return job
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond max_finished_jobs."""
+        finished = [job for job in self._jobs.values() if job.status not in ACTIVE_STATUSES]
+        excess = len(finished) - self.max_finished_jobs
+        if excess > 0:
+            for job in sorted(finished, key=lambda job: job.created_at)[:excess]:
+                del self._jobs[job.id]
+
+    def shutdown(self, timeout=None):
+        """Stops taking jobs and waits up to `timeout` seconds for running ones to finish.
+
+        Jobs still queued are marked failed. Returns True if every worker exited in time.
+        """
+        self._stopping.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == JOB_QUEUED:
+                    job.set_status(JOB_FAILED, error="Server shut down before the job started.")
+                    self._active_by_key.pop(job.key, None)
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _work(self):
+        while not self._stopping.is_set():
+            job_id = self.backend.get(timeout=1)
+            if job_id is None:
+                continue
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        job.set_status(JOB_RUNNING)
+        logger.info("Export job %s started with %s", job.id, job.params)
+        try:
+            result = self.run_job(job)
+        except Exception as e:
+            logger.error("Export job %s failed: %s", job.id, e)
+            job.set_status(JOB_FAILED, error=str(e))
+        else:
+            job.set_status(JOB_SUCCEEDED, result=result)
+        finally:
+            with self._lock:
+                self._active_by_key.pop(job.key, None)
@@ -0,0 +1,90 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+class _Buffer:
+    """Text buffer refilled from an iterator of byte or str chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()  # Multi-byte characters may span chunks
+
+    def fill(self):
+        """Appends the next chunk; returns False once the stream is exhausted."""
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+                if not chunk:
+                    continue
+            # Drop the consumed prefix so the buffer only holds the record being parsed
+            self.text = self.text[self.pos:] + chunk
+            self.pos = 0
+            return True
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ("" at end of stream)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON stream: expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value, pulling more chunks while it is incomplete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A value not followed by a delimiter may be a truncated number (e.g. "1." of "1.5")
+                if self.exhausted or (end < len(self.text) and self.text[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self.fill()
+
+def iter_json_items(chunks):
+    """Incrementally parses a top-level JSON array or object from a stream of chunks.
+
+    Yields array elements, or (key, value) pairs for an object, as soon as each one is
+    complete, so memory stays proportional to one record rather than to the whole body.
+    """
+    buffer = _Buffer(chunks)
+    opening = buffer.peek()
+    if opening not in ("[", "{"):
+        raise ValueError("Invalid JSON stream: expected a top-level array or object")
+    closing = "]" if opening == "[" else "}"
+    buffer.expect(opening)
+
+    if buffer.peek() == closing:
+        return
+    while True:
+        if opening == "[":
+            yield buffer.value()
+        else:
+            key = buffer.value()
+            buffer.expect(":")
+            yield key, buffer.value()
+
+        separator = buffer.peek()
+        if separator == closing:
+            return
+        buffer.expect(",")
@@ -0,0 +1,127 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+
+SECRET_PATTERNS = [
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9\-._~+/=]+", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"(Basic\s+)[A-Za-z0-9+/=]+", re.IGNORECASE), r"\1[REDACTED]"),
+    (re.compile(r"""(["']?(?:token|password|secret|authorization)["']?\s*[:=]\s*["']?)(?!(?:Bearer|Basic)\s)[^"',\s}]+""",
+                re.IGNORECASE),
+     r"\1[REDACTED]"),
+]
+
+def redact(text):
+    """Masks bearer/basic credentials and token/password values in a log message."""
+    for pattern, replacement in SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+class RedactingFilter(logging.Filter):
+    """Renders the message once and strips secrets from it before it leaves the caller."""
+
+    def filter(self, record):
+        message = record.getMessage()
+        redacted = redact(message)
+        if redacted != message:
+            record.msg = redacted
+            record.args = None
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per (logger, message template) for records below WARNING.
+
+    Per-item messages such as "Fetching participants from: %s" share one template, so a large
+    export emits at most `rate` of them per second (plus `burst`); the number of dropped records
+    is reported on the next one that gets through.
+    """
+
+    def __init__(self, rate=10.0, burst=20):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # key -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+_listener = None
+_handler = None
+_settings = None
+_setup_lock = threading.Lock()
+
+def configure_logging(level="INFO", rate=10.0, burst=20, stream=None):
+    """Routes all logging through a non-blocking queue handler drained by a background thread.
+
+    Callers only pay for the level check, redaction and an enqueue; formatting and the actual
+    write happen on the listener thread. Safe to call more than once.
+    """
+    global _listener, _handler, _settings
+    with _setup_lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+        if _listener is not None:
+            return
+        if _settings is None:
+            # The listener thread does not survive fork (e.g. gunicorn --preload); restart it in children
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        _settings = (level, rate, burst, stream)
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"))
+
+        _handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+        _handler.addFilter(RateLimitFilter(rate, burst))
+        _handler.addFilter(RedactingFilter())
+        root.addHandler(_handler)
+
+        _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+def _restart_after_fork():
+    """Replaces the handler/listener inherited from the parent with fresh ones in a forked child."""
+    global _listener, _handler, _setup_lock
+    _setup_lock = threading.Lock()  # may have been held by another thread at fork time
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(_handler)
+    _listener = None
+    _handler = None
+    configure_logging(*_settings)
+
+def shutdown_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            logging.getLogger().removeHandler(_handler)
+            _listener.stop()
+            _listener = None
+            _handler = None
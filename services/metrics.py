@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def state(self):
+        """Returns the values to add up across processes ({labelvalues tuple: value}), or None if they are per process."""
+        return None
+
+    def render(self, state=None):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples(state))
+        return lines
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def state(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def combine(value, other):
+        return value + other
+
+    def _samples(self, state=None):
+        values = self.state() if state is None else state
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+class Gauge(_Metric):
+    """A value that can go up and down; `callback` makes it read a live value at scrape time."""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self.callback = callback  # callable returning {labelvalues tuple: value}
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self, state=None):
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values.update(self.callback())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # labelvalues -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the wall time of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-1] if series else 0
+
+    def state(self):
+        with self._lock:
+            return {key: list(series) for key, series in self._series.items()}
+
+    @staticmethod
+    def combine(series, other):
+        return [value + other_value for value, other_value in zip(series, other)]
+
+    def _samples(self, state=None):
+        snapshot = self.state() if state is None else state
+        lines = []
+        for key, series in snapshot.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Adds a metric, or returns the already registered one with the same name."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def get(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def state(self):
+        """Returns the counter and histogram values as JSON-compatible data, to be added up by other processes."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        shared = {}
+        for metric in metrics:
+            state = metric.state()
+            if state is not None:
+                shared[metric.name] = [[list(key), value] for key, value in state.items()]
+        return shared
+
+    def render(self, other_states=()):
+        """Returns all metrics in the Prometheus text exposition format.
+
+        `other_states` are state() results of other processes, added to this process's counters and histograms.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            state = metric.state()
+            if state is not None:
+                for other in other_states:
+                    for key, value in other.get(metric.name, ()):
+                        key = tuple(key)
+                        state[key] = metric.combine(state[key], value) if key in state else value
+            lines.extend(metric.render(state))
+        return "\n".join(lines) + "\n"
+
+class MetricsDirectory:
+    """Shares a registry's counters and histograms between the worker processes of one host.
+
+    Each worker writes its values to `<directory>/worker-<pid>.json` every `interval` seconds (and when it exits),
+    and render() adds the files of the other workers to its own live values, so a scrape reports the totals of
+    the host whichever worker answers. Files of exited workers are kept, as their counts are part of the totals;
+    clear() removes them all when the server starts. Gauges stay per process.
+    """
+
+    def __init__(self, registry, directory, interval=5.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+        self._stopped = threading.Event()
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"worker-{pid}.json")
+
+    def clear(self):
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith("worker-") and file_name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    pass
+
+    def write(self):
+        """Writes this process's values for the other workers."""
+        fd, tmp_name = tempfile.mkstemp(prefix=".worker-", suffix=".json.tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as state_file:
+                json.dump(self.registry.state(), state_file)
+            os.replace(tmp_name, self._path(os.getpid()))
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def _write_logged(self):
+        try:
+            self.write()
+        except OSError as e:  # The other workers just report this one's older values
+            logger.warning("Could not write metrics to %s: %s", self.directory, e)
+
+    def start(self):
+        """Starts writing this process's values in the background; call it in each worker after the fork."""
+        def run():
+            while not self._stopped.wait(self.interval):
+                self._write_logged()
+
+        self._stopped.clear()
+        threading.Thread(target=run, name="metrics-writer", daemon=True).start()
+
+    def stop(self):
+        """Stops the background writer and writes the final values."""
+        self._stopped.set()
+        self._write_logged()
+
+    def other_states(self):
+        own = os.path.basename(self._path(os.getpid()))
+        states = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.startswith("worker-") or not file_name.endswith(".json") or file_name == own:
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), encoding="utf-8") as state_file:
+                    states.append(json.load(state_file))
+            except (OSError, ValueError):  # Removed or replaced while listing
+                continue
+        return states
+
+    def render(self):
+        """Returns the registry with the counters and histograms of every worker of this host."""
+        return self.registry.render(self.other_states())
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "endpoint", "status")
+))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "luxid_stage_duration_seconds", "Time spent per export pipeline stage.", ("stage",)
+))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    "luxid_upstream_responses_total", "Responses received from the Luxid API.", ("endpoint", "status")
+))
+TOKEN_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "luxid_token_cache_lookups_total", "Bearer token cache lookups.", ("result",)
+))
+ROWS_EXPORTED = REGISTRY.register(Counter(
+    "luxid_rows_exported_total", "Participant rows written to exports.", ("output",)
+))
+FAILED_EVENTS = REGISTRY.register(Counter(
+    "luxid_failed_events_total", "Events left out of an export because their participants could not be fetched.", ("reason",)
+))
+PARTIAL_EXPORTS = REGISTRY.register(Counter(
+    "luxid_partial_exports_total", "Exports completed without some of their events.", ()
+))
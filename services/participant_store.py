@@ -0,0 +1,164 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from services.field_mapping import BOOLEAN_FIELDS
+from services.exporters import read_csv_header, read_csv_rows
+from services.metrics import STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Columns that get their own index; (eventType, marketingConsent) covers "consenting b2b participants"
+INDEXED_COLUMNS = ["eventId", "eventType", "emailAddress", "marketingConsent", "orderNewsletter", "willAttend", "didAttend"]
+COMPOSITE_INDEXES = [("eventType", "marketingConsent")]
+# Compared case-insensitively: emails as typed by people, event types exported in lowercase (b2b, b2c)
+NOCASE_COLUMNS = {"emailAddress", "eventType"}
+MAX_PAGE_SIZE = 1000
+INSERT_BATCH_SIZE = 5000
+
+_COLUMN_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+class ParticipantStore:
+    """SQLite copy of the latest export, indexed for filtered, paginated queries.
+
+    The database is derived from the CSV: ingest_csv() replaces its contents in one transaction
+    (readers keep seeing the previous export until it commits) and records the CSV's mtime, so
+    sync_from_csv() only re-ingests when the CSV changed.
+    """
+
+    def __init__(self, file_name, boolean_fields=BOOLEAN_FIELDS):
+        self.file_name = file_name
+        self.boolean_fields = set(boolean_fields)
+        self._write_lock = threading.Lock()
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly so DDL is part of them too
+        connection = sqlite3.connect(self.file_name, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def columns(self):
+        """Returns the participant columns currently stored, or [] before the first ingest."""
+        if not os.path.exists(self.file_name):
+            return []
+        with closing(self._connect()) as connection:
+            return [row["name"] for row in connection.execute("PRAGMA table_info(participants)")]
+
+    def _source_mtime(self, connection):
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = connection.execute("SELECT value FROM meta WHERE key = 'source_mtime'").fetchone()
+        return int(row["value"]) if row else None
+
+    def sync_from_csv(self, csv_path):
+        """Ingests `csv_path` unless the store already holds this version of it. Returns True if it ingested."""
+        if not os.path.exists(csv_path):
+            return False
+        with self._write_lock:
+            with closing(self._connect()) as connection:
+                current = self._source_mtime(connection)
+            if current == os.stat(csv_path).st_mtime_ns:
+                return False
+            self._ingest(csv_path)
+            return True
+
+    def ingest_csv(self, csv_path):
+        """Replaces the stored participants with the rows of `csv_path`. Returns the row count."""
+        with self._write_lock:
+            return self._ingest(csv_path)
+
+    def _ingest(self, csv_path):
+        fieldnames = read_csv_header(csv_path)
+        for name in fieldnames:
+            if not _COLUMN_PATTERN.match(name):
+                raise Exception(f"Unsupported column name: {name!r}")
+        source_mtime = os.stat(csv_path).st_mtime_ns
+
+        started = time.perf_counter()
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute("DROP TABLE IF EXISTS participants")
+                definitions = ", ".join(
+                    f'"{name}" INTEGER' if name in self.boolean_fields
+                    else f'"{name}" TEXT COLLATE NOCASE' if name in NOCASE_COLUMNS
+                    else f'"{name}" TEXT'
+                    for name in fieldnames
+                )
+                connection.execute(f"CREATE TABLE participants (id INTEGER PRIMARY KEY, {definitions})")
+
+                placeholders = ", ".join("?" for _ in fieldnames)
+                quoted = ", ".join(f'"{name}"' for name in fieldnames)
+                insert = f"INSERT INTO participants ({quoted}) VALUES ({placeholders})"
+                count = 0
+                batch = []
+                for row in read_csv_rows(csv_path, self.boolean_fields):
+                    batch.append(tuple(row.get(name) for name in fieldnames))
+                    if len(batch) >= INSERT_BATCH_SIZE:
+                        connection.executemany(insert, batch)
+                        count += len(batch)
+                        batch = []
+                connection.executemany(insert, batch)
+                count += len(batch)
+
+                # Indexes are built after the bulk insert, which is much cheaper than maintaining them row by row
+                for name in INDEXED_COLUMNS:
+                    if name in fieldnames:
+                        connection.execute(f'CREATE INDEX "idx_{name}" ON participants ("{name}")')
+                for names in COMPOSITE_INDEXES:
+                    if all(name in fieldnames for name in names):
+                        columns = ", ".join(f'"{name}"' for name in names)
+                        connection.execute(f'CREATE INDEX "idx_{"_".join(names)}" ON participants ({columns})')
+
+                self._source_mtime(connection)
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('source_mtime', ?)", (str(source_mtime),))
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        STAGE_DURATION.observe(time.perf_counter() - started, stage="store_ingest")
+        logger.info("Participant store now holds %d rows from %s", count, csv_path)
+        return count
+
+    def parse_filters(self, params):
+        """Turns query parameters into {column: value}; raises ValueError for unknown columns or bad booleans."""
+        columns = set(self.columns())
+        filters = {}
+        for name, value in params.items():
+            if name not in columns or name == "id":
+                raise ValueError(f"Unknown filter: {name}")
+            if name in self.boolean_fields:
+                lowered = value.lower()
+                if lowered not in ("1", "true", "yes", "0", "false", "no"):
+                    raise ValueError(f"Filter {name} expects true or false")
+                value = 1 if lowered in ("1", "true", "yes") else 0
+            filters[name] = value
+        return filters
+
+    def query(self, filters=None, limit=100, offset=0):
+        """Returns (rows, total) of participants matching every filter, ordered as exported."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = max(0, offset)
+        filters = filters or {}
+        where = " AND ".join(f'"{name}" = ?' for name in filters) or "1"
+        values = list(filters.values())
+
+        with closing(self._connect()) as connection:
+            connection.execute("BEGIN")  # Count and page from the same snapshot
+            total = connection.execute(f"SELECT COUNT(*) FROM participants WHERE {where}", values).fetchone()[0]
+            cursor = connection.execute(
+                f"SELECT * FROM participants WHERE {where} ORDER BY id LIMIT ? OFFSET ?", values + [limit, offset],
+            )
+            rows = []
+            for record in cursor:
+                row = {name: record[name] for name in record.keys() if name != "id"}
+                for name in self.boolean_fields:
+                    if name in row and row[name] is not None:
+                        row[name] = bool(row[name])
+                rows.append(row)
+            connection.execute("COMMIT")
+        return rows, total
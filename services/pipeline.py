@@ -0,0 +1,84 @@
+"""Builds the export pipeline (client -> processor -> exporter) from config.py.
+
+Shared by the web app and export_cli.py; importing it does not pull in Flask.
+"""
+from services.api_client import TOKEN_TTL, LuxidAPIClient
+from services.circuit_breaker import CircuitBreaker
+from services.event_processor import EventProcessor
+from services.field_mapping import FieldMapping
+from services.rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
+from services.response_cache import DiskCacheBackend, ResponseCache
+from services.shared_cache import SharedTokenCache, backend_from_config
+from services.snapshot_store import SnapshotStore
+from config import (
+    FETCH_MAX_WORKERS, FETCH_FAILURE_POLICY, FETCH_MAX_RETRIES, SNAPSHOT_FILE_PATH, FIELD_MAPPING_FILE, STREAM_JSON,
+    UPSTREAM_EVENT_FILTERS,
+    RESPONSE_CACHE_TTL, RESPONSE_CACHE_STALE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_DIR,
+    UPSTREAM_RATE_LIMIT, UPSTREAM_RATE_BURST, ADAPTIVE_CONCURRENCY, ADAPTIVE_CONCURRENCY_INITIAL,
+    ADAPTIVE_CONCURRENCY_MIN, ADAPTIVE_CONCURRENCY_MAX, ADAPTIVE_LATENCY_TOLERANCE,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, SHARED_CACHE_DIR, SHARED_CACHE_URL,
+)
+
+def make_response_cache():
+    """Returns the configured ResponseCache, or None when RESPONSE_CACHE_TTL is 0.
+
+    With SHARED_CACHE_DIR/SHARED_CACHE_URL its entries are shared by every worker, otherwise
+    they are persisted under RESPONSE_CACHE_DIR when set.
+    """
+    if RESPONSE_CACHE_TTL <= 0:
+        return None
+    backend = backend_from_config(SHARED_CACHE_DIR, SHARED_CACHE_URL, RESPONSE_CACHE_TTL + RESPONSE_CACHE_STALE_TTL,
+                                  prefix="luxid:response:")
+    if backend is None and RESPONSE_CACHE_DIR:
+        backend = DiskCacheBackend(RESPONSE_CACHE_DIR)
+    return ResponseCache(
+        RESPONSE_CACHE_TTL,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+        stale_ttl=RESPONSE_CACHE_STALE_TTL,
+        backend=backend,
+    )
+
+def make_shared_token_cache():
+    """Returns the SharedTokenCache for SHARED_CACHE_DIR/SHARED_CACHE_URL, or None to keep tokens per process."""
+    backend = backend_from_config(SHARED_CACHE_DIR, SHARED_CACHE_URL, TOKEN_TTL, prefix="luxid:")
+    return SharedTokenCache(backend, TOKEN_TTL) if backend is not None else None
+
+def make_client(username, password, token_cache=None, response_cache=None):
+    """Creates an API client with its own rate limit, concurrency limit and circuit breaker from config.py."""
+    concurrency_limiter = None
+    if ADAPTIVE_CONCURRENCY:
+        concurrency_limiter = AdaptiveConcurrencyLimiter(
+            initial=ADAPTIVE_CONCURRENCY_INITIAL,
+            min_limit=ADAPTIVE_CONCURRENCY_MIN,
+            max_limit=ADAPTIVE_CONCURRENCY_MAX,
+            latency_tolerance=ADAPTIVE_LATENCY_TOLERANCE,
+        )
+    return LuxidAPIClient(
+        username, password,
+        response_cache=response_cache,
+        token_cache=token_cache,
+        rate_limiter=TokenBucket(UPSTREAM_RATE_LIMIT, UPSTREAM_RATE_BURST) if UPSTREAM_RATE_LIMIT > 0 else None,
+        concurrency_limiter=concurrency_limiter,
+        circuit_breaker=CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, name=username or "default")
+        if CIRCUIT_FAILURE_THRESHOLD > 0 else None,
+    )
+
+def load_field_mapping():
+    """Returns the built-in field mapping, extended by FIELD_MAPPING_FILE when set."""
+    return FieldMapping.from_file(FIELD_MAPPING_FILE) if FIELD_MAPPING_FILE else FieldMapping()
+
+def build_processor(client, field_mapping, incremental=False, snapshot_path=None, max_workers=None,
+                    failure_policy=None, event_filter=None):
+    """Creates an EventProcessor configured from config.py; keyword arguments override it."""
+    return EventProcessor(
+        client,
+        max_workers=FETCH_MAX_WORKERS if max_workers is None else max_workers,
+        failure_policy=failure_policy or FETCH_FAILURE_POLICY,
+        max_retries=FETCH_MAX_RETRIES,
+        snapshot_store=SnapshotStore(snapshot_path or SNAPSHOT_FILE_PATH) if incremental else None,
+        field_mapping=field_mapping,
+        streaming=STREAM_JSON,
+        event_filter=event_filter,
+        push_filters=UPSTREAM_EVENT_FILTERS,
+    )
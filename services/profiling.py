@@ -0,0 +1,13 @@
+import cProfile
+import io
+import pstats
+
+def run_profiled(func, *args, sort="cumulative", limit=40, **kwargs):
+    """Runs func under cProfile and returns (result, text summary of the top `limit` entries)."""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return result, output.getvalue()
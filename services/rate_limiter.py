@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Client-side request rate limit: `rate` requests per second on average, bursts of up to `burst`.
+
+    A rate of 0 or less disables the limit.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.waited = 0.0  # Total seconds callers spent waiting for a token
+
+    def _reserve(self):
+        """Takes a token, possibly going into debt, and returns how long the caller must wait for it."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            delay = -self._tokens / self.rate
+            self.waited += delay
+            return delay
+
+    def acquire(self):
+        """Blocks until the caller may send one request."""
+        if self.rate <= 0:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            self._sleep(delay)
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent upstream requests.
+
+    Until the first decrease every healthy response raises the limit by one (slow start, doubling
+    it per round trip); after that by `increase / limit` (about +`increase` per round trip). A 429/503, a timeout, or recent latency (a short moving average)
+    above `latency_tolerance` times the baseline (a long one) multiplies it by `decrease_factor`,
+    at most once per window: responses to requests sent before the last decrease do not shrink
+    it again.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, increase=1.0, decrease_factor=0.5,
+                 latency_tolerance=2.0, clock=time.monotonic):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self._clock = clock
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        self._epoch = 0
+        self._baseline = None
+        self._recent = None
+        self._condition = threading.Condition()
+        self.decreases = 0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        """Blocks until fewer than `limit` requests are in flight; returns a slot for release()."""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+            return (self._epoch, self._clock())
+
+    def release(self, slot, overloaded=False):
+        """Returns a slot and adjusts the limit from the outcome of its request.
+
+        `overloaded` is True when the upstream signalled overload; otherwise the request's
+        latency decides whether it counts as healthy. Pass overloaded=None for outcomes that
+        say nothing about upstream load (e.g. a refused connection).
+        """
+        epoch, started = slot
+        latency = self._clock() - started
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded is None:
+                pass
+            elif overloaded or self._record_latency(latency):
+                if epoch == self._epoch:
+                    self._decrease()
+            else:
+                step = 1.0 if self.decreases == 0 else self.increase / self._limit
+                self._limit = min(self.max_limit, self._limit + step)
+            self._condition.notify_all()
+
+    def _record_latency(self, latency):
+        """Updates both latency averages; returns True when recent latency has spiked."""
+        if self._baseline is None:
+            self._baseline = self._recent = latency
+            return False
+        self._recent = 0.7 * self._recent + 0.3 * latency
+        self._baseline = 0.98 * self._baseline + 0.02 * latency
+        return self._recent > self._baseline * self.latency_tolerance
+
+    def _decrease(self):
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+        self._epoch += 1
+        self.decreases += 1
+        logger.info("Upstream overloaded: concurrency limit %d -> %d", previous, self.limit)
+
+    def snapshot(self):
+        with self._condition:
+            return {"limit": self.limit, "in_flight": self._in_flight, "decreases": self.decreases}
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class DiskCacheBackend:
+    """Stores cache entries as files so they survive container restarts."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, key):
+        """Returns (stored_at, payload bytes) or None."""
+        try:
+            with open(self._path(key), "rb") as cache_file:
+                stored_at = float(cache_file.readline())
+                return stored_at, cache_file.read()
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, stored_at, payload):
+        fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as cache_file:
+                cache_file.write(f"{stored_at}\n".encode())
+                cache_file.write(payload)
+            os.replace(tmp_name, self._path(key))
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class ResponseCache:
+    """TTL + LRU cache for decoded JSON responses with stale-while-revalidate.
+
+    Entries are kept serialized, which bounds memory by `max_bytes` precisely and hands every
+    caller its own copy. Within `ttl` an entry is fresh; for a further `stale_ttl` it is served
+    immediately while a single background refresh replaces it.
+    """
+
+    def __init__(self, ttl, max_entries=256, max_bytes=64 * 1024 * 1024, stale_ttl=0, backend=None, clock=time.time):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (stored_at, payload bytes)
+        self._bytes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "revalidations": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.backend is not None:
+            entry = self.backend.get(key)
+            if entry is not None:
+                self._store(key, *entry, persist=False)
+        return entry
+
+    def _store(self, key, stored_at, payload, persist=True):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            if len(payload) <= self.max_bytes:
+                self._entries[key] = (stored_at, payload)
+                self._bytes += len(payload)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+        if persist and self.backend is not None:
+            self.backend.set(key, stored_at, payload)
+
+    def set(self, key, value):
+        self._store(key, self.clock(), json.dumps(value).encode())
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry[1])
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def get_or_fetch(self, key, fetch):
+        """Returns the cached value for `key`, calling `fetch()` on a miss or expiry."""
+        entry = self._lookup(key)
+        if entry is not None:
+            stored_at, payload = entry
+            age = self.clock() - stored_at
+            if age < self.ttl:
+                self._count("hits")
+                return json.loads(payload)
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._revalidate(key, fetch)
+                return json.loads(payload)
+
+        self._count("misses")
+        lock = self._backend_lock(key)
+        if lock is None:
+            value = fetch()
+            self.set(key, value)
+            return value
+
+        # Shared backend: one process fetches, the others wait and read its result
+        with lock:
+            entry = self.backend.get(key)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                self._store(key, *entry, persist=False)
+                return json.loads(entry[1])
+            value = fetch()
+            self.set(key, value)
+            return value
+
+    def _backend_lock(self, key):
+        """Returns the backend's cross-process lock for `key`, if it has locks."""
+        if self.backend is None or not hasattr(self.backend, "lock"):
+            return None
+        return self.backend.lock(f"response:{key}")
+
+    def _revalidate(self, key, fetch):
+        """Refreshes a stale entry in the background, once per key at a time."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        lock = self._backend_lock(key)
+        if lock is not None and not lock.acquire(blocking=False):
+            with self._lock:  # Another process is refreshing it
+                self._refreshing.discard(key)
+            return
+
+        def refresh():
+            try:
+                self.set(key, fetch())
+                self._count("revalidations")
+            except Exception as e:
+                logger.warning("Background revalidation of %s failed: %s", key, e)
+            finally:
+                if lock is not None:
+                    lock.release()
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="cache-revalidate", daemon=True).start()
+
+    def snapshot(self):
+        """Returns the hit/miss counters together with the current size."""
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes}
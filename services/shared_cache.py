@@ -0,0 +1,282 @@
+"""Cache backends shared by every worker process (and, with a networked store, every replica).
+
+A backend stores `(stored_at, payload bytes)` per key, like DiskCacheBackend, and hands out
+named locks so that only one process refreshes a token or an API response at a time:
+
+- FileCacheBackend: files plus fcntl.flock() locks, for the processes of one host.
+- StoreCacheBackend: any networked key-value store with the redis-py subset
+  `get(key)`, `set(key, value, px=..., nx=...)` and `delete(key)`. MemoryStore is an
+  in-process stand-in with the same methods, for tests and single-process setups.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+from services.response_cache import DiskCacheBackend
+
+try:
+    import redis
+except ImportError:  # Networked shared caches are optional
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_INTERVAL = 0.05
+
+class SharedCacheBackend:
+    """Interface of shared cache backends; see the module docstring."""
+
+    def get(self, key):
+        """Returns (stored_at, payload bytes) or None."""
+        raise NotImplementedError
+
+    def set(self, key, stored_at, payload):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def lock(self, name):
+        """Returns a lock (acquire(blocking=True, timeout=-1), release(), context manager) shared across processes."""
+        raise NotImplementedError
+
+class FileLock:
+    """Exclusive lock on a file, held through flock() so the kernel releases it if the process dies.
+
+    A thread lock in front of it serialises the threads of this process, since they share the
+    lock object.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        deadline = None if timeout < 0 else time.monotonic() + timeout
+        if not self._thread_lock.acquire(blocking, timeout):
+            return False
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking and deadline is None else fcntl.LOCK_NB))
+                self._fd = fd
+                return True
+            except BlockingIOError:
+                if not blocking or time.monotonic() >= deadline:
+                    os.close(fd)
+                    self._thread_lock.release()
+                    return False
+                time.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class FileCacheBackend(DiskCacheBackend, SharedCacheBackend):
+    """DiskCacheBackend (atomic file writes) plus flock() locks, shared by the processes of one host."""
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        os.chmod(directory, 0o700)  # Entries include bearer tokens
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def lock(self, name):
+        with self._locks_guard:
+            lock = self._locks.get(name)
+            if lock is None:
+                path = os.path.join(self.directory, hashlib.sha256(name.encode()).hexdigest() + ".lock")
+                lock = self._locks[name] = FileLock(path)
+            return lock
+
+class StoreLock:
+    """Lease on a key of a networked store (SET NX PX), released by deleting it.
+
+    The lease expires after `lease` seconds, so a crashed holder cannot block others for longer.
+    """
+
+    def __init__(self, store, key, lease=30.0):
+        self.store = store
+        self.key = key
+        self.lease = lease
+        self._thread_lock = threading.Lock()
+        self._token = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        deadline = None if timeout < 0 else time.monotonic() + timeout
+        if not self._thread_lock.acquire(blocking, timeout):
+            return False
+        token = uuid.uuid4().hex
+        while not self.store.set(self.key, token.encode(), px=int(self.lease * 1000), nx=True):
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                self._thread_lock.release()
+                return False
+            time.sleep(LOCK_POLL_INTERVAL)
+        self._token = token
+        return True
+
+    def release(self):
+        token, self._token = self._token, None
+        # Only drop our own lease; a different value means it expired and someone else holds it
+        if self.store.get(self.key) == token.encode():
+            self.store.delete(self.key)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class StoreCacheBackend(SharedCacheBackend):
+    """Cache entries and locks kept in a networked key-value store.
+
+    Entries expire in the store after `expire_after` seconds (None keeps them until overwritten),
+    so the store does not grow without bound.
+    """
+
+    def __init__(self, store, prefix="luxid:", expire_after=None, lock_lease=30.0):
+        self.store = store
+        self.prefix = prefix
+        self.expire_after = expire_after
+        self.lock_lease = lock_lease
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def get(self, key):
+        value = self.store.get(self.prefix + key)
+        if value is None:
+            return None
+        stored_at, _, payload = value.partition(b"\n")
+        try:
+            return float(stored_at), payload
+        except ValueError:
+            return None
+
+    def set(self, key, stored_at, payload):
+        px = int(self.expire_after * 1000) if self.expire_after else None
+        self.store.set(self.prefix + key, f"{stored_at}\n".encode() + payload, px=px)
+
+    def delete(self, key):
+        self.store.delete(self.prefix + key)
+
+    def lock(self, name):
+        with self._locks_guard:
+            lock = self._locks.get(name)
+            if lock is None:
+                lock = self._locks[name] = StoreLock(self.store, f"{self.prefix}lock:{name}", self.lock_lease)
+            return lock
+
+class MemoryStore:
+    """In-process stand-in for a networked store, implementing the redis-py methods StoreCacheBackend uses."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._values = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key, value, px=None, nx=False):
+        with self._lock:
+            entry = self._values.get(key)
+            if nx and entry is not None and (entry[1] is None or self._clock() < entry[1]):
+                return None
+            self._values[key] = (value, self._clock() + px / 1000 if px else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return int(self._values.pop(key, None) is not None)
+
+def backend_from_config(directory=None, url=None, expire_after=None, prefix="luxid:"):
+    """Returns the shared backend for a directory or a redis:// URL, or None when neither is set."""
+    if url:
+        if redis is None:
+            raise Exception("SHARED_CACHE_URL needs the 'redis' package.")
+        return StoreCacheBackend(redis.Redis.from_url(url), prefix=prefix, expire_after=expire_after)
+    if directory:
+        return FileCacheBackend(directory)
+    return None
+
+class _SharedExpiry:
+    """Read-only view of token expiries in the monotonic clock LuxidAPIClient compares against."""
+
+    def __init__(self, tokens):
+        self._tokens = tokens
+
+    def get(self, username, default=None):
+        entry = self._tokens.backend.get(self._tokens.key(username))
+        if entry is None:
+            return default
+        return time.monotonic() + (entry[0] + self._tokens.ttl - self._tokens.clock())
+
+    def __setitem__(self, username, expires_at):
+        pass  # Implied by the token's stored_at
+
+    def pop(self, username, default=None):
+        return default
+
+class SharedTokenCache:
+    """Bearer tokens in a shared backend, with one cross-process login lock per username.
+
+    Used as LuxidAPIClient's token_cache: every worker reuses the token whichever worker logged
+    in, and only the worker holding the lock logs in or refreshes.
+    """
+
+    def __init__(self, backend, ttl, clock=time.time):
+        self.backend = backend
+        self.ttl = ttl
+        self.clock = clock
+        self.expiry = _SharedExpiry(self)
+
+    @staticmethod
+    def key(username):
+        return f"token:{username}"
+
+    def get(self, username, default=None):
+        entry = self.backend.get(self.key(username))
+        if entry is None or self.clock() - entry[0] >= self.ttl:
+            return default
+        return entry[1].decode()
+
+    def __getitem__(self, username):
+        token = self.get(username)
+        if token is None:
+            raise KeyError(username)
+        return token
+
+    def __setitem__(self, username, token):
+        self.backend.set(self.key(username), self.clock(), token.encode())
+
+    def pop(self, username, default=None):
+        token = self.get(username, default)
+        self.backend.delete(self.key(username))
+        return token
+
+    def lock(self, username):
+        return self.backend.lock(f"login:{username}")
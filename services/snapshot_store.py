@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+class SnapshotStore:
+    """Keeps the last synced state of every event on disk so unchanged events can be skipped.
+
+    Each entry holds a content hash of the raw event entry, the ETag/Last-Modified validators
+    returned for its participants URL (when the API sends them) and the rows last exported.
+
+    The rows of every event are kept in this one JSON file and loaded into memory on each
+    incremental run, so memory grows with the size of the export, unlike a full streamed export.
+    Runs sharing the file (web, jobs, CLI) each save a complete snapshot; the last one wins, and
+    events missing from it are simply fetched again next time.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self._lock = threading.Lock()
+        self._snapshots = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.file_name):
+            return {}
+        try:
+            with open(self.file_name, encoding="utf-8") as snapshot_file:
+                return json.load(snapshot_file)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable snapshot file %s: %s", self.file_name, e)
+            return {}
+
+    def get(self, event_id):
+        """Returns the stored snapshot for an event, or None."""
+        with self._lock:
+            return self._snapshots.get(event_id)
+
+    def put(self, event_id, event_hash, rows, etag=None, last_modified=None):
+        """Records the latest synced state of an event."""
+        with self._lock:
+            self._snapshots[event_id] = {
+                "hash": event_hash,
+                "etag": etag,
+                "last_modified": last_modified,
+                "rows": [dict(row) for row in rows],
+            }
+
+    def retain(self, event_ids):
+        """Drops snapshots of events that no longer exist upstream."""
+        keep = set(event_ids)
+        with self._lock:
+            for event_id in list(self._snapshots):
+                if event_id not in keep:
+                    del self._snapshots[event_id]
+
+    def save(self):
+        """Writes the snapshots to disk atomically."""
+        # A temp file of its own, so concurrent runs saving the same store cannot clobber each other's writes
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        fd, tmp_name = tempfile.mkstemp(prefix=".snapshots-", suffix=".json.tmp", dir=directory)
+        try:
+            with self._lock:
+                with os.fdopen(fd, "w", encoding="utf-8") as snapshot_file:
+                    json.dump(self._snapshots, snapshot_file)
+            os.replace(tmp_name, self.file_name)
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._snapshots)
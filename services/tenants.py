@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from cachetools import TTLCache
+from services.api_client import TOKEN_TTL
+from services.shared_cache import FileLock
+
+logger = logging.getLogger(__name__)
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class TenantBusy(Exception):
+    """Raised when a tenant already runs as many exports as it is allowed to."""
+
+class Tenant:
+    """One Luxid account: its credentials, where its exports are written and how many may run at once."""
+
+    def __init__(self, tenant_id, username, password, output_dir, max_concurrent_exports=1):
+        if not TENANT_ID_PATTERN.match(tenant_id or ""):
+            raise Exception(f"Invalid tenant id: {tenant_id!r}")
+        self.id = tenant_id
+        self.username = username
+        self.password = password
+        self.output_dir = output_dir
+        self.max_concurrent_exports = max_concurrent_exports
+        self._slots = None
+        self._slots_guard = threading.Lock()
+
+    @property
+    def csv_path(self):
+        return os.path.join(self.output_dir, "participants.csv")
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.output_dir, "snapshots.json")
+
+    def export_slot(self):
+        """Claims one of the tenant's export slots without waiting; raises TenantBusy if none is free.
+
+        Slots are flock()-locked files in the output directory, so the limit holds across the
+        worker processes of a host (and the kernel frees the slot of a process that dies).
+        Use as a context manager: `with tenant.export_slot(): ...`.
+        """
+        with self._slots_guard:
+            if self._slots is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._slots = [FileLock(os.path.join(self.output_dir, f".export-slot-{index}.lock"))
+                               for index in range(self.max_concurrent_exports)]
+        for slot in self._slots:
+            if slot.acquire(blocking=False):
+                return _Slot(slot)
+        raise TenantBusy(f"Tenant {self.id} already runs {self.max_concurrent_exports} export(s).")
+
+class _Slot:
+    def __init__(self, lock):
+        self._lock = lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+class TenantRegistry:
+    """Tenants by id, each with its own lazily created LuxidAPIClient.
+
+    A client owns its token cache and connection pool, so tenants never share tokens or
+    sockets. At most `max_clients` clients are kept; the least recently used one is closed
+    when another is needed, which keeps hundreds of mostly idle accounts cheap.
+    """
+
+    def __init__(self, tenants, client_factory, max_clients=64):
+        self._tenants = {tenant.id: tenant for tenant in tenants}
+        self.client_factory = client_factory  # callable(tenant, token_cache) -> LuxidAPIClient
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, file_name, output_root, client_factory, max_clients=64):
+        """Loads tenants from a JSON file.
+
+        The file holds {"tenants": [{"id", "username", "password" | "password_env",
+        "output_dir"?, "max_concurrent_exports"?}, ...]}. `password_env` names an environment
+        variable holding the password so the file itself can stay free of secrets. Output
+        directories default to `<output_root>/<id>`.
+        """
+        with open(file_name, encoding="utf-8") as tenants_file:
+            entries = json.load(tenants_file).get("tenants", [])
+
+        tenants = []
+        for entry in entries:
+            password = entry.get("password")
+            if password is None and entry.get("password_env"):
+                password = os.getenv(entry["password_env"])
+            tenants.append(Tenant(
+                entry.get("id"),
+                entry.get("username"),
+                password,
+                entry.get("output_dir") or os.path.join(output_root, entry.get("id") or ""),
+                max_concurrent_exports=int(entry.get("max_concurrent_exports", 1)),
+            ))
+        logger.info("Loaded %d tenant(s) from %s", len(tenants), file_name)
+        return cls(tenants, client_factory, max_clients=max_clients)
+
+    def __len__(self):
+        return len(self._tenants)
+
+    def ids(self):
+        return sorted(self._tenants)
+
+    def get(self, tenant_id):
+        """Returns the tenant with this id, or None."""
+        return self._tenants.get(tenant_id)
+
+    def client(self, tenant):
+        """Returns the tenant's API client, creating it (and evicting the least recently used) if needed."""
+        with self._lock:
+            client = self._clients.get(tenant.id)
+            if client is not None:
+                self._clients.move_to_end(tenant.id)
+                return client
+
+            client = self.client_factory(tenant, TTLCache(maxsize=1, ttl=TOKEN_TTL))
+            self._clients[tenant.id] = client
+            while len(self._clients) > self.max_clients:
+                evicted_id, evicted = self._clients.popitem(last=False)
+                logger.debug("Closing idle client of tenant %s", evicted_id)
+                evicted.close()
+            return client
+
+    def clients(self):
+        """Returns (tenant id, client) pairs for the clients currently open."""
+        with self._lock:
+            return list(self._clients.items())
+
+    def active_clients(self):
+        with self._lock:
+            return len(self._clients)
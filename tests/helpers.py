@@ -0,0 +1,24 @@
+import json
+
+import requests
+
+class FakeClock:
+    """Manually advanced clock for the `clock=` (and `sleep=`) hooks of limiters, breakers and caches."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def make_response(status_code, payload=None, headers=None):
+    """Builds a real requests.Response carrying the given status, JSON body and headers."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload).encode() if payload is not None else b""
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
@@ -0,0 +1,79 @@
+import csv
+import os
+import tempfile
+import unittest
+from services.aggregator import ParticipantAggregator, aggregated_export, read_people_rows, time_key, time_value
+from services.csv_exporter import FIELDNAMES
+
+ROWS = [
+    {"eventId": "1", "eventStartTime": "01-15-2025 09:00:00", "firstName": "Ann", "lastName": "Lee",
+     "emailAddress": " Ann@Example.com", "willAttend": True, "didAttend": True, "marketingConsent": False, "orderNewsletter": "No"},
+    {"eventId": "3", "eventStartTime": "12-01-2024 09:00:00", "firstName": "Annie", "lastName": "Lee",
+     "emailAddress": "ann@example.com", "willAttend": True, "didAttend": False, "marketingConsent": False, "orderNewsletter": "No"},
+    {"eventId": "2", "eventStartTime": "03-02-2025 18:30:00", "firstName": "Ann", "lastName": "Lee-Park",
+     "emailAddress": "ANN@example.com ", "willAttend": False, "didAttend": False, "marketingConsent": True, "orderNewsletter": "Yes"},
+    {"eventId": "2", "eventStartTime": "03-02-2025 18:30:00", "firstName": "Bob", "lastName": "Ray",
+     "emailAddress": "bob@example.com", "willAttend": True, "didAttend": True, "marketingConsent": True, "orderNewsletter": "Yes"},
+    {"eventId": "2", "eventStartTime": "03-02-2025 18:30:00", "firstName": "No", "lastName": "Email",
+     "emailAddress": "", "willAttend": True, "didAttend": True, "marketingConsent": True, "orderNewsletter": "Yes"},
+]
+
+class TestParticipantAggregator(unittest.TestCase):
+    def test_merges_by_normalized_email(self):
+        """Test counts, attendance rate and that the most recent event decides consent and names."""
+        with ParticipantAggregator() as aggregator:
+            people = list(aggregator.add_all(ROWS).results())
+
+        self.assertEqual(aggregator.skipped, 1)
+        self.assertEqual([person["emailAddress"] for person in people], ["ann@example.com", "bob@example.com"])
+        ann = people[0]
+        self.assertEqual(ann["events"], 3)
+        self.assertEqual(ann["willAttendCount"], 2)
+        self.assertEqual(ann["attendedCount"], 1)
+        self.assertEqual(ann["attendanceRate"], 0.3333)
+        self.assertEqual(ann["firstEventTime"], "12-01-2024 09:00:00")
+        self.assertEqual(ann["lastEventTime"], "03-02-2025 18:30:00")
+        self.assertEqual(ann["lastEventId"], "2")
+        self.assertEqual(ann["lastName"], "Lee-Park")
+        self.assertIs(ann["marketingConsent"], True)
+        self.assertEqual(ann["orderNewsletter"], "Yes")
+
+    def test_spilling_gives_the_same_result(self):
+        """Test that merging through the SQLite spill table matches the in-memory result."""
+        with ParticipantAggregator() as aggregator:
+            expected = list(aggregator.add_all(ROWS).results())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with ParticipantAggregator(max_entries=1, spill_dir=tmp_dir) as aggregator:
+                spilled = list(aggregator.add_all(ROWS).results())
+                self.assertGreater(aggregator.spills, 0)
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+        self.assertEqual(spilled, expected)
+
+    def test_time_key_round_trip(self):
+        """Test that time keys sort chronologically and convert back to the export format."""
+        self.assertLess(time_key("12-01-2024 09:00:00"), time_key("01-15-2025 09:00:00"))
+        self.assertEqual(time_value(time_key("03-02-2025 18:30:00")), "03-02-2025 18:30:00")
+
+    def test_aggregated_export_is_cached_until_the_csv_changes(self):
+        """Test that the per-person CSV is written next to the export and rebuilt only when it is stale."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+                writer.writeheader()
+                writer.writerows(ROWS)
+
+            path = aggregated_export(csv_path)
+            self.assertEqual(path, os.path.join(tmp_dir, "participants.people.csv"))
+            people = list(read_people_rows(path))
+            self.assertEqual(people[0]["events"], 3)
+            self.assertIs(people[1]["marketingConsent"], True)
+
+            built = os.stat(path).st_ino
+            self.assertEqual(os.stat(aggregated_export(csv_path)).st_ino, built)
+            os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 1_000_000))
+            self.assertNotEqual(os.stat(aggregated_export(csv_path)).st_ino, built)
+
+if __name__ == "__main__":
+    unittest.main()
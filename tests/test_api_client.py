@@ -1,66 +1,89 @@
+import io
+import threading
+import time
 import pytest
+import requests
 from unittest.mock import patch, MagicMock
-from services.api_client import LuxidAPIClient, get_api_client, token_cache
+from services.api_client import LuxidAPIClient, get_api_client, token_cache, token_expiry
+from services.response_cache import ResponseCache
+from tests.helpers import make_response
+
+BASE_URL = "https://recruiment-api-1069519412575.europe-west3.run.app"
 
 @pytest.fixture(autouse=True)
 def clear_token_cache():
     """Automatically clears the token cache before each test."""
     token_cache.clear()
-    
+    token_expiry.clear()
+
 @pytest.fixture
 def mock_client():
     """Creates a LuxidAPIClient instance for testing."""
-    return LuxidAPIClient(username="test_user", password="test_pass")
+    return LuxidAPIClient(username="test_user", password="test_pass", backoff_factor=0)
 
-@patch("services.api_client.requests.post")
-def test_authenticate_success(mock_post, mock_client):
+def make_stream_response(status_code, body, headers=None):
+    """Builds a streamed requests.Response whose body is read from a byte stream."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(body)
+    response.headers.update(headers or {})
+    return response
+
+@patch("services.api_client.requests.Session.request")
+def test_authenticate_success(mock_request, mock_client):
     """Test that authentication successfully retrieves and caches a token."""
-    mock_post.return_value.status_code = 200
-    mock_post.return_value.json.return_value = {"token": "mocked_token"}
+    mock_request.return_value = make_response(200, {"token": "mocked_token"})
 
     mock_client.authenticate()
     
     # Verify token was cached
     assert token_cache["test_user"] == "mocked_token"
 
-@patch("services.api_client.requests.post")
-def test_authenticate_failure(mock_post, mock_client):
+@patch("services.api_client.requests.Session.request")
+def test_authenticate_failure(mock_request, mock_client):
     """Test authentication failure when the API returns an error."""
-    mock_post.return_value.status_code = 401
+    mock_request.return_value = make_response(401)
 
     with pytest.raises(Exception, match="Authentication failed: 401"):
         mock_client.authenticate()
 
-@patch("services.api_client.requests.get")
-def test_fetch_events_with_cached_token(mock_get, mock_client):
+@patch("services.api_client.requests.Session.request")
+def test_fetch_events_with_cached_token(mock_request, mock_client):
     """Test that fetching events works when a cached token is available."""
     # Simulate cached token
     token_cache["test_user"] = "mocked_token"
 
-    mock_get.return_value.status_code = 200
-    mock_get.return_value.json.return_value = [{"event_id": "123"}]
+    mock_request.return_value = make_response(200, [{"event_id": "123"}])
 
     events = mock_client.fetch_events()
 
     # Ensure the API call was made with the correct headers
-    mock_get.assert_called_once_with(
-        "https://recruiment-api-1069519412575.europe-west3.run.app/events",
-        headers={"Authorization": "Bearer mocked_token"}
+    mock_request.assert_called_once_with(
+        "GET",
+        f"{BASE_URL}/events",
+        headers={"Authorization": "Bearer mocked_token"},
+        timeout=mock_client.timeout,
     )
     
     assert events == [{"event_id": "123"}]
 
-@patch("services.api_client.requests.get")
-@patch("services.api_client.requests.post")
-def test_fetch_events_with_expired_token(mock_post, mock_get, mock_client):
-    """Test that a new token is requested when the old one is expired."""
-    mock_get.return_value.status_code = 401  # Simulate expired token response
+@patch("services.api_client.requests.Session.request")
+def test_fetch_events_with_filter_params(mock_request, mock_client):
+    """Test that listing filters are sent as query parameters."""
+    token_cache["test_user"] = "mocked_token"
+    mock_request.return_value = make_response(200, [])
+
+    mock_client.fetch_events({"event_type": "b2b", "start_time_from": 100})
 
-    mock_post.return_value.status_code = 200
-    mock_post.return_value.json.return_value = {"token": "new_mocked_token"}
+    assert mock_request.call_args.args[1] == f"{BASE_URL}/events?event_type=b2b&start_time_from=100"
 
-    mock_get.return_value.status_code = 200
-    mock_get.return_value.json.return_value = [{"event_id": "456"}]
+@patch("services.api_client.requests.Session.request")
+def test_fetch_events_with_expired_token(mock_request, mock_client):
+    """Test that a new token is requested when the old one is expired."""
+    mock_request.side_effect = [
+        make_response(200, {"token": "new_mocked_token"}),
+        make_response(200, [{"event_id": "456"}]),
+    ]
 
     events = mock_client.fetch_events()
 
@@ -68,45 +91,353 @@ def test_fetch_events_with_expired_token(mock_post, mock_get, mock_client):
     assert token_cache["test_user"] == "new_mocked_token"
 
     # Ensure the second API request was made with the new token
-    mock_get.assert_called_with(
-        "https://recruiment-api-1069519412575.europe-west3.run.app/events",
-        headers={"Authorization": "Bearer new_mocked_token"}
+    mock_request.assert_called_with(
+        "GET",
+        f"{BASE_URL}/events",
+        headers={"Authorization": "Bearer new_mocked_token"},
+        timeout=mock_client.timeout,
     )
 
     assert events == [{"event_id": "456"}]
 
-@patch("services.api_client.requests.get")
-def test_fetch_participants_success(mock_get, mock_client):
+@patch("services.api_client.requests.Session.request")
+def test_fetch_participants_success(mock_request, mock_client):
     """Test that fetching participants works with a valid token."""
     token_cache["test_user"] = "mocked_token"
 
-    mock_get.return_value.status_code = 200
-    mock_get.return_value.json.return_value = {"participant_id": "789"}
+    mock_request.return_value = make_response(200, {"participant_id": "789"})
 
     participants_url = "https://api.example.com/events/participants/123"
     participants = mock_client.fetch_participants(participants_url)
 
-    mock_get.assert_called_once_with(
+    mock_request.assert_called_once_with(
+        "GET",
         participants_url,
-        headers={"Authorization": "Bearer mocked_token"}
+        headers={"Authorization": "Bearer mocked_token"},
+        timeout=mock_client.timeout,
     )
 
     assert participants == {"participant_id": "789"}
 
-@patch("services.api_client.requests.get")
-def test_fetch_participants_failure(mock_get, mock_client):
-    """Test that fetching participants fails gracefully."""
+@patch("services.api_client.time.sleep")
+@patch("services.api_client.requests.Session.request")
+def test_fetch_participants_failure(mock_request, mock_sleep, mock_client):
+    """Test that fetching participants fails gracefully once retries are exhausted."""
     token_cache["test_user"] = "mocked_token"
 
-    mock_get.return_value.status_code = 500
+    mock_request.return_value = make_response(500)
 
     participants_url = "https://api.example.com/events/participants/123"
 
     with pytest.raises(Exception, match="Failed to fetch participants: 500"):
         mock_client.fetch_participants(participants_url)
 
+    assert mock_request.call_count == mock_client.max_retries + 1
+    assert mock_client.stats["retries"] == mock_client.max_retries
+
+@patch("services.api_client.time.sleep")
+@patch("services.api_client.requests.Session.request")
+def test_retry_after_header_is_respected(mock_request, mock_sleep, mock_client):
+    """Test that a 429 with Retry-After waits the advertised time before retrying."""
+    token_cache["test_user"] = "mocked_token"
+
+    mock_request.side_effect = [
+        make_response(429, headers={"Retry-After": "2"}),
+        make_response(200, [{"event_id": "1"}]),
+    ]
+
+    assert mock_client.fetch_events() == [{"event_id": "1"}]
+    mock_sleep.assert_called_once_with(2.0)
+    assert mock_client.stats["requests"] == 2
+    assert mock_client.stats["retries"] == 1
+
+@patch("services.api_client.time.sleep")
+@patch("services.api_client.requests.Session.request")
+def test_retries_connection_errors(mock_request, mock_sleep, mock_client):
+    """Test that transient connection errors are retried with backoff."""
+    token_cache["test_user"] = "mocked_token"
+
+    mock_request.side_effect = [
+        requests.ConnectionError("reset"),
+        make_response(200, [{"event_id": "1"}]),
+    ]
+
+    assert mock_client.fetch_events() == [{"event_id": "1"}]
+    assert mock_sleep.call_count == 1
+
+def test_backoff_is_capped(mock_client):
+    """Test that jittered exponential backoff never exceeds the configured maximum."""
+    mock_client.backoff_factor = 1
+    mock_client.backoff_max = 5
+
+    delays = [mock_client._retry_delay(attempt) for attempt in range(10)]
+
+    assert all(0 <= delay <= 5 for delay in delays)
+
+def test_session_is_shared(mock_client):
+    """Test that the client keeps one pooled session for all calls."""
+    assert isinstance(mock_client.session, requests.Session)
+    assert mock_client.stats == {
+        "requests": 0, "retries": 0, "logins": 0, "reauths": 0,
+        "connections_opened": 0, "connections_reused": 0,
+    }
+
+@patch("services.api_client.requests.Session.request")
+def test_concurrent_callers_share_one_login(mock_request, mock_client):
+    """Test that callers racing on an empty cache trigger a single /login."""
+    def slow_login(method, url, **kwargs):
+        time.sleep(0.05)
+        return make_response(200, {"token": "shared_token"})
+
+    mock_request.side_effect = slow_login
+    barrier = threading.Barrier(10)
+    tokens = []
+
+    def worker():
+        barrier.wait()
+        tokens.append(mock_client.ensure_token())
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mock_request.call_count == 1
+    assert tokens == ["shared_token"] * 10
+
+@patch("services.api_client.requests.Session.request")
+def test_token_refreshed_before_expiry(mock_request, mock_client):
+    """Test that a token inside the refresh margin is still served while a refresh runs."""
+    token_cache["test_user"] = "old_token"
+    token_expiry["test_user"] = time.monotonic() + 1  # well inside the refresh margin
+    mock_request.return_value = make_response(200, {"token": "fresh_token"})
+
+    assert mock_client.ensure_token() == "old_token"
+
+    deadline = time.monotonic() + 2
+    while token_cache.get("test_user") != "fresh_token" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert token_cache["test_user"] == "fresh_token"
+    assert mock_client.stats["logins"] == 1
+
+@patch("services.api_client.requests.Session.request")
+def test_unauthorized_response_reauthenticates_and_replays(mock_request, mock_client):
+    """Test that a 401 drops the token, logs in again and replays the request once."""
+    token_cache["test_user"] = "revoked_token"
+    mock_request.side_effect = [
+        make_response(401),
+        make_response(200, {"token": "new_token"}),
+        make_response(200, [{"event_id": "1"}]),
+    ]
+
+    assert mock_client.fetch_events() == [{"event_id": "1"}]
+    mock_request.assert_called_with(
+        "GET",
+        f"{BASE_URL}/events",
+        headers={"Authorization": "Bearer new_token"},
+        timeout=mock_client.timeout,
+    )
+    assert mock_client.stats["reauths"] == 1
+
+@patch("services.api_client.requests.Session.request")
+def test_unauthorized_replay_happens_once(mock_request, mock_client):
+    """Test that a second 401 after re-authentication is reported instead of looping."""
+    token_cache["test_user"] = "revoked_token"
+    mock_request.side_effect = [
+        make_response(401),
+        make_response(200, {"token": "new_token"}),
+        make_response(401),
+    ]
+
+    with pytest.raises(Exception, match="Failed to fetch events: 401"):
+        mock_client.fetch_events()
+    assert mock_request.call_count == 3
+
+@patch("services.api_client.requests.Session.request")
+def test_fetch_participants_conditional_not_modified(mock_request, mock_client):
+    """Test that stored validators are sent and a 304 returns no body."""
+    token_cache["test_user"] = "mocked_token"
+    mock_request.return_value = make_response(304, headers={"ETag": '"v1"'})
+
+    participants, validators = mock_client.fetch_participants_conditional(
+        "https://api.example.com/p", etag='"v1"', last_modified="Wed, 01 Jan 2025 00:00:00 GMT"
+    )
+
+    assert participants is None
+    assert validators == {"etag": '"v1"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    mock_request.assert_called_once_with(
+        "GET",
+        "https://api.example.com/p",
+        headers={
+            "Authorization": "Bearer mocked_token",
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT",
+        },
+        timeout=mock_client.timeout,
+    )
+
+@patch("services.api_client.requests.Session.request")
+def test_fetch_events_uses_response_cache(mock_request):
+    """Test that repeated fetches are served from the response cache."""
+    client = LuxidAPIClient(username="test_user", password="test_pass", response_cache=ResponseCache(ttl=60))
+    token_cache["test_user"] = "mocked_token"
+    mock_request.return_value = make_response(200, [{"event_id": "1"}])
+
+    assert client.fetch_events() == [{"event_id": "1"}]
+    assert client.fetch_events() == [{"event_id": "1"}]
+
+    assert mock_request.call_count == 1
+    assert client.response_cache.stats["hits"] == 1
+
+@patch("services.api_client.requests.Session.request")
+def test_fetch_participants_follows_pagination(mock_request, mock_client):
+    """Test that Link: rel="next" pages are fetched and merged."""
+    token_cache["test_user"] = "mocked_token"
+    mock_request.side_effect = [
+        make_response(200, {"1": {"answers": {}}}, headers={"Link": '<https://api.example.com/p?page=2>; rel="next"'}),
+        make_response(200, {"2": {"answers": {}}}),
+    ]
+
+    participants = mock_client.fetch_participants("https://api.example.com/p")
+
+    assert list(participants) == ["1", "2"]
+    assert mock_request.call_args_list[1].args == ("GET", "https://api.example.com/p?page=2")
+
+@patch("services.api_client.requests.Session.request")
+def test_fetch_participants_conditional_follows_pagination(mock_request, mock_client):
+    """Test that a changed event returns all its pages, with validators sent on the first request only."""
+    token_cache["test_user"] = "mocked_token"
+    mock_request.side_effect = [
+        make_response(200, {"a": {"answers": {}}},
+                      headers={"ETag": '"v2"', "Link": '<https://api.example.com/p?page=2>; rel="next"'}),
+        make_response(200, {"b": {"answers": {}}}),
+    ]
+
+    participants, validators = mock_client.fetch_participants_conditional("https://api.example.com/p", etag='"v1"')
+
+    assert list(participants) == ["a", "b"]
+    assert validators["etag"] == '"v2"'
+    assert mock_request.call_args_list[0].kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert mock_request.call_args_list[1].args == ("GET", "https://api.example.com/p?page=2")
+    assert "If-None-Match" not in mock_request.call_args_list[1].kwargs["headers"]
+
+@patch("services.api_client.requests.Session.request")
+def test_iter_participants_streams_pages(mock_request, mock_client):
+    """Test that participants are parsed incrementally from streamed pages."""
+    token_cache["test_user"] = "mocked_token"
+    mock_request.side_effect = [
+        make_stream_response(200, b'{"1": {"answers": {}}, "2": {"answers": {}}}',
+                             headers={"Link": '<https://api.example.com/p?cursor=abc>; rel="next"'}),
+        make_stream_response(200, b'{"3": {"answers": {}}}'),
+    ]
+
+    pairs = mock_client.iter_participants("https://api.example.com/p")
+
+    assert next(pairs) == ("1", {"answers": {}})
+    assert mock_request.call_count == 1  # the next page is only requested once this one is consumed
+    assert [participant_id for participant_id, _ in pairs] == ["2", "3"]
+    assert mock_request.call_args.kwargs["stream"] is True
+
+@patch("services.api_client.requests.Session.request")
+def test_iter_events_failure(mock_request, mock_client):
+    """Test that a failing streamed page raises the usual error."""
+    token_cache["test_user"] = "mocked_token"
+    mock_request.return_value = make_stream_response(404, b"")
+
+    with pytest.raises(Exception, match="Failed to fetch events: 404"):
+        list(mock_client.iter_events())
+
 @patch("services.api_client.requests.post")
 def test_get_api_client(mock_post):
     """Test that get_api_client correctly initializes the client."""
     client = get_api_client()
     assert isinstance(client, LuxidAPIClient)
+
+@patch("services.api_client.requests.Session.request")
+def test_private_token_cache_is_isolated(mock_request):
+    """Test that a client with its own token cache neither reads nor fills the shared one."""
+    from cachetools import TTLCache
+    token_cache["test_user"] = "shared_token"
+    own_cache = TTLCache(maxsize=1, ttl=60)
+    client = LuxidAPIClient(username="test_user", password="other_pass", token_cache=own_cache)
+    mock_request.return_value = make_response(200, {"token": "tenant_token"})
+
+    assert client.get_headers() == {"Authorization": "Bearer tenant_token"}
+    assert own_cache["test_user"] == "tenant_token"
+    assert token_cache["test_user"] == "shared_token"
+
+@patch("services.api_client.requests.Session.request")
+def test_limiters_gate_requests_and_see_throttling(mock_request):
+    """Test that every attempt waits on the rate limiter and 429s shrink the concurrency limit."""
+    from services.rate_limiter import AdaptiveConcurrencyLimiter
+    token_cache["test_user"] = "mocked_token"
+    rate_limiter = MagicMock()
+    concurrency_limiter = AdaptiveConcurrencyLimiter(initial=8)
+    client = LuxidAPIClient(username="test_user", password="test_pass", backoff_factor=0,
+                            rate_limiter=rate_limiter, concurrency_limiter=concurrency_limiter)
+    mock_request.side_effect = [make_response(429), make_response(200, [{"id": 1}])]
+
+    assert client.fetch_events() == [{"id": 1}]
+    assert rate_limiter.acquire.call_count == 2
+    assert concurrency_limiter.limit == 4
+    assert concurrency_limiter.in_flight == 0
+
+@patch("services.api_client.requests.Session.request")
+def test_circuit_breaker_opens_on_failed_requests(mock_request):
+    """Test that requests failing after their retries open the circuit and later calls are not sent."""
+    from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+    token_cache["test_user"] = "mocked_token"
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = LuxidAPIClient(username="test_user", password="test_pass", backoff_factor=0, max_retries=1,
+                            circuit_breaker=breaker)
+    mock_request.return_value = make_response(503)
+
+    for _ in range(2):
+        with pytest.raises(Exception, match="Failed to fetch events: 503"):
+            client.fetch_events()
+    with pytest.raises(CircuitOpenError):
+        client.fetch_events()
+
+    assert mock_request.call_count == 4  # Two calls of two attempts each; the third never left
+    assert breaker.snapshot()["rejected"] == 1
+
+@patch("services.api_client.requests.Session.request")
+def test_circuit_breaker_ignores_client_errors(mock_request):
+    """Test that 4xx answers count as a healthy upstream."""
+    from services.circuit_breaker import CircuitBreaker
+    token_cache["test_user"] = "mocked_token"
+    breaker = CircuitBreaker(failure_threshold=1)
+    client = LuxidAPIClient(username="test_user", password="test_pass", circuit_breaker=breaker)
+    mock_request.return_value = make_response(404)
+
+    with pytest.raises(Exception, match="404"):
+        client.fetch_participants(f"{BASE_URL}/events/1/participants")
+
+    assert not breaker.is_open()
+
+@patch("services.api_client.requests.Session.request")
+def test_circuit_breaker_probe_failing_with_other_errors_reopens(mock_request):
+    """Test that a half-open probe raising an unexpected requests error re-opens the circuit instead of leaving it stuck."""
+    from services.circuit_breaker import CircuitBreaker, HALF_OPEN, OPEN
+    token_cache["test_user"] = "mocked_token"
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    client = LuxidAPIClient(username="test_user", password="test_pass", backoff_factor=0, max_retries=0,
+                            circuit_breaker=breaker)
+    mock_request.side_effect = requests.exceptions.ChunkedEncodingError("connection broken")
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.fetch_events()
+    assert breaker.state == OPEN
+    now[0] += 30
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        client.fetch_events()  # The probe
+    assert breaker.state == OPEN
+
+    now[0] += 30
+    mock_request.side_effect = None
+    mock_request.return_value = make_response(200, [])
+    assert client.fetch_events() == []
+    assert not breaker.is_open()
@@ -1,18 +1,28 @@
+import os
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+import requests
 from app import app
+from services.pipeline import build_processor
+from services.circuit_breaker import CircuitBreaker
 
 class TestFlaskApp(unittest.TestCase):
     def setUp(self):
         """Set up Flask test client."""
         self.client = app.test_client()
         self.client.testing = True
+        # Keep tests from loading the repo's participants.csv into a participants.db next to it
+        store_patcher = patch("app.PARTICIPANT_STORE_ENABLED", False)
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
 
-    @patch("services.event_processor.EventProcessor.process_events")
+    @patch("services.event_processor.EventProcessor.iter_rows")
     @patch("services.csv_exporter.CSVExporter.save_to_csv")
-    def test_fetch_participant_info(self, mock_save_to_csv, mock_process_events):
+    def test_fetch_participant_info(self, mock_save_to_csv, mock_iter_rows):
         """Test GET /fetch-participant-info endpoint with mocked services."""
-        mock_process_events.return_value = None
+        mock_iter_rows.return_value = iter([])
         mock_save_to_csv.return_value = "CSV successfully generated."
 
         response = self.client.get("/fetch-participant-info")
@@ -21,5 +31,370 @@ class TestFlaskApp(unittest.TestCase):
         self.assertIn("message", response.json)
         self.assertEqual(response.json["message"], "CSV successfully generated.")
 
+    @patch("services.event_processor.EventProcessor.iter_rows")
+    @patch("services.csv_exporter.CSVExporter.save_to_csv")
+    def test_fetch_participant_info_filters(self, mock_save_to_csv, mock_iter_rows):
+        """Test that filter parameters reach the processor and are echoed back."""
+        mock_iter_rows.return_value = iter([])
+        mock_save_to_csv.return_value = "CSV successfully generated."
+
+        with patch("app.pipeline_build_processor", wraps=build_processor) as build:
+            response = self.client.get("/fetch-participant-info?start=2025-01-01&eventType=b2b&eventId=a,b")
+
+        self.assertEqual(response.status_code, 200)
+        event_filter = build.call_args.kwargs["event_filter"]
+        self.assertEqual(event_filter.to_params(), {"start": "1735689600", "eventType": "b2b", "eventId": "a,b"})
+        self.assertEqual(response.json["filter"]["event_ids"], ["a", "b"])
+
+    @patch("services.event_processor.EventProcessor.iter_rows")
+    def test_filtered_export_keeps_the_full_export(self, mock_iter_rows):
+        """Test that a filtered export is written to its own file and downloaded with the same filter."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", encoding="utf-8") as csvfile:
+                csvfile.write("eventId,eventType\n1,b2b\n2,b2c\n")
+            mock_iter_rows.return_value = iter([{"eventId": "1", "eventType": "b2b"}])
+
+            with patch("app.CSV_FILE_PATH", csv_path), patch("app.CSV_KEEP_VERSIONS", 0):
+                response = self.client.get("/fetch-participant-info?eventType=b2b")
+                full = self.client.get("/download-csv")
+                filtered = self.client.get(response.json["download"])
+                versioned = self.client.get("/download-csv?eventType=b2b&version=1")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["download"], "/download-csv?eventType=b2b")
+            self.assertIsNone(response.json["stored_rows"])
+            with open(csv_path, encoding="utf-8") as csvfile:
+                self.assertEqual(csvfile.read(), "eventId,eventType\n1,b2b\n2,b2c\n")
+            self.assertEqual(full.get_data(as_text=True).splitlines()[1:], ["1,b2b", "2,b2c"])
+            self.assertEqual(filtered.get_data(as_text=True).splitlines()[1].split(",")[:1], ["1"])
+            self.assertEqual(len(filtered.get_data(as_text=True).splitlines()), 2)
+            self.assertEqual(versioned.status_code, 400)
+            full.close()
+            filtered.close()
+
+    def test_fetch_participant_info_invalid_filter(self):
+        """Test that an unparsable time is rejected before anything is fetched."""
+        response = self.client.get("/fetch-participant-info?start=soon")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid time", response.json["error"])
+
+    def test_open_circuit_serves_last_good_export(self):
+        """Test that an open circuit skips the export and points at the CSV already on disk."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch("app.api_client.circuit_breaker", breaker), \
+                patch("services.event_processor.EventProcessor.iter_rows") as mock_iter_rows:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with patch("app.CSV_FILE_PATH", csv_path):
+                missing = self.client.get("/fetch-participant-info")
+                with open(csv_path, "w") as csv_file:
+                    csv_file.write("eventId\n1\n")
+                response = self.client.get("/fetch-participant-info")
+                streamed = self.client.get("/stream-participant-info")
+
+        self.assertEqual(missing.status_code, 503)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json["stale"])
+        self.assertIn("last_export_at", response.json)
+        self.assertGreater(int(response.headers["Retry-After"]), 0)
+        self.assertEqual(streamed.headers["X-Export-Stale"], "true")
+        self.assertEqual(streamed.get_data(as_text=True), "eventId\n1\n")
+        mock_iter_rows.assert_not_called()
+
+    @patch("services.csv_exporter.CSVExporter.save_to_csv")
+    def test_partial_export_reports_failed_events(self, mock_save_to_csv):
+        """Test that ?partial=true completes the export without the failing events."""
+        def save(rows):
+            list(rows)
+            return "CSV successfully generated."
+
+        mock_save_to_csv.side_effect = save
+        events = [{f"e{i}": {"start_time": 0, "end_time": 0, "participants_url": f"https://mock/{i}"}} for i in range(2)]
+
+        def fetch(url):
+            if url.endswith("/1"):
+                raise Exception("Failed to fetch participants: 502")
+            return {"p": {"answers": {}}}
+
+        with patch("app.api_client.fetch_events", return_value=events), \
+                patch("app.api_client.fetch_participants", side_effect=fetch), \
+                patch("app.api_client.circuit_breaker", None):
+            response = self.client.get("/fetch-participant-info?partial=true")
+            failed = self.client.get("/fetch-participant-info?partial=false")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json["partial"])
+        self.assertEqual(response.json["failed_events"], [{"eventId": "e1", "error": "Failed to fetch participants: 502"}])
+        self.assertEqual(failed.status_code, 500)
+
+    def test_circuit_opening_mid_export_keeps_the_previous_csv(self):
+        """Test that a partial export cut short by the circuit breaker does not replace the CSV on disk."""
+        events = [{f"e{i}": {"start_time": 0, "end_time": 0, "participants_url": f"https://mock/{i}"}} for i in range(20)]
+        unavailable = requests.Response()
+        unavailable.status_code = 503
+        breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+        good_export = "eventId\n" + "".join(f"e{i}\n" for i in range(20))
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch("app.api_client.circuit_breaker", breaker), \
+                patch("app.api_client.fetch_events", return_value=events), \
+                patch("app.api_client.get_headers", return_value={"Authorization": "Bearer token"}), \
+                patch("app.api_client._request_with_retries", return_value=unavailable) as upstream:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", encoding="utf-8") as csv_file:
+                csv_file.write(good_export)
+            with patch("app.CSV_FILE_PATH", csv_path):
+                response = self.client.get("/fetch-participant-info?partial=true")
+            with open(csv_path, encoding="utf-8") as csv_file:
+                on_disk = csv_file.read()
+
+        self.assertEqual(upstream.call_count, 5)  # The circuit opened; the remaining events were never fetched
+        self.assertEqual(on_disk, good_export)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json["stale"])
+        self.assertIn("Retry-After", response.headers)
+
+    def test_export_where_every_event_failed_reports_them(self):
+        """Test that a partial export with no successful event reports the failures and keeps the CSV."""
+        events = [{f"e{i}": {"start_time": 0, "end_time": 0, "participants_url": f"https://mock/{i}"}} for i in range(2)]
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch("app.api_client.fetch_events", return_value=events), \
+                patch("app.api_client.fetch_participants", side_effect=Exception("Failed to fetch participants: 502")), \
+                patch("app.api_client.circuit_breaker", None):
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", encoding="utf-8") as csv_file:
+                csv_file.write("eventId\nold\n")
+            with patch("app.CSV_FILE_PATH", csv_path):
+                response = self.client.get("/fetch-participant-info?partial=true")
+            with open(csv_path, encoding="utf-8") as csv_file:
+                on_disk = csv_file.read()
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual([event["eventId"] for event in response.json["failed_events"]], ["e0", "e1"])
+        self.assertEqual(on_disk, "eventId\nold\n")
+
+    @patch("services.event_processor.EventProcessor.iter_event_rows")
+    def test_stream_participant_info(self, mock_iter_event_rows):
+        """Test GET /stream-participant-info streams the header and each event's rows."""
+        mock_iter_event_rows.return_value = iter([[{"eventId": "1", "firstName": "Alice"}], [{"eventId": "2"}]])
+
+        response = self.client.get("/stream-participant-info")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "text/csv")
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0].split(",")[0], "eventId")
+        self.assertEqual(len(lines), 3)
+
+    @patch("app.job_manager.run_job")
+    def test_export_job_lifecycle(self, mock_run_job):
+        """Test POST /export-jobs returns a job id whose status can be polled."""
+        mock_run_job.return_value = {"message": "CSV successfully generated."}
+
+        response = self.client.post("/export-jobs")
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json["job_id"]
+        self.assertEqual(response.headers["Location"], f"/export-jobs/{job_id}")
+
+        for _ in range(200):
+            status = self.client.get(f"/export-jobs/{job_id}").json
+            if status["status"] == "succeeded":
+                break
+            time.sleep(0.01)
+        self.assertEqual(status["status"], "succeeded")
+        self.assertEqual(status["result"]["message"], "CSV successfully generated.")
+
+    @patch("app.job_manager.run_job")
+    def test_export_jobs_with_different_filters_are_not_merged(self, mock_run_job):
+        """Test that job deduplication keys on the filter parameters."""
+        mock_run_job.return_value = {"message": "done"}
+
+        first = self.client.post("/export-jobs?eventType=b2b").json
+        second = self.client.post("/export-jobs?eventType=b2c").json
+
+        self.assertNotEqual(first["job_id"], second["job_id"])
+        self.assertEqual(second["params"], {"incremental": False, "eventType": "b2c"})
+
+    def test_export_job_not_found(self):
+        """Test GET /export-jobs/<id> for an unknown job."""
+        response = self.client.get("/export-jobs/unknown")
+        self.assertEqual(response.status_code, 404)
+
+    def test_download_csv_conditional_and_range(self):
+        """Test GET /download-csv answers If-None-Match with 304 and Range with 206."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", encoding="utf-8") as csvfile:
+                csvfile.write("eventId\n1\n2\n")
+
+            with patch("app.CSV_FILE_PATH", csv_path):
+                response = self.client.get("/download-csv")
+                self.assertEqual(response.status_code, 200)
+                etag = response.headers["ETag"]
+                self.assertIn("Last-Modified", response.headers)
+
+                cached = self.client.get("/download-csv", headers={"If-None-Match": etag})
+                self.assertEqual(cached.status_code, 304)
+
+                partial = self.client.get("/download-csv", headers={"Range": "bytes=8-"})
+                self.assertEqual(partial.status_code, 206)
+                self.assertEqual(partial.get_data(as_text=True), "1\n2\n")
+
+    def test_download_csv_format_selection(self):
+        """Test GET /download-csv serves derived formats by query parameter or Accept header."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", encoding="utf-8") as csvfile:
+                csvfile.write("eventId,willAttend\n1,True\n")
+
+            with patch("app.CSV_FILE_PATH", csv_path):
+                by_query = self.client.get("/download-csv?format=ndjson")
+                self.assertEqual(by_query.status_code, 200)
+                self.assertEqual(by_query.mimetype, "application/x-ndjson")
+                self.assertIn('"willAttend": true', by_query.get_data(as_text=True))
+
+                by_accept = self.client.get("/download-csv", headers={"Accept": "application/gzip"})
+                self.assertEqual(by_accept.mimetype, "application/gzip")
+
+                unknown = self.client.get("/download-csv?format=xml")
+                self.assertEqual(unknown.status_code, 400)
+
+    def test_download_csv_unknown_version(self):
+        """Test GET /download-csv?version= for a version that does not exist."""
+        response = self.client.get("/download-csv?version=participants-missing.csv")
+        self.assertEqual(response.status_code, 404)
+
+    def test_tenant_routes(self):
+        """Test that tenant exports use the tenant's client and path, and are limited per tenant."""
+        from services.tenants import Tenant, TenantRegistry
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tenant = Tenant("acme", "acme-user", "pass", os.path.join(tmp_dir, "acme"))
+            client = MagicMock(stats={"requests": 2}, circuit_breaker=None)
+            registry = TenantRegistry([tenant], lambda tenant, token_cache: client)
+            rows = [{"eventId": "1", "firstName": "Alice"}]
+
+            with patch("app.tenant_registry", registry), \
+                    patch("services.event_processor.EventProcessor.iter_rows", return_value=iter(rows)):
+                self.assertEqual(self.client.get("/tenants/initech/fetch-participant-info").status_code, 404)
+
+                response = self.client.get("/tenants/acme/fetch-participant-info")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json["upstream"], {"requests": 2})
+                self.assertTrue(os.path.exists(tenant.csv_path))
+
+                download = self.client.get("/tenants/acme/download-csv")
+                self.assertEqual(download.status_code, 200)
+                self.assertIn("Alice", download.get_data(as_text=True))
+                download.close()
+
+                with tenant.export_slot():
+                    busy = self.client.get("/tenants/acme/fetch-participant-info")
+                self.assertEqual(busy.status_code, 429)
+                self.assertIn("Retry-After", busy.headers)
+
+    def test_participants_query(self):
+        """Test that an export is loaded into the store and queried with filters and pagination."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            rows = [
+                {"eventId": "1", "eventType": "B2B", "emailAddress": "Ann@Example.com", "marketingConsent": True},
+                {"eventId": "1", "eventType": "B2B", "emailAddress": "bob@example.com", "marketingConsent": False},
+                {"eventId": "2", "eventType": "B2B", "emailAddress": "cy@example.com", "marketingConsent": True},
+                {"eventId": "3", "eventType": "B2C", "emailAddress": "dee@example.com", "marketingConsent": True},
+            ]
+            with patch("app.CSV_FILE_PATH", csv_path), patch("app.PARTICIPANT_STORE_ENABLED", True), \
+                    patch("services.event_processor.EventProcessor.iter_rows", return_value=iter(rows)):
+                self.assertEqual(self.client.get("/participants").status_code, 404)
+
+                response = self.client.get("/fetch-participant-info")
+                self.assertEqual(response.json["stored_rows"], 4)
+
+                page = self.client.get("/participants?eventType=B2B&marketingConsent=true&limit=1").json
+                self.assertEqual(page["total"], 2)
+                self.assertEqual(page["participants"][0]["emailAddress"], "Ann@Example.com")
+                self.assertIs(page["participants"][0]["marketingConsent"], True)
+                self.assertEqual(page["next_offset"], 1)
+
+                last = self.client.get("/participants?eventType=B2B&marketingConsent=true&offset=1").json
+                self.assertEqual([row["eventId"] for row in last["participants"]], ["2"])
+                self.assertNotIn("next_offset", last)
+
+                by_email = self.client.get("/participants?emailAddress=ann@example.com").json
+                self.assertEqual(by_email["total"], 1)
+
+                self.assertEqual(self.client.get("/participants?shoeSize=42").status_code, 400)
+                self.assertEqual(self.client.get("/participants?marketingConsent=maybe").status_code, 400)
+
+    def test_people_and_aggregated_download(self):
+        """Test GET /people and /download-csv?aggregate=email merge participants by email."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "participants.csv")
+            with open(csv_path, "w", encoding="utf-8") as csvfile:
+                csvfile.write("eventId,eventStartTime,emailAddress,didAttend,marketingConsent\n"
+                              "1,01-01-2025 10:00:00,A@x.com,True,False\n"
+                              "2,02-01-2025 10:00:00,a@x.com,False,True\n"
+                              "2,02-01-2025 10:00:00,b@x.com,True,False\n")
+
+            with patch("app.CSV_FILE_PATH", csv_path):
+                people = self.client.get("/people").json
+                self.assertEqual(people["total"], 2)
+                self.assertEqual(people["people"][0]["events"], 2)
+                self.assertEqual(people["people"][0]["attendanceRate"], 0.5)
+
+                consenting = self.client.get("/people?marketingConsent=true").json
+                self.assertEqual([person["emailAddress"] for person in consenting["people"]], ["a@x.com"])
+                self.assertEqual(self.client.get("/people?emailAddress=B@X.com").json["total"], 1)
+
+                download = self.client.get("/download-csv?aggregate=email")
+                self.assertEqual(download.status_code, 200)
+                self.assertEqual(len(download.get_data(as_text=True).splitlines()), 3)
+                download.close()
+                self.assertEqual(self.client.get("/download-csv?aggregate=phone").status_code, 400)
+
+    def test_health_and_readiness(self):
+        """Test GET /healthz and GET /readyz, including not-ready when credentials are missing."""
+        self.assertEqual(self.client.get("/healthz").status_code, 200)
+
+        with patch("app.USERNAME", "user"), patch("app.PASSWORD", "secret"):
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["status"], "ready")
+
+        with patch("app.USERNAME", None):
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json["checks"]["credentials"])
+
+    def test_metrics_endpoint(self):
+        """Test GET /metrics exposes request and pipeline metrics."""
+        self.client.get("/export-jobs/unknown")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertIn('endpoint="/export-jobs/<job_id>"', text)
+        self.assertIn("luxid_client_stat", text)
+
+    @patch("app.PROFILING_ENABLED", True)
+    @patch("services.event_processor.EventProcessor.iter_rows")
+    @patch("services.csv_exporter.CSVExporter.save_to_csv")
+    def test_fetch_participant_info_profile(self, mock_save_to_csv, mock_iter_rows):
+        """Test that ?profile=true returns a cProfile summary when profiling is enabled."""
+        mock_iter_rows.return_value = iter([])
+        mock_save_to_csv.return_value = "CSV successfully generated."
+
+        response = self.client.get("/fetch-participant-info?profile=true")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("function calls", response.json["profile"])
+
 if __name__ == "_main_":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+from services import pipeline
+from services.api_client import LuxidAPIClient, token_cache
+from services.event_filter import EventFilter
+from services.event_processor import EventProcessor
+from benchmarks.mock_luxid_server import MockLuxidServer
+from benchmarks.run_benchmarks import compare, configure_pipeline, percentile
+
+class TestMockLuxidServer(unittest.TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+
+    def make_client(self, server):
+        client = LuxidAPIClient("bench_user", "bench_pass", backoff_factor=0)
+        client.API_BASE_URL = server.base_url
+        return client
+
+    def test_pipeline_against_mock_server(self):
+        """Test that the real client and processor export every synthetic participant."""
+        with MockLuxidServer(events=4, participants=5) as server:
+            processor = EventProcessor(self.make_client(server), max_workers=2)
+            processor.process_events()
+
+        self.assertEqual(len(processor.all_participants), 20)
+        self.assertEqual(server.stats["login"], 1)
+        self.assertEqual(server.stats["participants"], 4)
+        self.assertEqual({row["eventType"] for row in processor.all_participants}, {"b2b", "b2c", "Invalid"})
+
+    def test_streaming_pipeline_against_mock_server(self):
+        """Test that incremental parsing yields the same rows as the buffered path."""
+        with MockLuxidServer(events=3, participants=4) as server:
+            buffered = EventProcessor(self.make_client(server))
+            buffered.process_events()
+            streamed = EventProcessor(self.make_client(server), streaming=True)
+            streamed.process_events()
+
+        self.assertEqual(streamed.all_participants, buffered.all_participants)
+
+    def test_filters_pushed_to_mock_listing(self):
+        """Test that pushed filters shrink the listing and only matching events are fetched."""
+        with MockLuxidServer(events=6, participants=2) as server:
+            client = self.make_client(server)
+            self.assertEqual(len(client.fetch_events({"event_type": "b2c"})), 2)
+            processor = EventProcessor(client, event_filter=EventFilter(event_types=["b2b"]), push_filters=True)
+            processor.process_events()
+
+        self.assertEqual({row["eventType"] for row in processor.all_participants}, {"b2b"})
+        self.assertEqual(server.stats["participants"], 2)
+
+    def test_injected_errors_are_retried(self):
+        """Test that injected 503s are absorbed by the client's retries."""
+        with MockLuxidServer(events=5, participants=2, error_rate=0.3, seed=1) as server:
+            processor = EventProcessor(self.make_client(server), failure_policy="skip")
+            processor.process_events()
+
+        self.assertGreater(server.stats["errors"], 0)
+        self.assertEqual(len(processor.all_participants) + 2 * len(processor.failed_events), 10)
+
+class TestBenchmarkReport(unittest.TestCase):
+
+    def test_scenario_settings_reach_the_processor(self):
+        """Test that a scenario's workers, failure policy and streaming mode apply to the processors the app builds."""
+        import app as app_module
+
+        with patch.multiple(pipeline, FETCH_MAX_WORKERS=1, FETCH_FAILURE_POLICY="abort", STREAM_JSON=False):
+            configure_pipeline({"workers": 8, "failure_policy": "skip", "streaming": True})
+            processor = app_module.build_processor()
+
+        self.assertEqual(processor.max_workers, 8)
+        self.assertEqual(processor.failure_policy, "skip")
+        self.assertTrue(processor.streaming)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": [{"name": "a", "latency_ms": {"p50": 100}, "peak_rss_kb": 1000}]}
+        current = {"results": [{"name": "a", "latency_ms": {"p50": 150}, "peak_rss_kb": 1000}]}
+
+        self.assertEqual(compare(current, baseline, max_regression=0.2), ["a"])
+        self.assertEqual(compare(baseline, baseline, max_regression=0.2), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from tests.helpers import FakeClock
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        """Test that the circuit opens on the threshold-th consecutive failure and then fails fast."""
+        for _ in range(2):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+        self.breaker.record_success()  # A success resets the count
+        for _ in range(3):
+            self.breaker.before_call()
+            self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 4
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 6)
+        self.assertEqual(self.breaker.snapshot()["rejected"], 1)
+
+    def test_half_open_probe_closes_on_success(self):
+        """Test that after the reset timeout one probe goes through and its success closes the circuit."""
+        self._open()
+        self.clock.now = 10
+
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()  # Only one probe at a time
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.before_call()
+
+    def test_half_open_probe_failure_reopens(self):
+        self._open()
+        self.clock.now = 10
+        self.breaker.before_call()
+        self.breaker.record_failure()
+
+        self.assertTrue(self.breaker.is_open())
+        self.assertEqual(self.breaker.retry_after(), 10)
+        self.assertEqual(self.breaker.snapshot()["opened"], 2)
+
+    def test_disabled(self):
+        breaker = CircuitBreaker(failure_threshold=0)
+        for _ in range(10):
+            breaker.record_failure()
+
+        breaker.before_call()
+        self.assertFalse(breaker.is_open())
+
+    def _open(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import os
+import tempfile
 from services.csv_exporter import CSVExporter
 
 class TestCSVExporter(unittest.TestCase):
@@ -39,5 +40,73 @@ class TestCSVExporter(unittest.TestCase):
         self.assertTrue(os.path.exists(self.filename))
         self.assertEqual(message, "CSV file has been successfully created.")
 
+    def test_save_to_csv_accepts_generator(self):
+        """Test that rows can be streamed into the CSV from a generator."""
+        def rows():
+            for i in range(3):
+                yield {"eventId": str(i), "firstName": f"P{i}"}
+
+        self.exporter.save_to_csv(rows())
+
+        with open(self.filename, encoding="utf-8") as csvfile:
+            lines = csvfile.read().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith("0,"))
+
+    def test_save_to_csv_empty_generator(self):
+        """Test that an empty iterable is rejected without creating a file."""
+        with self.assertRaises(Exception):
+            self.exporter.save_to_csv(iter([]))
+        self.assertFalse(os.path.exists(self.filename))
+
+    def test_failed_write_keeps_previous_export(self):
+        """Test that an error while producing rows leaves the previous CSV untouched."""
+        self.exporter.save_to_csv([{"eventId": "old"}])
+
+        def failing_rows():
+            yield {"eventId": "new"}
+            raise Exception("Failed to fetch participants: 500")
+
+        with self.assertRaises(Exception):
+            self.exporter.save_to_csv(failing_rows())
+
+        with open(self.filename, encoding="utf-8") as csvfile:
+            self.assertIn("old", csvfile.read())
+        leftovers = [name for name in os.listdir(os.path.dirname(self.filename)) if name.endswith(".csv.tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_versions_are_kept_and_pruned(self):
+        """Test that each export is versioned and only the newest versions are retained."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            exporter = CSVExporter(os.path.join(tmp_dir, "participants.csv"), keep_versions=2)
+            for index in range(3):
+                exporter.save_to_csv([{"eventId": str(index)}])
+
+            versions = exporter.list_versions()
+            self.assertEqual(len(versions), 2)
+            with open(exporter.version_path(versions[0]), encoding="utf-8") as csvfile:
+                self.assertIn("\n2,", csvfile.read())
+            with open(exporter.version_path(versions[1]), encoding="utf-8") as csvfile:
+                self.assertIn("\n1,", csvfile.read())
+            self.assertIsNone(exporter.version_path("participants-missing.csv"))
+
+            # Files derived from a version are neither listed as versions nor kept after it is pruned
+            derived = os.path.join(exporter.versions_dir, os.path.splitext(versions[1])[0] + ".people.csv")
+            open(derived, "w").close()
+            self.assertEqual(exporter.list_versions(), versions)
+            exporter.save_to_csv([{"eventId": "3"}])
+            self.assertFalse(os.path.exists(derived))
+
+    def test_stream_csv_chunks(self):
+        """Test that stream_csv yields the header then one chunk per non-empty batch."""
+        batches = [[{"eventId": "1"}, {"eventId": "1"}], [], [{"eventId": "2"}]]
+
+        chunks = list(CSVExporter.stream_csv(batches))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith("eventId,eventStartTime"))
+        self.assertEqual(chunks[1].count("\n"), 2)
+        self.assertTrue(chunks[2].startswith("2,"))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from werkzeug.datastructures import MultiDict
+from services.event_filter import EventFilter, parse_time
+
+class TestEventFilter(unittest.TestCase):
+
+    def test_parse_time_formats(self):
+        """Test that timestamps, dates and ISO datetimes parse to the same UTC instant."""
+        self.assertEqual(parse_time("1735689600"), 1735689600.0)
+        self.assertEqual(parse_time("2025-01-01"), 1735689600.0)
+        self.assertEqual(parse_time("2025-01-01T00:00:00Z"), 1735689600.0)
+        self.assertEqual(parse_time("2025-01-01T01:00:00+01:00"), 1735689600.0)
+        with self.assertRaises(ValueError):
+            parse_time("next tuesday")
+
+    def test_time_window_is_half_open(self):
+        """Test that events starting at `start` match and events starting at `end` do not."""
+        event_filter = EventFilter(start=100, end=200)
+
+        self.assertTrue(event_filter.matches("e", 100, "b2b"))
+        self.assertTrue(event_filter.matches("e", 199, "b2b"))
+        self.assertFalse(event_filter.matches("e", 99, "b2b"))
+        self.assertFalse(event_filter.matches("e", 200, "b2b"))
+
+    def test_event_types_are_case_insensitive(self):
+        event_filter = EventFilter(event_types=["B2B"])
+
+        self.assertTrue(event_filter.matches("e", 0, "b2b"))
+        self.assertFalse(event_filter.matches("e", 0, "b2c"))
+
+    def test_event_ids(self):
+        event_filter = EventFilter(event_ids=["a", "b"])
+
+        self.assertTrue(event_filter.matches("a", 0, "b2b"))
+        self.assertFalse(event_filter.matches("c", 0, "b2b"))
+
+    def test_params_round_trip(self):
+        """Test that repeated and comma-separated parameters parse, and to_params() inverts from_params()."""
+        params = MultiDict([("start", "2025-01-01"), ("eventType", "B2B,b2c"), ("eventId", "x"), ("eventId", "y"), ("other", "1")])
+        event_filter = EventFilter.from_params(params)
+
+        self.assertEqual(event_filter.to_params(), {"start": "1735689600", "eventType": "b2b,b2c", "eventId": "x,y"})
+        self.assertEqual(EventFilter.from_params(event_filter.to_params()).to_dict(), event_filter.to_dict())
+        self.assertEqual(EventFilter.from_params({}).to_params(), {})
+
+    def test_upstream_params(self):
+        event_filter = EventFilter(start=100, end=200.5, event_types=["b2b"], event_ids=["x"])
+
+        self.assertEqual(event_filter.upstream_params(), {
+            "start_time_from": 100, "start_time_to": 200, "event_type": "b2b", "event_id": "x",
+        })
+
+    def test_empty_filter_is_falsy(self):
+        self.assertFalse(EventFilter())
+        self.assertTrue(EventFilter(event_types=["b2c"]))
+
+    def test_rejects_inverted_window(self):
+        with self.assertRaises(ValueError):
+            EventFilter(start=200, end=100)
+
+if __name__ == "__main__":
+    unittest.main()
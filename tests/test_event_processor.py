@@ -1,6 +1,14 @@
+import os
+import tempfile
+import time
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
+from services.circuit_breaker import CircuitOpenError
+from services.event_filter import EventFilter
 from services.event_processor import EventProcessor
+from services.field_mapping import DEFAULT_FIELD_MAPPING, FieldMapping
+from services.metrics import FAILED_EVENTS
+from services.snapshot_store import SnapshotStore
 
 class TestEventProcessor(unittest.TestCase):
 
@@ -165,5 +173,248 @@ class TestEventProcessor(unittest.TestCase):
         #   Marketing consent should be False
         self.assertFalse(participant["marketingConsent"])
 
+    def _mock_events(self, count):
+        """Builds `count` raw events, each with its own participants URL."""
+        return [
+            {
+                f"event_{i}": {
+                    "start_time": 1736929800,
+                    "end_time": 1736937000,
+                    "custom": {},
+                    "participants_url": f"https://mock-api.com/{i}",
+                }
+            }
+            for i in range(count)
+        ]
+
+    def _participants_for(self, url):
+        """Returns a single participant whose first name is derived from the URL."""
+        index = url.rsplit("/", 1)[-1]
+        return {index: {"answers": {"firstname": {"answer": f"P{index}"}}, "privacy_answers": []}}
+
+    def test_process_events_concurrent_preserves_order(self):
+        """Test that concurrent fetching yields rows in the same order as the serial path."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(20)
+
+        def slow_fetch(url):
+            # Earlier events finish last to shake out any completion-order leaks
+            time.sleep((20 - int(url.rsplit("/", 1)[-1])) * 0.001)
+            return self._participants_for(url)
+
+        self.mock_api_client.fetch_participants.side_effect = slow_fetch
+
+        processor = EventProcessor(self.mock_api_client, max_workers=8)
+        processor.process_events()
+
+        self.assertEqual([row["eventId"] for row in processor.all_participants], [f"event_{i}" for i in range(20)])
+        self.assertEqual(processor.all_participants[3]["firstName"], "P3")
+
+    def test_process_events_skip_policy(self):
+        """Test that the skip policy drops failing events and records them."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(3)
+
+        def flaky_fetch(url):
+            if url.endswith("/1"):
+                raise Exception("Failed to fetch participants: 500")
+            return self._participants_for(url)
+
+        self.mock_api_client.fetch_participants.side_effect = flaky_fetch
+
+        processor = EventProcessor(self.mock_api_client, max_workers=2, failure_policy="skip")
+        processor.process_events()
+
+        self.assertEqual([row["eventId"] for row in processor.all_participants], ["event_0", "event_2"])
+        self.assertEqual(processor.failed_events, [{"eventId": "event_1", "error": "Failed to fetch participants: 500"}])
+
+    def test_open_circuit_abandons_the_export(self):
+        """Test that an open circuit stops the export at once instead of skipping or retrying the remaining events."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(3)
+
+        def fetch(url):
+            if url.endswith("/1"):
+                raise CircuitOpenError("open", retry_after=30)
+            return self._participants_for(url)
+
+        self.mock_api_client.fetch_participants.side_effect = fetch
+        before = FAILED_EVENTS.value(reason="circuit_open")
+
+        processor = EventProcessor(self.mock_api_client, failure_policy="retry", max_retries=3, retry_delay=10)
+        with self.assertRaises(CircuitOpenError):
+            processor.process_events()
+
+        self.assertEqual(self.mock_api_client.fetch_participants.call_count, 2)
+        self.assertEqual(processor.failed_events, [])
+        self.assertEqual(FAILED_EVENTS.value(reason="circuit_open") - before, 1)
+
+    def test_process_events_retry_policy(self):
+        """Test that the retry policy re-fetches an event before giving up."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(1)
+        self.mock_api_client.fetch_participants.side_effect = [
+            Exception("Failed to fetch participants: 502"),
+            self._participants_for("https://mock-api.com/0"),
+        ]
+
+        processor = EventProcessor(self.mock_api_client, failure_policy="retry", max_retries=2, retry_delay=0)
+        processor.process_events()
+
+        self.assertEqual(self.mock_api_client.fetch_participants.call_count, 2)
+        self.assertEqual(len(processor.all_participants), 1)
+        self.assertEqual(processor.failed_events, [])
+
+    def test_event_filter_skips_fetches(self):
+        """Test that filtered-out events never have their participants fetched."""
+        events = self._mock_events(4)
+        events[1]["event_1"]["start_time"] = 1736929800 + 86400
+        events[2]["event_2"]["custom"] = {"3333": {"value": {"1": {"value": "B2B"}}}}
+        self.mock_api_client.fetch_events.return_value = events
+        self.mock_api_client.fetch_participants.side_effect = self._participants_for
+
+        processor = EventProcessor(self.mock_api_client, event_filter=EventFilter(end=1736929800 + 3600, event_types=["b2b"]))
+        processor.process_events()
+
+        self.assertEqual([row["eventId"] for row in processor.all_participants], ["event_2"])
+        self.mock_api_client.fetch_participants.assert_called_once_with("https://mock-api.com/2")
+        self.assertEqual(processor.events_filtered, 3)
+
+    def test_event_filter_pushed_upstream(self):
+        """Test that pushed filters become listing query params and keep other events' snapshots."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(1)
+        self.mock_api_client.fetch_participants_conditional.return_value = (
+            self._participants_for("https://mock-api.com/0"), {"etag": None, "last_modified": None},
+        )
+        snapshot_store = MagicMock()
+        snapshot_store.get.return_value = None
+
+        processor = EventProcessor(self.mock_api_client, snapshot_store=snapshot_store,
+                                   event_filter=EventFilter(event_ids=["event_0"]), push_filters=True)
+        processor.process_events()
+
+        self.mock_api_client.fetch_events.assert_called_once_with({"event_id": "event_0"})
+        self.assertEqual(len(processor.all_participants), 1)
+        snapshot_store.retain.assert_not_called()
+        snapshot_store.save.assert_called_once()
+
+    def test_iter_event_rows_yields_per_event(self):
+        """Test that rows are produced lazily, one batch per event, in event order."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(5)
+        self.mock_api_client.fetch_participants.side_effect = self._participants_for
+
+        processor = EventProcessor(self.mock_api_client, max_workers=3)
+        batches = processor.iter_event_rows()
+
+        first = next(batches)
+        self.assertEqual([row["eventId"] for row in first], ["event_0"])
+        self.assertEqual([batch[0]["eventId"] for batch in batches], [f"event_{i}" for i in range(1, 5)])
+        self.assertEqual(processor.all_participants, [])  # streaming does not accumulate
+
+    def test_incremental_sync_skips_unchanged_events(self):
+        """Test that a second incremental run reuses snapshots of events the API reports as not modified."""
+        events = self._mock_events(3)
+        self.mock_api_client.fetch_events.return_value = events
+
+        def conditional_fetch(url, etag=None, last_modified=None):
+            if etag == f'"{url}"':
+                return None, {"etag": etag, "last_modified": None}
+            return self._participants_for(url), {"etag": f'"{url}"', "last_modified": None}
+
+        self.mock_api_client.fetch_participants_conditional.side_effect = conditional_fetch
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = os.path.join(tmp_dir, "snapshots.json")
+
+            first = EventProcessor(self.mock_api_client, snapshot_store=SnapshotStore(snapshot_path))
+            first.process_events()
+            self.assertEqual(first.sync_stats, {"unchanged": 0, "refetched": 3})
+
+            # Only event_1 changes between runs; its changed entry is fetched without validators
+            events[1]["event_1"]["end_time"] = 1736940600
+            self.mock_api_client.fetch_participants_conditional.reset_mock()
+
+            second = EventProcessor(self.mock_api_client, snapshot_store=SnapshotStore(snapshot_path))
+            second.process_events()
+
+        self.assertEqual(second.sync_stats, {"unchanged": 2, "refetched": 1})
+        self.assertIn(call("https://mock-api.com/1"), self.mock_api_client.fetch_participants_conditional.call_args_list)
+        self.assertEqual([row["eventId"] for row in second.all_participants], ["event_0", "event_1", "event_2"])
+        self.assertEqual(second.all_participants[1]["eventEndTime"], "01-15-2025 11:30:00")
+
+    def test_incremental_sync_refetches_events_without_validators(self):
+        """Test that participants of an unchanged event are fetched again when the API sends no validators."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(1)
+        participants = self._participants_for("https://mock-api.com/0")
+        self.mock_api_client.fetch_participants_conditional.side_effect = (
+            lambda url, etag=None, last_modified=None: (dict(participants), {"etag": None, "last_modified": None})
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = os.path.join(tmp_dir, "snapshots.json")
+            EventProcessor(self.mock_api_client, snapshot_store=SnapshotStore(snapshot_path)).process_events()
+            participants["new"] = {"answers": {}}  # A new registration leaves the event entry unchanged
+
+            second = EventProcessor(self.mock_api_client, snapshot_store=SnapshotStore(snapshot_path))
+            second.process_events()
+
+        self.assertEqual(second.sync_stats, {"unchanged": 0, "refetched": 1})
+        self.assertEqual(len(second.all_participants), 2)
+
+    def test_field_mapping_change_invalidates_snapshots(self):
+        """Test that snapshots built with other columns are not reused after the field mapping changes."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(1)
+        self.mock_api_client.fetch_participants_conditional.side_effect = (
+            lambda url, etag=None, last_modified=None:
+            (None, {"etag": etag, "last_modified": None}) if etag else (self._participants_for(url), {"etag": '"v1"', "last_modified": None})
+        )
+        config = {section: dict(columns) for section, columns in DEFAULT_FIELD_MAPPING.items()}
+        config["answers"]["company"] = {"keys": ["9999"], "kind": "text"}
+        extended = FieldMapping(config)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            snapshot_path = os.path.join(tmp_dir, "snapshots.json")
+            EventProcessor(self.mock_api_client, snapshot_store=SnapshotStore(snapshot_path),
+                           field_mapping=extended).process_events()
+
+            processor = EventProcessor(self.mock_api_client, snapshot_store=SnapshotStore(snapshot_path))
+            processor.process_events()
+
+        self.assertEqual(processor.sync_stats, {"unchanged": 0, "refetched": 1})
+        self.assertNotIn("company", processor.all_participants[0])
+
+    def test_incremental_sync_uses_validators(self):
+        """Test that events with stored validators are revalidated with a conditional request."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(1)
+        self.mock_api_client.fetch_participants_conditional.return_value = (None, {"etag": '"v1"', "last_modified": None})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = SnapshotStore(os.path.join(tmp_dir, "snapshots.json"))
+            event_hash = EventProcessor.event_hash(self._mock_events(1)[0], FieldMapping().fieldnames)
+            store.put("event_0", event_hash, [{"eventId": "event_0", "firstName": "Cached"}], etag='"v1"')
+
+            processor = EventProcessor(self.mock_api_client, snapshot_store=store)
+            processor.process_events()
+
+        self.mock_api_client.fetch_participants_conditional.assert_called_once_with("https://mock-api.com/0", '"v1"', None)
+        self.assertEqual(processor.all_participants, [{"eventId": "event_0", "firstName": "Cached"}])
+        self.assertEqual(processor.sync_stats["unchanged"], 1)
+
+    def test_streaming_mode_uses_record_iterators(self):
+        """Test that streaming mode consumes events and participants as iterators."""
+        self.mock_api_client.iter_events.return_value = iter(self._mock_events(2))
+        self.mock_api_client.iter_participants.side_effect = lambda url: iter(self._participants_for(url).items())
+
+        processor = EventProcessor(self.mock_api_client, streaming=True)
+        processor.process_events()
+
+        self.mock_api_client.fetch_events.assert_not_called()
+        self.mock_api_client.fetch_participants.assert_not_called()
+        self.assertEqual([row["firstName"] for row in processor.all_participants], ["P0", "P1"])
+
+    def test_process_events_abort_policy(self):
+        """Test that the default abort policy propagates the first failure."""
+        self.mock_api_client.fetch_events.return_value = self._mock_events(2)
+        self.mock_api_client.fetch_participants.side_effect = Exception("Failed to fetch participants: 500")
+
+        with self.assertRaises(Exception):
+            self.processor.process_events()
+
 if __name__ == "__main__":
     unittest.main()
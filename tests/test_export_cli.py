@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import export_cli
+from services.api_client import LuxidAPIClient, token_cache
+from services.exporters import read_csv_rows
+from benchmarks.mock_luxid_server import MockLuxidServer
+
+class TestExportCLI(unittest.TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output = os.path.join(self.tmp_dir.name, "out", "participants.csv")
+        for patcher in (
+            patch("export_cli.USERNAME", "cli_user"),
+            patch("export_cli.PASSWORD", "cli_pass"),
+            patch("export_cli.CSV_KEEP_VERSIONS", 0),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_cli(self, server, *args):
+        with patch.object(LuxidAPIClient, "API_BASE_URL", server.base_url), \
+                patch("sys.stdout"):
+            return export_cli.main(["--output", self.output, "--no-incremental", *args])
+
+    def test_exports_filtered_events(self):
+        """Test that the CLI exports only events matching the type and time filters."""
+        with MockLuxidServer(events=6, participants=3) as server:
+            code = self.run_cli(server, "--workers", "2", "--event-type", "b2b", "--end", "2025-01-15T11:00:00Z")
+
+        self.assertEqual(code, export_cli.EXIT_OK)
+        rows = list(read_csv_rows(self.output))
+        # Events start hourly from 08:30 UTC and cycle B2B, B2C, Conference: only event 0 qualifies
+        self.assertEqual({row["eventId"] for row in rows}, {f"{0:024x}"})
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(server.stats["participants"], 1)
+
+    def test_no_matching_events(self):
+        """Test that an empty selection exits with EXIT_NO_DATA and writes nothing."""
+        with MockLuxidServer(events=2, participants=2) as server:
+            code = self.run_cli(server, "--start", "2030-01-01")
+
+        self.assertEqual(code, export_cli.EXIT_NO_DATA)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_upstream_failure(self):
+        """Test that an aborted export exits with EXIT_FAILED and leaves no output."""
+        with MockLuxidServer(events=2, participants=2, error_rate=1.0) as server, \
+                patch.object(LuxidAPIClient, "_retry_delay", return_value=0):
+            code = self.run_cli(server, "--failure-policy", "abort")
+
+        self.assertEqual(code, export_cli.EXIT_FAILED)
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_missing_credentials(self):
+        with patch("export_cli.USERNAME", None):
+            code = export_cli.main(["--output", self.output])
+
+        self.assertEqual(code, export_cli.EXIT_CONFIG)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(SystemExit) as raised, patch("sys.stderr"):
+            export_cli.main(["--start", "tomorrow"])
+
+        self.assertEqual(raised.exception.code, export_cli.EXIT_USAGE)
+
+    def test_derived_format_requires_output(self):
+        """Test that a non-CSV export never defaults to (and overwrites) the app's CSV."""
+        with self.assertRaises(SystemExit) as raised, patch("sys.stderr"):
+            export_cli.parse_args(["--format", "parquet"])
+
+        self.assertEqual(raised.exception.code, export_cli.EXIT_USAGE)
+        self.assertEqual(export_cli.parse_args([]).output, export_cli.DEFAULT_OUTPUT)
+
+    def test_filtered_export_requires_output(self):
+        """Test that a filtered export never defaults to (and overwrites) the app's full CSV."""
+        with self.assertRaises(SystemExit) as raised, patch("sys.stderr"):
+            export_cli.parse_args(["--event-type", "b2b"])
+
+        self.assertEqual(raised.exception.code, export_cli.EXIT_USAGE)
+        self.assertEqual(export_cli.parse_args(["--event-type", "b2b", "--output", self.output]).output, self.output)
+
+if __name__ == "__main__":
+    unittest.main()
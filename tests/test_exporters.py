@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+from services.csv_exporter import CSVExporter
+from services import exporters
+from services.exporters import derived_export, negotiate_format, ExportFormatUnavailable
+
+ROWS = [
+    {
+        "eventId": "1", "eventStartTime": "01-01-2025 10:00:00", "eventEndTime": "01-01-2025 12:00:00",
+        "eventType": "b2b", "firstName": "Alice", "lastName": "Smith", "emailAddress": "alice@example.com",
+        "willAttend": True, "didAttend": False, "marketingConsent": True, "orderNewsletter": "Yes.",
+    },
+    {
+        "eventId": "2", "eventStartTime": "02-01-2025 10:00:00", "eventEndTime": "02-01-2025 12:00:00",
+        "eventType": "b2c", "firstName": "Bob", "lastName": "Jones", "emailAddress": "bob@example.com",
+        "willAttend": False, "didAttend": True, "marketingConsent": False, "orderNewsletter": "",
+    },
+]
+
+class TestExporters(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp_dir.name, "participants.csv")
+        CSVExporter(self.csv_path).save_to_csv(ROWS)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_gzip_csv(self):
+        """Test that the gzip format decompresses to the original CSV."""
+        path, mimetype = derived_export(self.csv_path, "csv.gz")
+
+        self.assertEqual(mimetype, "application/gzip")
+        with gzip.open(path, "rt", encoding="utf-8") as gzfile, open(self.csv_path, encoding="utf-8") as csvfile:
+            self.assertEqual(gzfile.read(), csvfile.read())
+
+    def test_ndjson_keeps_types(self):
+        """Test that NDJSON has one object per row with boolean columns restored."""
+        path, _ = derived_export(self.csv_path, "ndjson")
+
+        with open(path, encoding="utf-8") as jsonfile:
+            rows = [json.loads(line) for line in jsonfile]
+        self.assertEqual(rows, ROWS)
+
+    def test_parquet_is_typed(self):
+        """Test that Parquet output round-trips with boolean columns."""
+        pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+        path, _ = derived_export(self.csv_path, "parquet")
+
+        table = pyarrow_parquet.read_table(path)
+        self.assertEqual(str(table.schema.field("willAttend").type), "bool")
+        self.assertEqual(table.to_pylist(), ROWS)
+
+    def test_arrow_ipc(self):
+        """Test that Arrow IPC output round-trips."""
+        pyarrow_ipc = pytest.importorskip("pyarrow.ipc")
+        path, _ = derived_export(self.csv_path, "arrow")
+
+        with pyarrow_ipc.open_file(path) as reader:
+            self.assertEqual(reader.read_all().to_pylist(), ROWS)
+
+    def test_derived_file_is_reused_until_csv_changes(self):
+        """Test that conversions are cached and regenerated after a new export."""
+        path, _ = derived_export(self.csv_path, "ndjson")
+        with patch.object(exporters.NDJSONExporter, "write") as mock_write:
+            derived_export(self.csv_path, "ndjson")
+            mock_write.assert_not_called()
+
+        CSVExporter(self.csv_path).save_to_csv(ROWS[:1])
+        os.utime(self.csv_path, ns=(0, 0))
+        derived_export(self.csv_path, "ndjson")
+        with open(path, encoding="utf-8") as jsonfile:
+            self.assertEqual(len(jsonfile.readlines()), 1)
+
+    def test_unavailable_format(self):
+        """Test that columnar formats report a clear error without pyarrow."""
+        with patch.object(exporters, "pyarrow", None):
+            with self.assertRaises(ExportFormatUnavailable):
+                derived_export(self.csv_path, "parquet")
+
+    def test_negotiate_format(self):
+        """Test Accept header negotiation."""
+        self.assertIsNone(negotiate_format(None))
+        self.assertIsNone(negotiate_format("*/*"))
+        self.assertEqual(negotiate_format("application/x-ndjson"), "ndjson")
+        self.assertEqual(negotiate_format("text/csv;q=0.5, application/vnd.apache.parquet"), "parquet")
+        self.assertIsNone(negotiate_format("application/x-ndjson;q=0.1, text/csv"))
+        self.assertIsNone(negotiate_format("application/unknown"))
+
+if __name__ == "__main__":
+    unittest.main()
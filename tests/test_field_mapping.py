@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import unittest
+from services.field_mapping import FieldMapping
+
+class TestFieldMapping(unittest.TestCase):
+
+    def test_default_mapping_extracts_all_columns(self):
+        """Test that the built-in mapping covers names, email, newsletter and consent."""
+        index = FieldMapping().event_index()
+
+        values = index.extract({
+            "answers": {
+                "firstname": {"answer": "John"},
+                "lastname": {"answer": "Doe"},
+                "email": {"answer": "john@example.com"},
+                "random_question": {"question": "Order newsletter", "answer": {"0": {"choice": "No."}}},
+            },
+            "privacy_answers": [{"privacy_policy_id": 1015, "answer": 1}, {"privacy_policy_id": 7295, "answer": 1}],
+        })
+
+        self.assertEqual(values, {
+            "firstName": "John",
+            "lastName": "Doe",
+            "emailAddress": "john@example.com",
+            "orderNewsletter": "No.",
+            "marketingConsent": True,
+        })
+
+    def test_missing_answers_use_defaults(self):
+        """Test that participants without answers get empty strings and False."""
+        values = FieldMapping().event_index().extract({})
+
+        self.assertEqual(values["firstName"], "")
+        self.assertEqual(values["orderNewsletter"], "")
+        self.assertFalse(values["marketingConsent"])
+
+    def test_event_index_caches_resolution(self):
+        """Test that answer ids are resolved once per event and reused for later participants."""
+        index = FieldMapping().event_index()
+        participant = {"answers": {"firstname": {"answer": "A"}, "unrelated": {"answer": "x"}}}
+
+        index.extract(participant)
+        index.extract(participant)
+
+        self.assertEqual(index.resolved, {("firstname", None): (index.mapping.positions["firstName"], "text"), ("unrelated", None): None})
+
+    def test_extra_columns_from_file(self):
+        """Test that a JSON mapping file adds columns without code changes."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            mapping_path = os.path.join(tmp_dir, "mapping.json")
+            with open(mapping_path, "w", encoding="utf-8") as mapping_file:
+                json.dump({
+                    "answers": {"company": {"questions": ["Company name"]}},
+                    "privacy": {"smsConsent": {"policy_ids": [8000]}},
+                }, mapping_file)
+            mapping = FieldMapping.from_file(mapping_path)
+
+        values = mapping.event_index().extract({
+            "answers": {"555": {"question": "Company name", "answer": "ACME"}},
+            "privacy_answers": [{"privacy_policy_id": 8000, "answer": 1}],
+        })
+
+        self.assertEqual(mapping.fieldnames[-2:], ["company", "smsConsent"])
+        self.assertIn("smsConsent", mapping.boolean_fields)
+        self.assertEqual(values["company"], "ACME")
+        self.assertTrue(values["smsConsent"])
+        self.assertEqual(values["emailAddress"], "")  # defaults are kept
+
+    def test_unknown_kind_is_rejected(self):
+        """Test that invalid mapping definitions fail at compile time."""
+        with self.assertRaises(ValueError):
+            FieldMapping({"answers": {"x": {"keys": ["1"], "kind": "number"}}})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from services.job_queue import (
+    FileJobStore, JobManager, InMemoryQueueBackend, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED,
+    _process_start_time,
+)
+
+def wait_for(job, timeout=2):
+    """Polls a job until it has finished or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while job.status not in (JOB_SUCCEEDED, JOB_FAILED) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+def submit_from_other_process(directory, params, results):
+    """Submits `params` through a JobManager of its own, as another gunicorn worker would."""
+    manager = JobManager(lambda job: {"rows": 0}, store=FileJobStore(directory))
+    job, created = manager.submit(params)
+    results.put((job.id, created, manager.get(job.id).to_dict()["status"]))
+
+class TestJobManager(unittest.TestCase):
+
+    def test_job_runs_and_reports_progress(self):
+        """Test that a submitted job runs on a worker and keeps its progress and result."""
+        def run_job(job):
+            job.events_total = 2
+            job.advance(3)
+            job.advance(4)
+            return {"message": "done"}
+
+        manager = JobManager(run_job)
+        job, created = manager.submit({"incremental": False})
+
+        self.assertTrue(created)
+        wait_for(job)
+        state = job.to_dict()
+        self.assertEqual(state["status"], JOB_SUCCEEDED)
+        self.assertEqual(state["progress"], {"events_total": 2, "events_done": 2, "rows": 7})
+        self.assertEqual(state["result"], {"message": "done"})
+        self.assertIs(manager.get(job.id), job)
+
+    def test_identical_in_flight_jobs_are_deduplicated(self):
+        """Test that identical submissions join the running job instead of starting another."""
+        release = threading.Event()
+        runs = []
+
+        def run_job(job):
+            runs.append(job.id)
+            release.wait(2)
+            return {}
+
+        manager = JobManager(run_job)
+        first, _ = manager.submit({"incremental": False})
+        second, created = manager.submit({"incremental": False})
+        other, other_created = manager.submit({"incremental": True})
+
+        self.assertFalse(created)
+        self.assertIs(first, second)
+        self.assertTrue(other_created)
+        self.assertIsNot(first, other)
+
+        release.set()
+        wait_for(first)
+        wait_for(other)
+        self.assertEqual(len(runs), 2)
+
+        # Once finished, the same parameters start a fresh job
+        third, created = manager.submit({"incremental": False})
+        self.assertTrue(created)
+        self.assertIsNot(third, first)
+        wait_for(third)
+
+    def test_failed_job_records_error(self):
+        """Test that an exception in the export marks the job as failed."""
+        def run_job(job):
+            raise Exception("Failed to fetch events: 500")
+
+        manager = JobManager(run_job, backend=InMemoryQueueBackend())
+        job, _ = manager.submit({"incremental": False})
+
+        wait_for(job)
+        self.assertEqual(job.status, JOB_FAILED)
+        self.assertEqual(job.error, "Failed to fetch events: 500")
+
+    def test_finished_jobs_are_pruned(self):
+        """Test that only the most recent finished jobs are kept."""
+        manager = JobManager(lambda job: {}, max_finished_jobs=2)
+        jobs = []
+        for index in range(4):
+            job, _ = manager.submit({"run": index})
+            jobs.append(wait_for(job))
+        manager.submit({"run": 4})
+
+        self.assertIsNone(manager.get(jobs[0].id))
+        self.assertIsNotNone(manager.get(jobs[3].id))
+
+    def test_shutdown_waits_for_running_job_and_refuses_new_ones(self):
+        """Test that shutdown lets the running job finish and fails jobs that never started."""
+        release = threading.Event()
+
+        def run_job(job):
+            release.wait(5)
+            return {"rows": 1}
+
+        manager = JobManager(run_job)
+        running, _ = manager.submit({"run": 1})
+        queued, _ = manager.submit({"run": 2})
+        while running.status != JOB_RUNNING:
+            time.sleep(0.01)
+
+        threading.Timer(0.1, release.set).start()
+        self.assertTrue(manager.shutdown(timeout=5))
+
+        self.assertFalse(manager.accepting)
+        self.assertEqual(running.status, JOB_SUCCEEDED)
+        self.assertEqual(queued.status, JOB_FAILED)
+        with self.assertRaises(Exception):
+            manager.submit({"run": 3})
+
+class TestFileJobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.release = threading.Event()
+        self.runs = []
+
+    def tearDown(self):
+        self.release.set()
+        self.tmp_dir.cleanup()
+
+    def make_manager(self):
+        def run_job(job):
+            self.runs.append(job.id)
+            job.advance(5)
+            self.release.wait(5)
+            return {"rows": 5}
+
+        return JobManager(run_job, store=FileJobStore(self.tmp_dir.name))
+
+    def test_job_is_visible_from_another_manager(self):
+        """Test that a job accepted by one worker can be polled from another one."""
+        first, second = self.make_manager(), self.make_manager()
+        job, _ = first.submit({"incremental": False})
+        while job.status != JOB_RUNNING:
+            time.sleep(0.01)
+
+        self.assertEqual(second.get(job.id).to_dict()["status"], JOB_RUNNING)
+        self.release.set()
+        wait_for(job)
+        state = second.get(job.id).to_dict()
+        self.assertEqual(state["status"], JOB_SUCCEEDED)
+        self.assertEqual(state["result"], {"rows": 5})
+        self.assertEqual(state["progress"]["rows"], 5)
+        self.assertNotIn("owner", state)
+        self.assertIsNone(second.get("unknown"))
+
+    def test_identical_jobs_are_deduplicated_across_processes(self):
+        """Test that the same parameters posted to another worker process join the running job."""
+        manager = self.make_manager()
+        job, _ = manager.submit({"incremental": False})
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        child = context.Process(target=submit_from_other_process,
+                                args=(self.tmp_dir.name, {"incremental": False}, results))
+        child.start()
+        child.join(10)
+
+        job_id, created, status = results.get(timeout=5)
+        self.assertEqual(job_id, job.id)
+        self.assertFalse(created)
+        self.assertIn(status, (JOB_QUEUED, JOB_RUNNING))
+        self.release.set()
+        wait_for(job)
+        self.assertEqual(self.runs, [job.id])
+
+    def test_jobs_of_an_exited_worker_are_reported_failed(self):
+        """Test that a job whose worker process is gone is failed and no longer blocks new jobs."""
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        store = FileJobStore(self.tmp_dir.name)
+        store.save({"job_id": "abc123", "status": JOB_RUNNING, "params": {"incremental": False},
+                    "error": None, "created_at": time.time(), "owner": dead.pid})
+
+        self.assertEqual(store.load("abc123")["status"], JOB_FAILED)
+        job, created = self.make_manager().submit({"incremental": False})
+        self.assertTrue(created)
+        self.assertNotEqual(job.id, "abc123")
+        self.release.set()
+        wait_for(job)
+
+    def test_jobs_of_a_reused_pid_are_reported_failed(self):
+        """Test that a job is failed when its PID now belongs to another process, e.g. after a restart."""
+        store = FileJobStore(self.tmp_dir.name)
+        record = {"job_id": "abc123", "status": JOB_RUNNING, "params": {"incremental": False},
+                  "error": None, "created_at": time.time(), "owner": os.getpid()}
+        started = _process_start_time(os.getpid())
+        if started is None:
+            self.skipTest("needs /proc")
+
+        store.save({**record, "owner_started": started})
+        self.assertEqual(store.load("abc123")["status"], JOB_RUNNING)
+        store.save({**record, "owner_started": started - 1})
+        self.assertEqual(store.load("abc123")["status"], JOB_FAILED)
+
+if __name__ == "__main__":
+    unittest.main()
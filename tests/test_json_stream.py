@@ -0,0 +1,47 @@
+import json
+import unittest
+from services.json_stream import iter_json_items
+
+def split(data, size):
+    """Encodes `data` as JSON and cuts it into chunks of `size` bytes."""
+    body = json.dumps(data, ensure_ascii=False).encode()
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+class TestJsonStream(unittest.TestCase):
+
+    def test_object_items_across_chunk_boundaries(self):
+        """Test that (key, value) pairs are parsed whatever the chunking."""
+        data = {
+            "1": {"answers": {"firstname": {"answer": "Jörg"}}, "will_attend": 1},
+            "2": {"answers": {}, "privacy_answers": [{"privacy_policy_id": 7295, "answer": 1}]},
+            "3": {"note": "tricky \"}], text", "score": -1.25e3, "flag": None},
+        }
+        for size in (1, 2, 5, 64, 10_000):
+            self.assertEqual(dict(iter_json_items(split(data, size))), data)
+
+    def test_array_items(self):
+        """Test that array elements are yielded in order, including split numbers."""
+        self.assertEqual(list(iter_json_items([b"[1", b"23, 4", b"5, true]"])), [123, 45, True])
+        self.assertEqual(list(iter_json_items(split([{"a": 1}, {"b": 2}], 3))), [{"a": 1}, {"b": 2}])
+
+    def test_items_are_yielded_before_the_body_ends(self):
+        """Test that the first record is available without reading the rest of the stream."""
+        def chunks():
+            yield b'[{"id": 1}, '
+            raise AssertionError("read past the first record")
+
+        self.assertEqual(next(iter_json_items(chunks())), {"id": 1})
+
+    def test_empty_containers(self):
+        """Test empty arrays and objects."""
+        self.assertEqual(list(iter_json_items([b" [ ] "])), [])
+        self.assertEqual(list(iter_json_items([b"{}"])), [])
+
+    def test_invalid_streams(self):
+        """Test that malformed or truncated bodies raise ValueError."""
+        for chunks in ([b"[1,"], [b"[1 2]"], [b"5"], [b""]):
+            with self.assertRaises(ValueError):
+                list(iter_json_items(chunks))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import io
+import logging
+import unittest
+from services.logging_setup import RateLimitFilter, RedactingFilter, configure_logging, redact, shutdown_logging
+
+def make_record(msg, *args, level=logging.INFO, name="services.test"):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+class TestLoggingSetup(unittest.TestCase):
+
+    def test_redact_secrets(self):
+        """Test that bearer/basic credentials and token/password values are masked."""
+        self.assertEqual(redact("Authorization: Bearer abc.def-123"), "Authorization: Bearer [REDACTED]")
+        self.assertEqual(redact("headers={'Authorization': 'Basic dXNlcjpwYXNz'}"),
+                         "headers={'Authorization': 'Basic [REDACTED]'}")
+        self.assertEqual(redact('{"token": "s3cr3t"}'), '{"token": "[REDACTED]"}')
+        self.assertEqual(redact("password=hunter2 user=bob"), "password=[REDACTED] user=bob")
+        self.assertEqual(redact("Token stored for bob (expires in 15 min)"), "Token stored for bob (expires in 15 min)")
+
+    def test_redacting_filter_renders_args(self):
+        """Test that secrets passed as arguments are redacted too."""
+        record = make_record("Fetching with headers: %s", {"Authorization": "Bearer abc"})
+
+        RedactingFilter().filter(record)
+
+        self.assertEqual(record.getMessage(), "Fetching with headers: {'Authorization': 'Bearer [REDACTED]'}")
+
+    def test_rate_limit_per_template(self):
+        """Test that per-item messages are capped per template and suppressed counts are reported."""
+        limiter = RateLimitFilter(rate=0.001, burst=3)
+
+        allowed = [limiter.filter(make_record("Fetching participants from: %s", i)) for i in range(10)]
+        other = limiter.filter(make_record("Participants processed: %d", 10))
+        warning = limiter.filter(make_record("Skipping event %s", 1, level=logging.WARNING))
+
+        self.assertEqual(allowed, [True] * 3 + [False] * 7)
+        self.assertTrue(other)
+        self.assertTrue(warning)
+
+        limiter._buckets[("services.test", "Fetching participants from: %s")][0] = 1
+        record = make_record("Fetching participants from: %s", 11)
+        self.assertTrue(limiter.filter(record))
+        self.assertIn("(7 similar messages suppressed)", record.getMessage())
+
+    def test_queue_logging_writes_through_listener(self):
+        """Test that records logged through the queue handler reach the output, redacted."""
+        stream = io.StringIO()
+        shutdown_logging()
+        configure_logging("DEBUG", stream=stream)
+        try:
+            logging.getLogger("services.test").info("Using Bearer %s", "abc123")
+        finally:
+            shutdown_logging()
+
+        output = stream.getvalue()
+        self.assertIn("services.test: Using Bearer [REDACTED]", output)
+        self.assertNotIn("abc123", output)
+
+if __name__ == "__main__":
+    unittest.main()
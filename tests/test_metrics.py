@@ -0,0 +1,103 @@
+import multiprocessing
+import tempfile
+import unittest
+from services.metrics import Counter, Gauge, Histogram, MetricsDirectory, MetricsRegistry
+
+def count_in_other_worker(shared, counter, histogram):
+    """Records values in a forked worker and writes them for the others, as a gunicorn worker would."""
+    counter.inc(2, status=200)
+    counter.inc(status=503)
+    histogram.observe(5)
+    shared.write()
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_render(self):
+        """Test counters per label set in the exposition format."""
+        counter = self.registry.register(Counter("upstream_total", "Upstream responses.", ("status",)))
+        counter.inc(status=200)
+        counter.inc(2, status=200)
+        counter.inc(status=503)
+
+        text = self.registry.render()
+
+        self.assertIn("# TYPE upstream_total counter", text)
+        self.assertIn('upstream_total{status="200"} 3', text)
+        self.assertIn('upstream_total{status="503"} 1', text)
+        self.assertEqual(counter.value(status=200), 3)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, sum and count."""
+        histogram = self.registry.register(Histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.1, 1)))
+        histogram.observe(0.05, stage="csv_write")
+        histogram.observe(0.5, stage="csv_write")
+        histogram.observe(5, stage="csv_write")
+
+        text = self.registry.render()
+
+        self.assertIn('stage_seconds_bucket{stage="csv_write",le="0.1"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="csv_write",le="1"} 2', text)
+        self.assertIn('stage_seconds_bucket{stage="csv_write",le="+Inf"} 3', text)
+        self.assertIn('stage_seconds_sum{stage="csv_write"} 5.55', text)
+        self.assertIn('stage_seconds_count{stage="csv_write"} 3', text)
+
+    def test_histogram_timer(self):
+        """Test that the time() context manager records one observation."""
+        histogram = Histogram("block_seconds", "Block time.")
+        with histogram.time():
+            pass
+        self.assertEqual(histogram.count(), 1)
+
+    def test_gauge_callback(self):
+        """Test that callback gauges read live values at render time."""
+        values = {"retries": 1}
+        self.registry.register(Gauge("client_stat", "Client stats.", ("stat",),
+                                     callback=lambda: {(name,): value for name, value in values.items()}))
+        values["retries"] = 4
+
+        self.assertIn('client_stat{stat="retries"} 4', self.registry.render())
+
+    def test_label_validation_and_escaping(self):
+        """Test that wrong labels are rejected and label values are escaped."""
+        counter = Counter("c_total", "C.", ("path",))
+        with self.assertRaises(ValueError):
+            counter.inc(other="x")
+        counter.inc(path='a"b')
+        self.assertIn('c_total{path="a\\"b"} 1', "\n".join(counter.render()))
+
+    def test_register_is_idempotent(self):
+        first = self.registry.register(Counter("x_total", "X."))
+        self.assertIs(self.registry.register(Counter("x_total", "X.")), first)
+
+    def test_metrics_directory_sums_workers(self):
+        """Test that counters and histograms of other worker processes are added to this worker's, gauges are not."""
+        counter = self.registry.register(Counter("upstream_total", "Upstream responses.", ("status",)))
+        histogram = self.registry.register(Histogram("stage_seconds", "Stage time.", buckets=(1,)))
+        gauge = self.registry.register(Gauge("open_circuits", "Open circuits."))
+        with tempfile.TemporaryDirectory() as directory:
+            shared = MetricsDirectory(self.registry, directory)
+            worker = multiprocessing.get_context("fork").Process(
+                target=count_in_other_worker, args=(shared, counter, histogram))
+            worker.start()
+            worker.join(10)
+            counter.inc(status=200)
+            histogram.observe(0.5)
+            gauge.set(1)
+
+            text = shared.render()
+            shared.clear()
+            cleared = shared.render()
+
+        self.assertIn('upstream_total{status="200"} 3', text)
+        self.assertIn('upstream_total{status="503"} 1', text)
+        self.assertIn('stage_seconds_bucket{le="1"} 1', text)
+        self.assertIn('stage_seconds_count 2', text)
+        self.assertIn("open_circuits 1", text)
+        self.assertIn('upstream_total{status="200"} 1', cleared)
+        self.assertNotIn("503", cleared)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import csv
+import os
+import sqlite3
+import tempfile
+import unittest
+from services.participant_store import ParticipantStore
+
+FIELDNAMES = ["eventId", "eventType", "emailAddress", "marketingConsent"]
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+class TestParticipantStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.csv_path = os.path.join(self.tmp_dir.name, "participants.csv")
+        self.store = ParticipantStore(os.path.join(self.tmp_dir.name, "participants.db"))
+
+    def test_ingest_replaces_previous_export(self):
+        """Test that each ingest holds exactly the rows of the latest CSV."""
+        write_csv(self.csv_path, [{"eventId": "1", "eventType": "B2B", "emailAddress": "a@x.com", "marketingConsent": True}])
+        self.assertEqual(self.store.ingest_csv(self.csv_path), 1)
+        write_csv(self.csv_path, [
+            {"eventId": "2", "eventType": "B2C", "emailAddress": "b@x.com", "marketingConsent": False},
+            {"eventId": "3", "eventType": "B2C", "emailAddress": "c@x.com", "marketingConsent": True},
+        ])
+        self.assertEqual(self.store.ingest_csv(self.csv_path), 2)
+
+        rows, total = self.store.query({"eventType": "B2C"})
+        self.assertEqual(total, 2)
+        self.assertEqual(rows[0], {"eventId": "2", "eventType": "B2C", "emailAddress": "b@x.com", "marketingConsent": False})
+        self.assertEqual(self.store.query({"eventId": "1"}), ([], 0))
+
+    def test_sync_only_reingests_changed_csv(self):
+        """Test that sync_from_csv skips a CSV the store already holds."""
+        write_csv(self.csv_path, [{"eventId": "1", "eventType": "B2B", "emailAddress": "a@x.com", "marketingConsent": True}])
+        self.assertTrue(self.store.sync_from_csv(self.csv_path))
+        self.assertFalse(self.store.sync_from_csv(self.csv_path))
+
+        os.utime(self.csv_path, ns=(0, os.stat(self.csv_path).st_mtime_ns + 1_000_000))
+        self.assertTrue(self.store.sync_from_csv(self.csv_path))
+
+    def test_filters_use_indexes(self):
+        """Test that the common filters are answered from an index instead of a table scan."""
+        write_csv(self.csv_path, [{"eventId": "1", "eventType": "B2B", "emailAddress": "a@x.com", "marketingConsent": True}])
+        self.store.ingest_csv(self.csv_path)
+
+        with sqlite3.connect(self.store.file_name) as connection:
+            for where in ('"eventId" = ?', '"emailAddress" = ?', '"eventType" = ? AND "marketingConsent" = ?'):
+                plan = " ".join(row[-1] for row in connection.execute(
+                    f"EXPLAIN QUERY PLAN SELECT * FROM participants WHERE {where}", ["x"] * where.count("?"),
+                ))
+                self.assertIn("USING INDEX", plan)
+
+    def test_event_type_filter_ignores_case(self):
+        """Test that eventType matches whatever case the filter uses, still through its index."""
+        write_csv(self.csv_path, [{"eventId": "1", "eventType": "b2b", "emailAddress": "a@x.com", "marketingConsent": True}])
+        self.store.ingest_csv(self.csv_path)
+
+        for value in ("b2b", "B2B"):
+            rows, total = self.store.query(self.store.parse_filters({"eventType": value, "marketingConsent": "true"}))
+            self.assertEqual(total, 1)
+        with sqlite3.connect(self.store.file_name) as connection:
+            plan = " ".join(row[-1] for row in connection.execute(
+                'EXPLAIN QUERY PLAN SELECT * FROM participants WHERE "eventType" = ? AND "marketingConsent" = ?', ["B2B", 1],
+            ))
+        self.assertIn("USING INDEX", plan)
+
+    def test_parse_filters(self):
+        """Test that unknown columns and malformed booleans are rejected."""
+        write_csv(self.csv_path, [{"eventId": "1", "eventType": "B2B", "emailAddress": "a@x.com", "marketingConsent": True}])
+        self.store.ingest_csv(self.csv_path)
+
+        self.assertEqual(self.store.parse_filters({"marketingConsent": "false", "eventId": "1"}),
+                         {"marketingConsent": 0, "eventId": "1"})
+        with self.assertRaises(ValueError):
+            self.store.parse_filters({"id": "1"})
+        with self.assertRaises(ValueError):
+            self.store.parse_filters({"marketingConsent": "perhaps"})
+
+if __name__ == "__main__":
+    unittest.main()
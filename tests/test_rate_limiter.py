@@ -0,0 +1,96 @@
+import threading
+import unittest
+from services.rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
+from tests.helpers import FakeClock
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        """Test that a full bucket serves the burst at once and then one request per 1/rate seconds."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=3, clock=clock, sleep=clock.sleep)
+
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(clock.now, 0.0)
+
+        bucket.acquire()
+        self.assertAlmostEqual(clock.now, 0.1)
+        bucket.acquire()
+        self.assertAlmostEqual(clock.now, 0.2)
+        self.assertAlmostEqual(bucket.waited, 0.2)
+
+    def test_zero_rate_is_unlimited(self):
+        """Test that a rate of 0 never waits."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=0, burst=1, clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            bucket.acquire()
+        self.assertEqual(clock.now, 0.0)
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_slow_start_then_additive_increase(self):
+        """Test that the limit grows by one per response until the first decrease, then by about one per window."""
+        limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=16, clock=FakeClock())
+
+        for _ in range(6):
+            limiter.release(limiter.acquire())
+        self.assertEqual(limiter.limit, 8)
+
+        limiter.release(limiter.acquire(), overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(4):
+            limiter.release(limiter.acquire())
+        self.assertEqual(limiter.limit, 4)  # 4 + 1/4 + 1/4.25 + ...
+        for _ in range(200):
+            limiter.release(limiter.acquire())
+        self.assertEqual(limiter.limit, 16)
+
+    def test_multiplicative_decrease_once_per_window(self):
+        """Test that overload halves the limit once, even when several in-flight requests report it."""
+        limiter = AdaptiveConcurrencyLimiter(initial=8, clock=FakeClock())
+        slots = [limiter.acquire() for _ in range(4)]
+
+        for slot in slots:
+            limiter.release(slot, overloaded=True)
+
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.decreases, 1)
+        limiter.release(limiter.acquire(), overloaded=True)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_latency_spike_counts_as_overload(self):
+        """Test that a response much slower than the baseline shrinks the limit."""
+        clock = FakeClock()
+        limiter = AdaptiveConcurrencyLimiter(initial=8, latency_tolerance=2.0, clock=clock)
+        for _ in range(5):
+            slot = limiter.acquire()
+            clock.now += 0.1
+            limiter.release(slot)
+        limit = limiter.limit
+
+        slot = limiter.acquire()
+        clock.now += 1.0
+        limiter.release(slot)
+
+        self.assertEqual(limiter.limit, limit // 2)
+
+    def test_acquire_blocks_at_limit(self):
+        """Test that callers beyond the limit wait until a slot is released."""
+        limiter = AdaptiveConcurrencyLimiter(initial=1)
+        slot = limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.release(limiter.acquire(), overloaded=None)
+            acquired.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        limiter.release(slot, overloaded=None)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+        self.assertEqual(limiter.in_flight, 0)
+
+if __name__ == "__main__":
+    unittest.main()
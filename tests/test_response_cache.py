@@ -0,0 +1,96 @@
+import tempfile
+import threading
+import time
+import unittest
+from services.response_cache import DiskCacheBackend, ResponseCache
+from tests.helpers import FakeClock
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+
+    def test_hit_within_ttl(self):
+        """Test that a fresh entry is served without calling the fetcher again."""
+        cache = ResponseCache(ttl=10, clock=self.clock)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {"a": 1}
+
+        self.assertEqual(cache.get_or_fetch("url", fetch), {"a": 1})
+        self.clock.now += 5
+        self.assertEqual(cache.get_or_fetch("url", fetch), {"a": 1})
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+
+    def test_expired_entry_is_refetched(self):
+        """Test that entries past TTL (and no stale window) are fetched again."""
+        cache = ResponseCache(ttl=10, clock=self.clock)
+        cache.get_or_fetch("url", lambda: 1)
+        self.clock.now += 11
+
+        self.assertEqual(cache.get_or_fetch("url", lambda: 2), 2)
+        self.assertEqual(cache.stats["misses"], 2)
+
+    def test_stale_while_revalidate(self):
+        """Test that a stale entry is served immediately while it is refreshed in the background."""
+        cache = ResponseCache(ttl=10, stale_ttl=30, clock=self.clock)
+        cache.get_or_fetch("url", lambda: "old")
+        self.clock.now += 15
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return "new"
+
+        self.assertEqual(cache.get_or_fetch("url", fetch), "old")
+        self.assertTrue(refreshed.wait(2))
+        deadline = time.monotonic() + 2
+        while cache.stats["revalidations"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.get_or_fetch("url", fetch), "new")
+        self.assertEqual(cache.stats["stale_hits"], 1)
+
+    def test_lru_eviction_by_count_and_bytes(self):
+        """Test that the least recently used entries are evicted when limits are exceeded."""
+        cache = ResponseCache(ttl=10, max_entries=2, clock=self.clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get_or_fetch("a", lambda: None)  # touch "a" so "b" is the LRU entry
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get_or_fetch("b", lambda: "refetched"), "refetched")
+        self.assertEqual(cache.stats["evictions"], 2)
+
+        small = ResponseCache(ttl=10, max_bytes=20, clock=self.clock)
+        small.set("a", "x" * 10)
+        small.set("b", "y" * 10)
+        self.assertEqual(small.snapshot()["entries"], 1)
+        self.assertLessEqual(small.snapshot()["bytes"], 20)
+
+    def test_values_are_copies(self):
+        """Test that callers cannot mutate the cached value."""
+        cache = ResponseCache(ttl=10, clock=self.clock)
+        value = cache.get_or_fetch("url", lambda: {"items": []})
+        value["items"].append(1)
+
+        self.assertEqual(cache.get_or_fetch("url", lambda: None), {"items": []})
+
+    def test_disk_backend_survives_restart(self):
+        """Test that a new cache instance reads entries persisted by a previous one."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ResponseCache(ttl=10, backend=DiskCacheBackend(tmp_dir), clock=self.clock).set("url", [1, 2])
+
+            restarted = ResponseCache(ttl=10, backend=DiskCacheBackend(tmp_dir), clock=self.clock)
+            self.assertEqual(restarted.get_or_fetch("url", lambda: None), [1, 2])
+            self.assertEqual(restarted.stats["hits"], 1)
+
+            restarted.invalidate("url")
+            self.assertIsNone(DiskCacheBackend(tmp_dir).get("url"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import csv
+import io
+import unittest
+from services.csv_exporter import FIELDNAMES, CSVExporter
+from services.field_mapping import FieldMapping
+from services.event_processor import EventProcessor
+from services.rows import EventInfo, ParticipantRow, RowLayout
+
+PARTICIPANTS = {
+    "1": {
+        "answers": {
+            "firstname": {"answer": "John"},
+            "lastname": {"answer": "Doe"},
+            "email": {"answer": "john@example.com"},
+        },
+        "privacy_answers": [{"privacy_policy_id": 7295, "answer": 1}],
+        "will_attend": 1,
+        "did_attend": 0,
+    },
+    "2": {"answers": {"firstname": {"answer": "Jane"}}, "privacy_answers": []},
+}
+
+class TestParticipantRow(unittest.TestCase):
+
+    def setUp(self):
+        self.rows = EventProcessor(None).build_rows("evt1", "01-15-2025 09:30:00", "01-15-2025 11:30:00", "b2b", PARTICIPANTS)
+
+    def test_row_matches_dict_representation(self):
+        """Test that a compact row compares, iterates and converts like the dict it replaces."""
+        expected = {
+            "eventId": "evt1",
+            "eventStartTime": "01-15-2025 09:30:00",
+            "eventEndTime": "01-15-2025 11:30:00",
+            "eventType": "b2b",
+            "firstName": "John",
+            "lastName": "Doe",
+            "emailAddress": "john@example.com",
+            "willAttend": True,
+            "didAttend": False,
+            "marketingConsent": True,
+            "orderNewsletter": "",
+        }
+        row = self.rows[0]
+
+        self.assertEqual(row, expected)
+        self.assertEqual(dict(row), expected)
+        self.assertEqual(list(row), FIELDNAMES)
+        self.assertEqual(len(row), len(expected))
+        self.assertEqual(row.get("missing", "-"), "-")
+        self.assertIn("eventType", row)
+        self.assertNotIn("missing", row)
+        with self.assertRaises(KeyError):
+            row["missing"]
+
+    def test_event_fields_are_shared(self):
+        """Test that rows of one event share a single EventInfo and layout."""
+        self.assertIs(self.rows[0].event, self.rows[1].event)
+        self.assertIs(self.rows[0].layout, self.rows[1].layout)
+        self.assertFalse(hasattr(self.rows[0], "__dict__"))
+
+    def test_project_follows_fieldnames(self):
+        """Test that project() orders values by fieldnames and blanks unknown columns."""
+        row = ParticipantRow(EventInfo("e", "s", "t", "b2c"), RowLayout(["firstName", "didAttend"]), ("Ann", True))
+
+        self.assertEqual(row.project(["didAttend", "eventType", "other", "firstName"]), [True, "b2c", "", "Ann"])
+
+    def test_csv_output_matches_dict_rows(self):
+        """Test that the positional CSV path writes the same text as csv.DictWriter on dicts."""
+        expected = io.StringIO()
+        writer = csv.DictWriter(expected, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows([dict(row) for row in self.rows])
+
+        streamed = "".join(CSVExporter.stream_csv([self.rows]))
+
+        self.assertEqual(streamed, expected.getvalue())
+
+    def test_layout_follows_field_mapping(self):
+        """Test that extra mapped columns become row keys."""
+        mapping = FieldMapping({"answers": {"company": {"keys": ["company"], "kind": "text"}}})
+        rows = EventProcessor(None, field_mapping=mapping).build_rows(
+            "evt1", "", "", "b2b", {"1": {"answers": {"company": {"answer": "Acme"}}}},
+        )
+
+        self.assertEqual(rows[0]["company"], "Acme")
+        self.assertEqual(list(rows[0]), ["eventId", "eventStartTime", "eventEndTime", "eventType",
+                                          "willAttend", "didAttend", "company"])
+
+if __name__ == "__main__":
+    unittest.main()
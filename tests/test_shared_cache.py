@@ -0,0 +1,209 @@
+import multiprocessing
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from services.api_client import LuxidAPIClient
+from services.response_cache import ResponseCache
+from services.shared_cache import (
+    FileCacheBackend, FileLock, MemoryStore, SharedTokenCache, StoreCacheBackend, backend_from_config,
+)
+from tests.helpers import FakeClock, make_response
+
+def try_lock(path, results):
+    results.put(FileLock(path).acquire(blocking=False))
+
+@pytest.fixture(params=["file", "store"])
+def backend(request, tmp_path):
+    if request.param == "file":
+        return FileCacheBackend(str(tmp_path / "shared"))
+    return StoreCacheBackend(MemoryStore())
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    """Test that a held FileLock cannot be taken by another process until it is released."""
+    path = str(tmp_path / "refresh.lock")
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+
+    with FileLock(path):
+        child = context.Process(target=try_lock, args=(path, results))
+        child.start()
+        child.join(10)
+        assert results.get(timeout=5) is False
+
+    child = context.Process(target=try_lock, args=(path, results))
+    child.start()
+    child.join(10)
+    assert results.get(timeout=5) is True
+
+def test_file_lock_timeout(tmp_path):
+    """Test that acquire() gives up after its timeout while another holder keeps the lock."""
+    path = str(tmp_path / "refresh.lock")
+    holder = FileLock(path)
+    holder.acquire()
+    try:
+        started = time.monotonic()
+        assert FileLock(path).acquire(timeout=0.1) is False
+        assert time.monotonic() - started >= 0.1
+    finally:
+        holder.release()
+    assert FileLock(path).acquire(blocking=False) is True
+
+def test_backend_round_trip(backend):
+    """Test that entries are stored, read back and deleted."""
+    assert backend.get("key") is None
+    backend.set("key", 1234.5, b'{"a": 1}')
+    assert backend.get("key") == (1234.5, b'{"a": 1}')
+    backend.delete("key")
+    assert backend.get("key") is None
+
+def test_backend_lock_is_exclusive(backend):
+    """Test that the named lock of a backend is held by one caller at a time."""
+    lock = backend.lock("login:user")
+    assert lock.acquire(blocking=False) is True
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(lock.acquire(blocking=False)))
+    thread.start()
+    thread.join()
+    assert acquired == [False]
+    lock.release()
+    assert lock.acquire(blocking=False) is True
+    lock.release()
+
+def test_file_backend_directory_is_private(tmp_path):
+    """Test that the shared directory is only accessible to its owner, since it holds tokens."""
+    backend = FileCacheBackend(str(tmp_path / "shared"))
+    assert (tmp_path / "shared").stat().st_mode & 0o777 == 0o700
+    assert backend.lock("a") is backend.lock("a")
+
+def test_memory_store_expiry_and_nx():
+    """Test that MemoryStore honours px expiry and nx like redis."""
+    clock = FakeClock(1000.0)
+    store = MemoryStore(clock=clock)
+    assert store.set("k", b"1", px=1000, nx=True) is True
+    assert store.set("k", b"2", nx=True) is None
+    assert store.get("k") == b"1"
+    clock.now += 1
+    assert store.get("k") is None
+    assert store.set("k", b"2", nx=True) is True
+    assert store.delete("k") == 1
+    assert store.delete("k") == 0
+
+def test_store_backend_expires_entries():
+    """Test that StoreCacheBackend entries expire in the store after expire_after."""
+    clock = FakeClock(1000.0)
+    backend = StoreCacheBackend(MemoryStore(clock=clock), expire_after=5)
+    backend.set("key", 1.0, b"x")
+    clock.now += 4
+    assert backend.get("key") == (1.0, b"x")
+    clock.now += 1
+    assert backend.get("key") is None
+
+def test_store_lock_lease_expires():
+    """Test that a lease left by a crashed holder expires, and its release does not drop the new lease."""
+    clock = FakeClock(1000.0)
+    store = MemoryStore(clock=clock)
+    crashed = StoreCacheBackend(store, lock_lease=10).lock("login:user")
+    other = StoreCacheBackend(store, lock_lease=10).lock("login:user")
+    assert crashed.acquire(blocking=False) is True
+    assert other.acquire(blocking=False) is False
+    clock.now += 10
+    assert other.acquire(blocking=False) is True
+    crashed.release()  # Expired lease: must not free the lock `other` holds
+    assert store.get("luxid:lock:login:user") is not None
+    other.release()
+    assert store.get("luxid:lock:login:user") is None
+
+def test_backend_from_config(tmp_path):
+    """Test that the shared backend is chosen from the directory or URL setting."""
+    assert backend_from_config() is None
+    assert isinstance(backend_from_config(directory=str(tmp_path / "shared")), FileCacheBackend)
+    with patch("services.shared_cache.redis", None):
+        with pytest.raises(Exception, match="redis"):
+            backend_from_config(url="redis://localhost:6379/0")
+
+def test_shared_token_cache_expires_after_ttl():
+    """Test that shared tokens expire after the TTL, whichever process stored them."""
+    clock = FakeClock(1000.0)
+    tokens = SharedTokenCache(StoreCacheBackend(MemoryStore()), ttl=60, clock=clock)
+    tokens["user"] = "abc"
+    assert tokens["user"] == "abc"
+    assert 59 < tokens.expiry.get("user") - time.monotonic() <= 60
+    clock.now += 60
+    assert tokens.get("user") is None
+    with pytest.raises(KeyError):
+        tokens["user"]
+
+@patch("services.api_client.requests.Session.request")
+def test_clients_share_one_login(mock_request, backend):
+    """Test that clients in different workers reuse the token of the first login."""
+    mock_request.return_value = make_response(200, {"token": "shared_token"})
+    first = LuxidAPIClient("user", "pass", token_cache=SharedTokenCache(backend, ttl=900))
+    second = LuxidAPIClient("user", "pass", token_cache=SharedTokenCache(backend, ttl=900))
+
+    assert first.ensure_token() == "shared_token"
+    assert second.ensure_token() == "shared_token"
+    assert first.stats["logins"] == 1
+    assert second.stats["logins"] == 0
+
+@patch("services.api_client.requests.Session.request")
+def test_concurrent_logins_collapse_across_caches(mock_request, tmp_path):
+    """Test that concurrent workers without a token wait on a single login through the shared lock."""
+    directory = str(tmp_path / "shared")
+
+    def login(*args, **kwargs):
+        time.sleep(0.05)
+        return make_response(200, {"token": "shared_token"})
+
+    mock_request.side_effect = login
+    # One backend (and so one set of lock files) per client, as in separate worker processes
+    clients = [LuxidAPIClient("user", "pass", token_cache=SharedTokenCache(FileCacheBackend(directory), ttl=900))
+               for _ in range(4)]
+    tokens = []
+    threads = [threading.Thread(target=lambda client=client: tokens.append(client.ensure_token())) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["shared_token"] * 4
+    assert sum(client.stats["logins"] for client in clients) == 1
+
+def test_response_cache_fetches_once_across_workers(tmp_path):
+    """Test that response caches sharing a backend fetch a missing entry once."""
+    directory = str(tmp_path / "shared")
+    caches = [ResponseCache(ttl=60, backend=FileCacheBackend(directory)) for _ in range(4)]
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"events": [1, 2]}
+
+    results = []
+    threads = [threading.Thread(target=lambda cache=cache: results.append(cache.get_or_fetch("events", fetch)))
+               for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"events": [1, 2]}] * 4
+    assert len(calls) == 1
+
+def test_stale_entry_is_revalidated_by_one_worker(tmp_path):
+    """Test that a worker skips revalidation while another worker is refreshing the entry."""
+    clock = FakeClock(1000.0)
+    backend = FileCacheBackend(str(tmp_path / "shared"))
+    cache = ResponseCache(ttl=10, stale_ttl=60, backend=backend, clock=clock)
+    cache.set("events", {"v": 1})
+    clock.now += 20
+    calls = []
+
+    with FileLock(backend.lock("response:events").path):  # Held by another worker
+        assert cache.get_or_fetch("events", lambda: calls.append(1) or {"v": 2}) == {"v": 1}
+    time.sleep(0.05)
+    assert calls == []
+    assert cache.stats["revalidations"] == 0
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+import unittest
+from services.snapshot_store import SnapshotStore
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.tmp_dir.name, "snapshots.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_put_save_and_reload(self):
+        """Test that snapshots survive a save/reload round trip."""
+        store = SnapshotStore(self.file_name)
+        store.put("event_1", "abc", [{"eventId": "event_1"}], etag='"v1"')
+        store.save()
+
+        reloaded = SnapshotStore(self.file_name)
+        snapshot = reloaded.get("event_1")
+        self.assertEqual(snapshot["hash"], "abc")
+        self.assertEqual(snapshot["etag"], '"v1"')
+        self.assertIsNone(snapshot["last_modified"])
+        self.assertEqual(snapshot["rows"], [{"eventId": "event_1"}])
+
+    def test_retain_drops_removed_events(self):
+        """Test that events missing from the latest listing are forgotten."""
+        store = SnapshotStore(self.file_name)
+        store.put("event_1", "a", [])
+        store.put("event_2", "b", [])
+
+        store.retain(["event_2"])
+
+        self.assertIsNone(store.get("event_1"))
+        self.assertEqual(len(store), 1)
+
+    def test_corrupt_file_is_ignored(self):
+        """Test that an unreadable snapshot file starts a fresh full sync."""
+        with open(self.file_name, "w") as snapshot_file:
+            snapshot_file.write("{not json")
+
+        self.assertEqual(len(SnapshotStore(self.file_name)), 0)
+
+    def test_concurrent_saves_use_their_own_temp_files(self):
+        """Test that stores saving the same file at once each write a complete snapshot and leave no temp files."""
+        stores = []
+        for index in range(8):
+            store = SnapshotStore(self.file_name)
+            store.put(f"event_{index}", "hash", [{"eventId": f"event_{index}"}] * 500)
+            stores.append(store)
+        errors = []
+
+        def save(store):
+            try:
+                for _ in range(5):
+                    store.save()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save, args=(store,)) for store in stores]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(SnapshotStore(self.file_name)), 1)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["snapshots.json"])
+
+if __name__ == "__main__":
+    unittest.main()
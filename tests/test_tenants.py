@@ -0,0 +1,96 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from services.tenants import Tenant, TenantBusy, TenantRegistry
+
+def claim_two_slots(output_dir, results):
+    """Claims two export slots of the tenant in `output_dir`, as another gunicorn worker would."""
+    tenant = Tenant("acme", "user", "pass", output_dir, max_concurrent_exports=2)
+    outcomes, slots = [], []
+    for _ in range(2):
+        try:
+            slots.append(tenant.export_slot())
+            outcomes.append("claimed")
+        except TenantBusy:
+            outcomes.append("busy")
+    results.put(outcomes)
+
+class TestTenantRegistry(unittest.TestCase):
+    def test_from_file_resolves_passwords_and_output_dirs(self):
+        """Test that tenants are loaded with env passwords and default output directories."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tenants_file = os.path.join(tmp_dir, "tenants.json")
+            with open(tenants_file, "w", encoding="utf-8") as f:
+                json.dump({"tenants": [
+                    {"id": "acme", "username": "acme-user", "password_env": "ACME_PASSWORD", "max_concurrent_exports": 2},
+                    {"id": "globex", "username": "globex-user", "password": "plain", "output_dir": "/data/globex"},
+                ]}, f)
+
+            with patch.dict(os.environ, {"ACME_PASSWORD": "from-env"}):
+                registry = TenantRegistry.from_file(tenants_file, "/data/tenants", MagicMock())
+
+        self.assertEqual(registry.ids(), ["acme", "globex"])
+        acme = registry.get("acme")
+        self.assertEqual(acme.password, "from-env")
+        self.assertEqual(acme.csv_path, os.path.join("/data/tenants", "acme", "participants.csv"))
+        self.assertEqual(acme.max_concurrent_exports, 2)
+        self.assertEqual(registry.get("globex").output_dir, "/data/globex")
+        self.assertIsNone(registry.get("initech"))
+
+    def test_invalid_tenant_id_is_rejected(self):
+        """Test that ids that could escape the output root are refused."""
+        with self.assertRaises(Exception):
+            Tenant("../etc", "user", "pass", "/tmp")
+
+    def test_clients_are_per_tenant_and_least_recently_used_is_closed(self):
+        """Test that each tenant gets its own client and token cache, bounded by max_clients."""
+        tenants = [Tenant(name, f"{name}-user", "pass", f"/tmp/{name}") for name in ("a", "b", "c")]
+        factory = MagicMock(side_effect=lambda tenant, token_cache: MagicMock(token_cache=token_cache))
+        registry = TenantRegistry(tenants, factory, max_clients=2)
+
+        client_a = registry.client(tenants[0])
+        client_b = registry.client(tenants[1])
+        self.assertIs(registry.client(tenants[0]), client_a)
+        self.assertIsNot(client_a.token_cache, client_b.token_cache)
+
+        registry.client(tenants[2])  # b is now the least recently used
+
+        client_b.close.assert_called_once()
+        client_a.close.assert_not_called()
+        self.assertEqual(registry.active_clients(), 2)
+
+    def test_export_slots_limit_concurrency(self):
+        """Test that a tenant refuses exports beyond its limit until a slot is released."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tenant = Tenant("acme", "user", "pass", os.path.join(tmp_dir, "acme"), max_concurrent_exports=1)
+
+            with tenant.export_slot():
+                with self.assertRaises(TenantBusy):
+                    tenant.export_slot()
+
+            with tenant.export_slot():
+                pass
+
+    def test_export_slots_are_shared_across_processes(self):
+        """Test that slots held by another worker process count against the tenant's limit."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_dir = os.path.join(tmp_dir, "acme")
+            tenant = Tenant("acme", "user", "pass", output_dir, max_concurrent_exports=2)
+            context = multiprocessing.get_context("fork")
+            results = context.Queue()
+
+            with tenant.export_slot():
+                child = context.Process(target=claim_two_slots, args=(output_dir, results))
+                child.start()
+                child.join(10)
+                self.assertEqual(results.get(timeout=5), ["claimed", "busy"])
+            child = context.Process(target=claim_two_slots, args=(output_dir, results))
+            child.start()
+            child.join(10)
+            self.assertEqual(results.get(timeout=5), ["claimed", "claimed"])
+
+if __name__ == "__main__":
+    unittest.main()
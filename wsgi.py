@@ -0,0 +1,4 @@
+"""WSGI entry point: `gunicorn -c gunicorn.conf.py wsgi:app`."""
+from app import app, job_manager, metrics_directory
+
+__all__ = ["app", "job_manager", "metrics_directory"]